@@ -0,0 +1,300 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: dstar_lite.py
+#
+#   Description: This file contains an incremental path planner based on the
+#   D* Lite algorithm (Koenig and Likhachev). It works on the same 1D move
+#   cost list and 8-connected cost model as SQ_MapHandler in satar_modif.py:
+#   entering a cell costs its move cost, multiplied by 1.4142 for diagonal
+#   moves, and cells with a cost of -1 can't be walked.
+#
+#   The search is done backwards from the goal, so when the army moves along
+#   the path or a few cells change their cost, the search tree is repaired
+#   instead of computed again from scratch.
+#
+################################################################################
+
+import heapq
+import satar_modif
+
+INFINITY = float('inf')
+
+"""keys closer than this are taken as equal: km adds up the heuristic of
+every move, so the same key can be computed with a different rounding"""
+EPSILON = 1e-6
+
+"""move cost multipliers, same values used by SQ_MapHandler"""
+STRAIGHT = 1
+DIAGONAL = satar_modif.DIAGONAL
+
+NEIGHBOURS = ((1,0,STRAIGHT),(-1,0,STRAIGHT),(0,1,STRAIGHT),(0,-1,STRAIGHT),
+(1,1,DIAGONAL),(-1,-1,DIAGONAL),(-1,1,DIAGONAL),(1,-1,DIAGONAL))
+
+class DStarLite:
+    """Incremental planner that keeps its search tree between queries. Cells
+    are (column, row) tuples."""
+
+    def __init__(self, mapdata, width, height, heuristic=satar_modif.octile,
+    min_cost=None):
+        """Initialize the planner with a copy of the move cost list, so that
+        later cost changes can be detected by updateCosts. heuristic is one
+        of the functions in satar_modif.HEURISTICS, and min_cost the lowest
+        move cost of the terrain types; if it is not given, the lowest cost
+        in mapdata is used.
+
+        (list, int, int, function, int) --> ()"""
+
+        self.m = list(mapdata)
+        self.w = width
+        self.h = height
+        self._heuristic_func = heuristic
+        if min_cost is None:
+            min_cost = self._minMoveCost(self.m)
+        self._min_cost = min_cost
+        self._goal = None
+
+        """number of cells expanded since the planner was created"""
+        self.expanded = 0
+
+    def findPath(self, start, goal):
+        """Return the list of cells from start (not included) to goal, or
+        None if the goal can't be reached. If the goal is the same as in the
+        previous call, the previous search is reused."""
+
+        if goal != self._goal:
+            self._initialize(start, goal)
+        else:
+            self._moveStart(start)
+
+        self._computeShortestPath()
+        return self._extractPath()
+
+    def updateCosts(self, mapdata, changed=None):
+        """Compare mapdata with the costs known by the planner and repair the
+        search tree around the cells that changed. changed is a list of the
+        indices in mapdata of the cells whose cost may have changed, if it
+        is None every cell is compared."""
+
+        if changed is None:
+            indices = xrange(len(mapdata))
+        else:
+            indices = set(changed)
+
+        changed = [i for i in indices if mapdata[i] != self.m[i]]
+
+        if not changed:
+            return
+
+        min_cost = self._min_cost
+        for i in changed:
+            self.m[i] = mapdata[i]
+            if 0 < mapdata[i] < min_cost:
+                min_cost = mapdata[i]
+
+        """a cheaper terrain would make the heuristic inadmissible, in this
+        case the search is started again on the next query"""
+        if min_cost < self._min_cost or self._goal is None:
+            self._min_cost = min_cost
+            self._goal = None
+            return
+
+        """the cost of the edges going in and out of a changed cell is
+        different, so the cell and its neighbours need to be updated"""
+        self._moveStart(self._start)
+        affected = {}
+        for i in changed:
+            x = i % self.w
+            y = i / self.w
+            affected[(x,y)] = True
+            for dx,dy,multi in NEIGHBOURS:
+                if self._inMap(x+dx,y+dy):
+                    affected[(x+dx,y+dy)] = True
+
+        for s in affected:
+            self._updateVertex(s)
+
+    def _minMoveCost(self, mapdata):
+        """Return the lowest move cost of the walkable cells"""
+
+        costs = [c for c in mapdata if c > 0]
+        if costs:
+            return min(costs)
+        return 1
+
+    def _inMap(self, x, y):
+        return x >= 0 and x < self.w and y >= 0 and y < self.h
+
+    def _cost(self, (x0,y0), (x1,y1), multi):
+        """Cost of moving between two adjacent cells"""
+
+        c0 = self.m[y0*self.w+x0]
+        c1 = self.m[y1*self.w+x1]
+        if c0 == -1 or c1 == -1:
+            return INFINITY
+        return c1*multi
+
+    def _heuristic(self, (x0,y0), (x1,y1)):
+        """Heuristic distance scaled by the lowest move cost"""
+
+        return self._heuristic_func(abs(x0-x1),abs(y0-y1))*self._min_cost
+
+    def _neighbours(self, (x,y)):
+        """Return the adjacent cells that are inside the map, with their move
+        cost multiplier"""
+
+        result = []
+        for dx,dy,multi in NEIGHBOURS:
+            if self._inMap(x+dx,y+dy):
+                result.append(((x+dx,y+dy),multi))
+        return result
+
+    def _key(self, s):
+        g_rhs = min(self._g.get(s,INFINITY), self._rhs.get(s,INFINITY))
+        return (g_rhs+self._heuristic(self._start,s)+self._km, g_rhs)
+
+    def _keyLess(self, k1, k2):
+        """Compare two keys with a tolerance for the rounding of km"""
+
+        for a, b in zip(k1, k2):
+            if a == b or abs(a-b) <= EPSILON:
+                continue
+            return a < b
+        return False
+
+    def _push(self, s):
+        key = self._key(s)
+        self._open[s] = key
+        heapq.heappush(self._queue,(key,s))
+
+    def _topKey(self):
+        """Return the smallest key of the queue, stale entries are dropped"""
+
+        while self._queue:
+            key, s = self._queue[0]
+            if self._open.get(s) == key:
+                return key
+            heapq.heappop(self._queue)
+        return (INFINITY, INFINITY)
+
+    def _initialize(self, start, goal):
+        self._start = start
+        self._last = start
+        self._goal = goal
+        self._km = 0
+        self._g = {}
+        self._rhs = {goal: 0}
+        self._open = {}
+        self._queue = []
+        self._push(goal)
+
+    def _moveStart(self, start):
+        """The army moved, so the keys already in the queue are corrected
+        by the distance walked instead of being computed again"""
+
+        self._km += self._heuristic(self._last, start)
+        self._last = start
+        self._start = start
+
+    def _updateVertex(self, s):
+        if s != self._goal:
+            rhs = INFINITY
+            for n, multi in self._neighbours(s):
+                cost = self._cost(s,n,multi)+self._g.get(n,INFINITY)
+                if cost < rhs:
+                    rhs = cost
+            self._rhs[s] = rhs
+
+        if s in self._open:
+            del self._open[s]
+
+        if self._g.get(s,INFINITY) != self._rhs.get(s,INFINITY):
+            self._push(s)
+
+    def _computeShortestPath(self):
+        start = self._start
+
+        while (self._keyLess(self._topKey(), self._key(start)) or
+        self._rhs.get(start,INFINITY) != self._g.get(start,INFINITY)):
+
+            k_old, s = heapq.heappop(self._queue)
+            k_new = self._key(s)
+
+            if self._keyLess(k_old, k_new):
+                self._push(s)
+                continue
+
+            del self._open[s]
+            self.expanded += 1
+            g = self._g.get(s,INFINITY)
+            rhs = self._rhs.get(s,INFINITY)
+
+            if g > rhs:
+                self._g[s] = rhs
+                for n, multi in self._neighbours(s):
+                    self._updateVertex(n)
+            else:
+                self._g[s] = INFINITY
+                for n, multi in self._neighbours(s):
+                    self._updateVertex(n)
+                self._updateVertex(s)
+
+    def _extractPath(self):
+        """Follow the cheapest successors from the start to the goal"""
+
+        if self._g.get(self._start,INFINITY) == INFINITY and \
+        self._start != self._goal:
+            return None
+
+        cells = []
+        s = self._start
+        max_steps = self.w*self.h
+
+        while s != self._goal:
+            best = None
+            best_cost = INFINITY
+            for n, multi in self._neighbours(s):
+                cost = self._cost(s,n,multi)+self._g.get(n,INFINITY)
+                if cost < best_cost:
+                    best = n
+                    best_cost = cost
+
+            if best is None or len(cells) >= max_steps:
+                return None
+
+            cells.append(best)
+            s = best
+
+        return cells
@@ -0,0 +1,183 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: fov.py
+#
+#   Description: This file contains the field of view computation for World of
+#   Heroes, based on recursive shadowcasting (Bergstrom).
+#
+#   The cells around a center are scanned in eight octants, row by row going
+#   away from the center. An opaque cell is visible itself but casts a shadow,
+#   a range of slopes that is skipped in the following rows. Every cell is
+#   visited at most once, so the cost grows with the area within the radius
+#   and not with the size of the map.
+#
+#   The radius test is the same as the one of woh_engine.circular_stencil: a
+#   cell is inside when dx**2+dy**2 <= radius*(radius+1).
+#
+################################################################################
+
+"""multipliers that transform the coordinates of the first octant into each
+of the eight octants: (xx, xy, yx, yy)"""
+OCTANTS = ((1,0,0,1),(0,1,1,0),(0,-1,1,0),(-1,0,0,1),
+(-1,0,0,-1),(0,-1,-1,0),(0,1,-1,0),(1,0,0,-1))
+
+class FieldOfView:
+    """Computes the cells visible from a cell of a map, given the opacity of
+    every cell. Results are cached by (cell, radius) until the version given
+    by the caller changes. Cells are (column, row) tuples."""
+
+    def __init__(self, opacity, width, height, cache_size=256):
+        """Initialize the FieldOfView object. opacity is a list with 1 for
+        the cells that block the sight and 0 for the others, row by row. It
+        is not copied, so the caller has to change the version passed to
+        getVisible after changing it.
+
+        (list, int, int, int) --> ()"""
+
+        self.opacity = opacity
+        self.width = width
+        self.height = height
+        self.cache_size = cache_size
+
+        self._version = None
+        self._cache = {}
+        self._hits = 0
+        self._misses = 0
+
+    def getVisible(self, cell, radius, version):
+        """Return the list of (column, row) cells visible from cell within
+        radius. version is a number that changes every time the opacity of
+        the cells changes, the cache is emptied when it does."""
+
+        if version != self._version:
+            self._cache = {}
+            self._version = version
+
+        key = (cell, radius)
+        cells = self._cache.get(key)
+
+        if cells is not None:
+            self._hits += 1
+            return cells
+
+        self._misses += 1
+
+        if len(self._cache) >= self.cache_size:
+            self._cache = {}
+
+        cells = self.compute(cell, radius)
+        self._cache[key] = cells
+        return cells
+
+    def compute(self, (x,y), radius):
+        """Return the list of (column, row) cells visible from the cell (x,y)
+        within radius, without using the cache"""
+
+        visible = {(x,y): True}
+
+        for (xx,xy,yx,yy) in OCTANTS:
+            self._castLight(x, y, 1, 1.0, 0.0, radius, xx, xy, yx, yy,
+            visible)
+
+        return visible.keys()
+
+    def getStats(self):
+        """Return a dictionary with the cache hits and misses and the number
+        of results stored"""
+
+        return {'hits':self._hits, 'misses':self._misses,
+        'size':len(self._cache)}
+
+    def _isOpaque(self, x, y):
+        """Cells outside the map block the sight"""
+
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return True
+        return self.opacity[y*self.width+x]
+
+    def _castLight(self, cx, cy, row, start, end, radius, xx, xy, yx, yy,
+    visible):
+        """Scan the rows of an octant from row to radius, between the slopes
+        start and end, adding the visible cells to the dictionary visible"""
+
+        if start < end:
+            return
+
+        limit = radius*(radius+1)
+        new_start = start
+
+        for j in range(row, radius+1):
+            dx = -j-1
+            dy = -j
+            blocked = False
+
+            while dx <= 0:
+                dx += 1
+
+                """slopes of the left and right edges of the cell"""
+                l_slope = (dx-0.5)/(dy+0.5)
+                r_slope = (dx+0.5)/(dy-0.5)
+
+                if start < r_slope:
+                    continue
+                elif end > l_slope:
+                    break
+
+                x = cx+dx*xx+dy*xy
+                y = cy+dx*yx+dy*yy
+                inside = x >= 0 and x < self.width and y >= 0 and \
+                y < self.height
+
+                if inside and dx*dx+dy*dy <= limit:
+                    visible[(x,y)] = True
+
+                opaque = self._isOpaque(x, y)
+
+                if blocked:
+                    if opaque:
+                        new_start = r_slope
+                    else:
+                        blocked = False
+                        start = new_start
+
+                elif opaque and j < radius:
+                    blocked = True
+                    self._castLight(cx, cy, j+1, start, l_slope, radius, xx, xy,
+                    yx, yy, visible)
+                    new_start = r_slope
+
+            if blocked:
+                break
@@ -42,12 +42,21 @@
 #   the screen. This function features the game loop as well, which is executed
 #   at the frame rate specified in the EngineObj element, in the file game_lib.
 #
+#   Run it with the option --startup-times to print how long each phase of the
+#   start of the game took, and how many fonts and images were loaded and
+#   reused.
+#
 ################################################################################
 
+import time
+import_start=time.time()
+
 from gui_lib import *
 from woh_gui_lib import *
 from game_lib import *
 
+startup.add('import',time.time()-import_start)
+
 
 def main():
     """Main function of the game. In this function the main gameplay elements
@@ -55,7 +64,8 @@ def main():
     game loop as well, which is executed at the frame rate specified in the
     EngineObj element, in the file game_lib."""
     
-    """Initialize pygame parameters"""
+    """Initialize pygame parameters, the window is opened here"""
+    screen=get_screen()
     pygame.display.set_caption('World of Heroes')
     pygame.key.set_repeat(500, 30)    
         
@@ -63,6 +73,9 @@ def main():
     clock = pygame.time.Clock()
     time = pygame.time.get_ticks()
 
+    """Load the fonts used by the widgets"""
+    fonts.preload([('arial',size,'normal') for size in (10,12,13,14,16,18)])
+
     """Create main game objects and load the current scenario"""
     game_map=Map('map.txt','terrtypes.txt','resource_types.txt','resource_pos.txt',
     'cities.txt','cities_pos.txt')
@@ -112,9 +125,22 @@ def main():
     gui.widgets[right_panel_id].initializeGameRelated()
     gui.widgets[map_canv_id].initializeGameRelated(heroe, game_map)
 
+    if '--startup-times' in sys.argv:
+        """report the fonts and images shared by the widgets and game
+        objects"""
+        print 'Fonts: %(loaded)d loaded in %(load_time).3f s, %(hits)d ' \
+        'reused, %(time_saved).3f s saved' % fonts.getStats()
+        print 'Images: %(loaded)d loaded in %(load_time).3f s, %(hits)d ' \
+        'reused, %(entries)d entries, %(bytes)d bytes' % images.getStats()
+        print 'Startup times:'
+        print startup.report()
+
     key_pressed=False
     mouse_pressed=False
 
+    """blits of the map canvas, drawn together once per frame"""
+    render_queue=RenderQueue(RENDER_LAYERS)
+
     """Game loop"""
     while 1:
 
@@ -127,6 +153,10 @@ def main():
                 pygame.quit()
                 sys.exit()
 
+            """the window contents were lost, display everything again"""
+            if event.type == pygame.VIDEOEXPOSE:
+                gui.invalidateAll()
+
             """When there is keyboard, send the event to the widget that has the
             user focus"""
             if event.type == pygame.KEYDOWN:
@@ -152,11 +182,17 @@ def main():
         heroe.update(time, game_map)
         gui.updateWidgets((heroe,game_map))
         
-        """display elements on the screen"""
+        """display elements on the screen. The map and the hero are queued
+        and drawn in the map canvas first, layer by layer, then only the
+        regions of the screen that changed are displayed and updated"""
         #screen.fill(black)
-        gui.widgets[main_widget_id].display(screen)
-        game_map.display(gui.widgets[map_canv_id].getSurf(), heroe)    
-        heroe.display(gui.widgets[map_canv_id].getSurf())       
-        pygame.display.flip()
+        map_canv=gui.widgets[map_canv_id]
+        map_rects=game_map.display(map_canv.getSurf(), heroe, render_queue)
+        heroe_rects=heroe.display(map_canv.getSurf(), map_rects, render_queue,
+        game_map.getCamera())
+        render_queue.flush(map_canv.getSurf())
+        map_canv.addDirtyRects(map_rects)
+        map_canv.addDirtyRects(heroe_rects)
+        pygame.display.update(gui.displayDirty(screen, main_widget_id))
         
 main()
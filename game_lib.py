@@ -38,1006 +38,558 @@
 #   Description: This file contains the gameplay classes for World of Heroes, a
 #   2D turn-based strategy game.
 #
-#   EngineObject is a top-level class that keeps track of general gameplay
-#   variables and methods. The class Map manages the game map and its interaction with the
-#   game characters and resources. The class Player manages the player's army.
+#   The gameplay rules are in woh_engine, the classes in this file add the
+#   display to them. The class Map draws the game map, its resource spots and
+#   cities, and reports their changes to the gui. The class Player draws the
+#   player's army and its path.
 #
 #   Other classes in this file are: Army (superclass for all the armies in the
 #   game), Terrain (represent a terrain type), Path (represent the path the
-#   player is going to follow), and Polyline (draw a polyline on a surface).
+#   player is going to follow), Camera (the part of the map displayed),
+#   Polyline (draw a polyline on a surface), Resource and City.
 #
 ################################################################################
 
 from gui_lib import *
-import satar_modif
+from woh_engine import *
 from random  import *
 
-class EngineObject:
-    """This class manages gameplay variables and methods such as the default
-    size of the sprites, and the turn system.    
-    """
+"""layers of the RenderQueue used to draw the map canvas, from bottom to top"""
+RENDER_LAYERS=('terrain','resources','flags','armies')
 
-    current_turn = 1
-    
-    def __init__(self):
-        """Initialize the EngineObject"""
-        self.tile_x=32
-        self.tile_y=32
+class Terrain(TerrainModel, SpriteObj):
+    """Represents the terrain types and their attributes, it is a subclass
+    of TerrainModel and SpriteObj
 
-        """frames per second"""
-        self.fps=50
+    Constructor: Terrain(str, str, str, int, boolean, boolean)
+    """
 
-    def newTurn(self, (player, map_obj)):
-        """Prepare all the game elements for a new turn"""
+    def __init__(self, filename, terrain_id, terrain_name, move_cost,
+    is_walkable, is_opaque=0):
 
-        player.newTurn(map_obj)
-        EngineObject.current_turn+=1
+        SpriteObj.__init__(self, filename)
+        TerrainModel.__init__(self, terrain_id, terrain_name, move_cost,
+        is_walkable, is_opaque)
 
-    def setMapCanvas(self, widget_id):
-        """Keep track of the id of the MapCanvas widget"""
-        
-        self._map_canvas_id=widget_id
+    
+class Map(MapModel):
+    """This class represents the game map. The map and its gameplay are
+    managed by MapModel, this class draws it in a pygame Surface object,
+    which is drawn into the MapCanvas gui element.
+    """
 
-    def getMapCanvas(self):
-        """Return the id of the MapCanvas widget"""
+    def __init__(self, tileset_file, terrains_file=None,
+    resource_type_file=None, resource_pos_file=None,cities_file=None,
+    cities_pos_file=None):
+        """Initialize the game map, from the text files of a scenario or a
+        compiled scenario, see MapModel"""
+
+        """rects of the map that need to be displayed again, such as
+        resource spots that changed owner, and (row,col) cells whose terrain
+        changed since the last frame"""
+        self._changed_rects=[]
+        self._layer_changed=[]
+
+        startup.begin('scenario')
+        MapModel.__init__(self, tileset_file, terrains_file,
+        resource_type_file, resource_pos_file,cities_file,cities_pos_file)
+        startup.end()
+
+        """the images of the terrains, resource spots and cities are packed
+        in a single surface"""
+        startup.begin('assets')
+        self.buildAtlas()
+        startup.end()
+
+        """the camera selects the part of the map that is displayed. Only
+        the cells in its view are drawn, so the memory used to display the
+        map doesn't depend on the size of the map"""
+        self._camera=Camera(engine.view_width,engine.view_height,
+        (self._tiles_x-1)*engine.tile_x,(self._tiles_y-1)*engine.tile_y)
+
+        """pre-rendered terrain of the cells in the camera's view visible to
+        the army with id _layer_army, the view it was drawn for is
+        _layer_view. _layer_revealed is the number of cells from the army's
+        revealed cells list already drawn"""
+        self._terrain_layer=pygame.Surface(self._camera.getSize())
+        self._layer_view=None
+        self._layer_army=None
+        self._layer_revealed=0
+
+        """surface the map was last displayed on"""
+        self._layer_dest=None
+
+    def display(self, dest_surf, player, queue=None):
+        """Draw the part of the map in the camera's view in the destination
+        surface. Only the cells that are visible to the player will be
+        displayed.
+
+        The terrain is drawn in a pre-rendered layer, where only the cells
+        revealed by the player since the previous frame, or whose terrain
+        changed, are drawn. The whole layer is drawn again, from the cells
+        in the view only, when the camera moves. Only the regions of the
+        destination surface that changed are drawn again, this includes the
+        regions where the player was drawn in the previous frame if it has
+        to be drawn elsewhere. The list of rects drawn is returned, in
+        coordinates of the destination surface.
+
+        The blits are added to queue, a RenderQueue with the RENDER_LAYERS,
+        to be drawn by the caller. If queue is None they are drawn before
+        returning."""
 
-        return self._map_canvas_id
+        cell_visib=player.getCellVisibility()
+        view=self._camera.getRect()
+
+        """start again if the layer was drawn for another army, or the
+        camera moved"""
+        if self._layer_army != player.getID() or \
+        self._layer_view != view.topleft:
+            self._layer_army=player.getID()
+            self._layer_view=view.topleft
+            self._layer_revealed=len(player.getRevealedCells())
+            self._layer_dest=None
+            self.drawLayerView(cell_visib)
+
+        """display the terrain of the newly visible cells"""
+        revealed=player.getRevealedCells()
+        cells=revealed[self._layer_revealed:]
+        self._layer_revealed=len(revealed)
+
+        cells+=cell_visib.getVisibleCells(self._layer_changed)
+        self._layer_changed=[]
+
+        world_rects=self.drawLayerCells(cells)+self._changed_rects
+        self._changed_rects=[]
+
+        rects=[]
+        for r in world_rects:
+            r=r.move(-view.x,-view.y).clip(dest_surf.get_rect())
+            if r.width>0 and r.height>0:
+                rects.append(r)
+        rects+=player.getStaleRects()
+
+        """the whole view is displayed on a new destination surface"""
+        if self._layer_dest is not dest_surf:
+            self._layer_dest=dest_surf
+            rects=[dest_surf.get_rect()]
+
+        if queue is None:
+            own_queue=RenderQueue(RENDER_LAYERS)
+        else:
+            own_queue=queue
 
-    def setRightPanel(self, widget_id):
-        """Keep track of the id of the RightPanel widget"""
-        
-        self._right_panel_id=widget_id
+        for r in rects:
+            self.restoreRect(own_queue,r,cell_visib)
 
-    def getRightPanel(self):
-        """Return the id of the RightPanel widget"""
+        if queue is None:
+            own_queue.flush(dest_surf)
 
-        return self._right_panel_id
+        return rects
 
-        
+    def restoreRect(self,queue,rect,cell_visib):
+        """Add to a RenderQueue the blits of the terrain and the visible
+        resource spots and cities that are inside a rect of the destination
+        surface. Resource spots are clipped to the rect.
 
-class Terrain(SpriteObj):
-    """Represents the terrain types and their attributes, it is a subclass
-    of SpriteObj
+        Precondition: resource spot images are not larger than a cell."""
 
-    Constructor: Terrain(str, str, str, int, boolean)
-    """
+        queue.add('terrain',self._terrain_layer,rect.topleft,rect)
 
-    def __init__(self, filename, terrain_id, terrain_name, move_cost,
-    is_walkable):
+        (view_x,view_y)=self._camera.getOffset()
+        world=rect.move(view_x,view_y)
 
-        SpriteObj.__init__(self, filename)
-        self._terrain_id=terrain_id
-        self._terrain_name=terrain_name
-        self._move_cost=int(move_cost)
-        self._is_walkable=int(is_walkable)
+        first_col=world.left/engine.tile_x
+        first_row=world.top/engine.tile_y
+        last_col=(world.right-1)/engine.tile_x
+        last_row=(world.bottom-1)/engine.tile_y
 
-    def __str__(self):
-        """Represent a Terrain object as string"""
+        for i in self._res_index.getInCellRect((first_col,first_row,
+        last_col-first_col+1,last_row-first_row+1)):
+            (col,row)=self._res_index.getCell(i)
 
-        terr_str="Terrain ID:" + str(self._terrain_id) + ", Name:"
-        terr_str=terr_str+str(self._terrain_name) + ", Is_walkable:"
-        terr_str=terr_str+ str(self._is_walkable)+ ", Move cost:" 
-        terr_str=terr_str+str(self._move_cost)
+            if cell_visib.isVisible(row,col):
+                self._resource_spots[i].addBlits(queue,rect,(-view_x,-view_y))
 
-        return terr_str  
-        
-    def getMoveCost(self):
-        """Get the terrain type's move cost"""
-        return self._move_cost
+    def drawLayerCells(self,cells):
+        """Draw the terrain of a list of (row,col) cells in the pre-rendered
+        terrain layer, with a single blit_list call. Cells outside of the
+        camera's view are left out. The rects of the cells drawn are returned,
+        in map coordinates."""
 
-    def getIsWalkable(self):
-        """Get if the terrain is walkable or not"""
-        return self._is_walkable
+        rects=[]
+        blit_seq=[]
+        view=self._camera.getRect()
 
-    def getTerrainName(self):
-        """Get the name of the terrain type"""
-        return self._terrain_name
-    
-class Map:
-    """This class represents the game map, which is a 2D grill where each
-    cell represents a certain terrain type. From this class the map is loaded
-    from differente text files containing cell and terrain information, and it
-    is drawn in a pygame Surface object, which is drawn into the MapCanvas gui
-    element.
-
-    This class also manages gameplay related map operations and elements, such
-    as resource spots, cities, and part of the path finding and armies updating.
-    """
+        for (row,col) in cells:
+            if row>=self._tiles_y-1 or col>=self._tiles_x-1:
+                continue
 
-    def __init__(self, tileset_file, terrains_file, resource_type_file,
-    resource_pos_file,cities_file,cities_pos_file):
-        """Initialize the game map"""
-        
-        self._tileset_file=tileset_file
-        self._terrains_file=terrains_file
-        self._resource_type_file=resource_type_file
-        self._resource_pos_file = resource_pos_file
-        self._cities_file=cities_file
-        self._cities_pos_file=cities_pos_file
-
-        """Terrain information is in two files, terrains_file contains the
-        description of every terrain type. tileset contains the terrain
-        type of every cell in the map"""
-        self._terrain_types={}
-        self._terrain_types={}
-        self.loadTerrainTypes()
-        self.loadTileset()
-
-        """resource information is stored in two different files,
-        resource_types_file contains the description of every
-        different kind of resource spot in the game, two resource spots can
-        deliver the same resource, for example a small farm and a big
-        farm will both deliver food. resource_spots_file contains the position
-        of every resource spot in the game map"""
-        self._resource_spots={}
-        self._resource_types={}
-        self.loadResourceTypes()
-        self.loadResourcePos()
-
-        """cities info stored in two files, just like for the resources, there
-        is a file to store the cities attributes and a file to store their
-        positions"""
-        self.loadCities()
-        self.loadCitiesPos()
-
-        self._map_surf=pygame.Surface((self._tiles_x*engine.tile_x,
-        self._tiles_y*engine.tile_y))
-        
-        self._map_rect=self._map_surf.get_rect()
-        
-        self.setMoveCost1D()
-        
+            rect=pygame.Rect(col*engine.tile_x,row*engine.tile_y,engine.tile_x,
+            engine.tile_y)
 
-    def loadTerrainTypes(self):
-        """Load text file with terrain types information. The file's format is:
+            if rect.colliderect(view):
+                rects.append(rect)
+                blit_seq.append(self._terrain_list[self._tiles[row*(
+                self._tiles_x-1)+col]].getBlit(rect.x-view.x,rect.y-view.y))
 
-        terrain_id, terrain_name, move_cost, is_walkable, image_filename
-          (int)       (str)         (int)       (int)        (str)
+        blit_list(self._terrain_layer,blit_seq)
 
-        """
-        
-        f = open(self._terrains_file, 'U')
-        
-        for line in f:
+        return rects
 
-            """read and process each line that has data, and save the info in
-            the dictionary"""
-            if line.rfind(',') != -1:
+    def drawLayerView(self,cell_visib):
+        """Draw again the whole terrain layer, from the cells in the
+        camera's view only"""
 
-                """splits each line into a list"""
-                sline=line.split(',')
-                
-                """the info is stored in the dictorionary. Whitespaces, tabs and
-                new lines are removed"""
-                self._terrain_types[sline[0].strip()]=Terrain(sline[4].strip(),
-                sline[0].strip(),sline[1].strip(),sline[2].strip(),
-                sline[3].strip())
-       
-        """close the file"""
-        f.close()        
+        self._terrain_layer.fill((0,0,0))
 
-    def loadTileset(self):
-        """Load the map grid from a text file. This file is organized
-        as a nxm matrix where n is the number of rows of the map, and m the
-        number of columns. Each value representes a terrain id. Values are
-        separated by commas, and rows by new lines
+        (col,row,width,height)=self._camera.getCellWindow(engine.tile_x,
+        engine.tile_y)
 
-        Precondition: the values in the file must exist in the file where
-        the terrain types are defined, terrains_file."""
+        cells=[]
+        for r in range(row,row+height):
+            for c in range(col,col+width):
+                cells.append((r,c))
 
-        """list to store the tileset"""        
-        self._tiles=[]
-        
-        f = open(self._tileset_file, 'U')
-
-        i=0
-        for line in f:
-
-            """read and process each line that has data"""
-            if line.rfind(',') != -1:
+        self.drawLayerCells(cell_visib.getVisibleCells(cells))
 
-                """splits each line into a list"""
-                splitted_line=line.split(',')
+    def setViewSize(self,width,height):
+        """Set the size in pixels of the part of the map displayed, usually
+        the size of the map canvas"""
 
-                j=0
+        self._camera.setSize(width,height)
+        self._terrain_layer=pygame.Surface(self._camera.getSize())
+        self._layer_view=None
 
-                self._tiles.append([])
+    def getCamera(self):
+        """Return the Camera object of the map"""
 
-                for t in splitted_line:
-                    self._tiles[i].append(t.strip())
-                    j+=1
-                i+=1
-                
-                
-        """close the file"""
-        f.close()
+        return self._camera
 
-        """save dimensions of the map"""
-        self._tiles_x=j+1
-        self._tiles_y=i+1
-    
-    def display(self, dest_surf, player):
-        """Draw the map in the destination surface. Only the cells that are
-        visible to the player will be displayed."""
+    def buildAtlas(self):
+        """Pack the images of all the terrain types, resource types and city
+        types in a TextureAtlas, which is then used by the Terrain, Resource
+        and City objects"""
 
-        cell_visib=player.getCellVisibility()
+        filenames=[t.getFilename() for t in self._terrain_list]
+        for type_id in self._resource_types:
+            filenames.append(self._resource_types[type_id]['filename'])
 
-        dest_surf.fill((0,0,0))
+        self._atlas=TextureAtlas(filenames)
 
-        """display visible terrains"""
-        if cell_visib:     
-            for i in range(0,self._tiles_y-1):
-                for j in range(0,self._tiles_x-1):
-                    if cell_visib[i][j]:
-                        self._terrain_types[self._tiles[i][j]].display(
-                        j*engine.tile_y,i*engine.tile_x,dest_surf)
+        for t in self._terrain_list:
+            t.useAtlas(self._atlas)
 
-        """display resource spots and cities"""
         for i in self._resource_spots:
-            x,y=self._resource_spots[i].getPos()
-            res_cell=self.getCellFromXY(x,y)
-            
-            if cell_visib[res_cell['row']][res_cell['col']]:            
-                self._resource_spots[i].display(dest_surf)     
-         
-    def getIsWalkable(self,x,y):
-        """Return the _is_walkable attribute of the terrain located at
-        coordinates x,y. This coordinates are in pixels"""
-        
-        target_cell=self.getCellFromXY(x,y)
+            self._resource_spots[i].useAtlas(self._atlas)
 
-        left_border=x<self._map_rect.left
-        top_border=y<self._map_rect.top
-        right_border=x>=self._map_rect.right
-        bot_border=y>=self._map_rect.bottom
-        
-        if (left_border or top_border) or (right_border or bot_border):
-            return False
-        
-        target_terrain=self._tiles[target_cell['row']][target_cell['col']]
-        return self._terrain_types[target_terrain].getIsWalkable()
+    def newTerrain(self, filename, terrain_id, terrain_name, move_cost,
+    is_walkable, is_opaque):
+        """Create a Terrain object, with the image of the terrain"""
 
-    def getCellFromXY(self,x,y):
-        """Return the row and column of the cell located in some X, Y pixel
-        coordinates.getMoveCost1D
+        return Terrain(filename, terrain_id, terrain_name, move_cost,
+        is_walkable, is_opaque)
 
-        Precondition: the origin (0,0) is located on the upper left corner of
-        the map."""
-        
-        col=int((x - x%engine.tile_x)/engine.tile_x)
-        row=int((y - y%engine.tile_y)/engine.tile_y)
-        cell={'row':row, 'col':col}        
-        return cell
-
-    def getCellCoordFromXY(self,x,y):
-        """Return the coordinates of the upper left corner of the cell where
-        the point x,y is located. x,y in Pixel coordinates.
-
-        Precondition: the origin (0,0) is located on the upper left corner of
-        the map."""
-
-        current_cell = self.getCellFromXY(x,y)
-        x_left = current_cell['col']*engine.tile_x
-        y_left = current_cell['row']*engine.tile_y
-        return (x_left, y_left)
-        
+    def newResource(self, type_id, x, y):
+        """Create a Resource object, with the image of its type"""
 
-    def showTerrainInfo(self,cell):
-        """Returns data on the terrain located in cell "cell".
-        Parameter cell is a dictionary with the format:
+        res_type=self._resource_types[type_id]
 
-        dict{'row':row number, 'col':column number}"""
-        
-        terr_id=self._tiles[cell['row']][cell['col']]
-        return self._terrain_types[terr_id]
+        return Resource(type_id, res_type['filename'], res_type['type'],
+        res_type['name'], res_type['amount_per_turn'],
+        res_type['instant_amount'], res_type['conquered_text'],
+        res_type['first_time_text'], x, y)
 
-    def setMoveCost1D(self):
-        """Generate a list with the move cost of every cell in the map"""
+    def newCity(self, type_id, x, y):
+        """Create a City object, with the image of its type"""
 
-        self._1d_move_cost=[]
-        
-        for j in range(0,self._tiles_y-1):
-            for i in range(0,self._tiles_x-1):
-                self._1d_move_cost.append(
-                self._terrain_types[self._tiles[j][i]].getMoveCost())   
+        res_type=self._resource_types[type_id]
 
-    def getMoveCost1D(self):
-        """Returns a list with the move cost of every cell in the map"""
+        return City(type_id, res_type['filename'], res_type['type'],
+        res_type['name'], res_type['amount_per_turn'],
+        res_type['instant_amount'], res_type['conquered_text'],
+        res_type['first_time_text'], x, y, res_type['sld_cost_gold'],
+        res_type['sld_cost_ore'])
 
-        return self._1d_move_cost
+    def onSpotChanged(self, res_obj):
+        """Display again the resource spot. Spots added after the atlas is
+        built get their image from it"""
 
-    def getDimensions(self):
-        """Return the dimensions of the map, in number of cells and in pixels"""
+        if hasattr(self,'_atlas'):
+            res_obj.useAtlas(self._atlas)
+            self._changed_rects.append(res_obj.getRect())
 
-        dim_dict={}
-        dim_dict['num_rows']=self._tiles_y
-        dim_dict['num_cols']=self._tiles_x
-        dim_dict['width']=self._map_rect.width
-        dim_dict['height']=self._map_rect.height
-                    
-        return dim_dict
+    def onCellChanged(self, row, col):
+        """Draw again the terrain of the cell"""
 
-    def getCostBetween2Points(self,(x0,y0),(x1,y1)):
-        """Estimate the movement cost between two points in the map. Coodinates
-        in pixels.
+        self._layer_changed.append((row,col))
 
-        Precondition: both points are either the same corner of two adjacent
-        cells, or the center of two adjacent cells."""
+    def onResourceConquered(self, army_obj, title, text):
+        """Show a dialog with the resource conquered"""
 
-        cell0=self.getCellFromXY(x0,y0)
-        cell1=self.getCellFromXY(x1,y1)
+        gui.widgets[engine.getMapCanvas()].showResConqueredDialog(title,text)
 
-        terrain_id0=self._tiles[cell0['row']][cell0['col']]
-        terrain_id1=self._tiles[cell1['row']][cell1['col']]
-        
-        move_cost0=self._terrain_types[terrain_id0].getMoveCost()
-        move_cost1=self._terrain_types[terrain_id1].getMoveCost()
+    def onCityEntered(self, army_obj, city_obj):
+        """Show the city options button in the right panel"""
 
-        """Normalize the coordinates"""
-        x0=x0/engine.tile_x
-        x1=x1/engine.tile_x
-        y0=y0/engine.tile_y
-        y1=y1/engine.tile_y
+        gui.widgets[engine.getRightPanel()].showCityOptionsButton(city_obj)
 
-        xm = (x0 + x1)/2
-        ym = (y0 + y1)/2
-        
-        mc0 = (((x0-xm))**2+((y0-ym))**2)**(0.5)*move_cost0
-        mc1 = (((xm-x1))**2+((ym-y1))**2)**(0.5)*move_cost1
-        
-        return mc0 + mc1
-
-    def loadResourceTypes(self):
-            """Load text file with resource types information in format:
-
-            type_id,, type,, name,, amount_per_turn,, instant_amount,, 
-             (int)    (str)  (str)        (int)           (int)          
-
-             img_filename,, text_when_conquered, text_first_time
-                (str)              (str)               (str)
-
-            Precondition: type_id values must be unique, considering the
-            cities as well.
-
-            """
-            
-            f = open(self._resource_type_file, 'U')
-            
-            for line in f:
-
-                """read and process each line that has data, and save the info
-                in the dictionary"""
-                if line.rfind(',') != -1:
-
-                    """splits each line into a list"""
-                    sline=line.split(',,')
-                    
-                    """the info is stored in the dictorionary. Whitespaces,
-                    tabs and new lines are removed"""
-                    
-                    self._resource_types[sline[0].strip()]={'type': sline[1].strip(),
-                    'name': sline[2].strip(),'amount_per_turn': int(sline[3].strip()),
-                    'instant_amount': int(sline[4].strip()),
-                    'filename': sline[5].strip(), 'conquered_text': sline[6].strip(),
-                    'first_time_text': sline[7].strip()}
-
-            """close the file"""
-            f.close()
-
-    def loadResourcePos(self):
-            """Load text file with the location of the resource spots, the file
-            is in the format:
-
-            type_id, column_number, row_number
-            (int)         (int)       (int)             
-
-            After loading the file, Resource objects are created to represent
-            these resource spots. The resource spots are an attribute of the
-            Map object.
-            """            
-  
-            f = open(self._resource_pos_file, 'U')
-            
-            for line in f:
-
-                """read and process each line that has data, and save the info
-                in the dictionary"""
-                if line.rfind(',') != -1:
-
-                    """splits each line into a list"""
-                    splitted_line=line.split(',')
-                    
-                    """the info is used to create Resource objects. Whitespaces,
-                    tabs and new lines are removed"""
-                    type_id=splitted_line[0].strip()
-                    col=int(splitted_line[1].strip())
-                    row=int(splitted_line[2].strip())
-
-                    x=col*engine.tile_x
-                    y=row*engine.tile_y
-                    
-                    self._resource_spots[Resource._nextID-1]=Resource(type_id,
-                    self._resource_types[type_id]['filename'],
-                    self._resource_types[type_id]['type'],
-                    self._resource_types[type_id]['name'],
-                    self._resource_types[type_id]['amount_per_turn'],
-                    self._resource_types[type_id]['instant_amount'],
-                    self._resource_types[type_id]['conquered_text'],
-                    self._resource_types[type_id]['first_time_text'],x, y)
-                    
-            """close the file"""
-            f.close()
-
-    def resOnCellXY(self,x,y):
-        """Checks if there is a resource in the map coordinates x,y"""
-
-        army_cell=self.getCellFromXY(x,y)
-
-        for r in self._resource_spots:
-            res_x, res_y = self._resource_spots[r].getPos()
-            res_cell=self.getCellFromXY(res_x,res_y)
-
-            if army_cell == res_cell:
-                return True, self._resource_spots[r].getID()
-
-        return False, None
-
-    def setResourceOwner(self, army_id, army_name, res_id, colour):
-        """Set an owner army to a certain resource spot"""
-
-        self._resource_spots[res_id].setOwner(army_id, army_name, colour)       
-
-    def getResourceOwner(self, res_id):
-        """Get the owner of a resource spot"""
-
-        return self._resource_spots[res_id].getOwner()       
-
-    def getResConqueredText(self, res_id):
-        """Get the text for a dialog box when a resource is conquered"""
-
-        return self._resource_spots[res_id].getConqueredText()
-
-    def payTurnResources(self, army_obj):
-        """Pay the army the end of turn resource amounts according to its owned
-        resource spots"""
-
-        army_id=army_obj.getID()
-        
-        for r in self._resource_spots:
-            owner=self._resource_spots[r].getOwner()        
-
-            if owner==army_id:
-                res_type=self._resource_spots[r].getType()
-                amount=self._resource_spots[r].getTurnAmount()
-                army_obj.updateResource(res_type, amount)
-
-    def getResourceType(self, res_id):
-        """Get the resource type of the specified resource id"""
-
-        return self._resource_spots[res_id].getType()
-
-    def payFirstTimeRes(self, army_obj, res_id):
-        """Pay the army the amount of resources available when conquering
-        a resource. If the resource spot has been conquered before, the
-        resource object will return zero for the resource amount."""
-
-        army_id=army_obj.getID()
-        res_type=self._resource_spots[res_id].getType()
-        amount=self._resource_spots[res_id].payFirstAmount()
-        army_obj.updateResource(res_type, amount)
-
-    def armyOnResource(self,army_obj,res_id):
-        """Method to be called when an army is on a resource spot"""
-
-        owner=self.getResourceOwner(res_id)
-        self.setResourceOwner(army_obj.getID(), army_obj.getName(), res_id,
-            army_obj.getColour())
-        dialog_title, dialog_text=self.getResConqueredText(res_id)
-                    
-        """if the resource was not owned by the army, check for first
-        time reward and show a dialog"""
-        if owner != army_obj.getID():
-            self.payFirstTimeRes(army_obj, res_id)
-            gui.widgets[engine.getMapCanvas()].showResConqueredDialog(
-            dialog_title,dialog_text)
-        
-        if self._resource_spots[res_id].isCity():
-            """if its a city show city options button in the right panel"""
-            gui.widgets[engine.getRightPanel()].showCityOptionsButton(
-                self._resource_spots[res_id])
-        
-
-    def loadCities(self):
-            """Load text file with cities attributes in format:
-
-            type_id,, type,, name,, amount_per_turn,, instant_amount,, 
-             (int)    (str)  (str)        (int)           (int)          
-
-            img_filename,, text_when_conquered,, text_first_time,,
-                (str)              (str)               (str)
-
-            soldier_cost_gold,, soldier_cost_ore
-                (int)               (int)
-
-            Precondition: type_id values must be unique, considering the
-            cities as well.
-            """
-            
-            f = open(self._cities_file, 'U')
-            
-            for line in f:
-
-                """read and process each line that has data, and save the info
-                in the dictionary"""
-                if line.rfind(',') != -1:
-
-                    """splits each line into a list"""
-                    sline=line.split(',,')
-                    
-                    """the info is stored in the dictorionary. Whitespaces,
-                    tabs and new lines are removed"""
-                    
-                    self._resource_types[sline[0].strip()]={'type': sline[1].strip(),
-                    'name': sline[2].strip(),'amount_per_turn': int(sline[3].strip()),
-                    'instant_amount': int(sline[4].strip()),
-                    'filename': sline[5].strip(), 'conquered_text': sline[6].strip(),
-                    'first_time_text': sline[7].strip(),'sld_cost_gold': int(sline[8].strip()),
-                    'sld_cost_ore': int(sline[9].strip())}
-
-            """close the file"""
-            f.close()
-
-    def loadCitiesPos(self):
-            """Load text file with the location of the cities, the file
-            is in the format:
-
-            type_id, column_number, row_number
-            (int)         (int)       (int)             
-
-            After loading the file, City objects are created.
-            Cities are an attribute of the Map object.
-            """            
-  
-            f = open(self._cities_pos_file, 'U')
-            
-            for line in f:
-
-                """read and process each line that has data, and save the info
-                in the dictionary"""
-                if line.rfind(',') != -1:
-
-                    """splits each line into a list"""
-                    splitted_line=line.split(',')
-                    
-                    """the info is used to create City objects. Whitespaces,
-                    tabs and new lines are removed"""
-                    type_id=splitted_line[0].strip()
-                    col=int(splitted_line[1].strip())
-                    row=int(splitted_line[2].strip())
-
-                    x=col*engine.tile_x
-                    y=row*engine.tile_y
-
-                    self._resource_spots[Resource._nextID-1]=City(type_id,
-                    self._resource_types[type_id]['filename'],
-                    self._resource_types[type_id]['type'],
-                    self._resource_types[type_id]['name'],
-                    self._resource_types[type_id]['amount_per_turn'],
-                    self._resource_types[type_id]['instant_amount'],
-                    self._resource_types[type_id]['conquered_text'],
-                    self._resource_types[type_id]['first_time_text'],x, y,
-                    self._resource_types[type_id]['sld_cost_gold'],
-                    self._resource_types[type_id]['sld_cost_ore'])
-                    
-            """close the file"""
-            f.close()
-
-    def getResourceObj(self, res_id):
-        """Get the resource object with id "res_id". Precondition: the id refers
-        to an existing resource object in the map"""
-
-        return self._resource_spots[res_id]
 
-        
-engine=EngineObject()    
-
-class Army(SpriteObj):
+class Army(ArmyModel, SpriteObj):
     """Superclass for the armies in the game. An army is represented bu a
     SpriteObj object displayed in the map, which has several attributes
-    that define its current state and behaviour.    
+    that define its current state and behaviour, see ArmyModel.
     """
-
-    _next_ID=1
     
     def __init__(self, filename, army_name, x0, y0, start_time, colour, map_obj,
     food=100,gold=50,ore=50,gems=50,soldiers=10):
         """Initialize the common attributes to all Army subclasses"""
         
-        SpriteObj.__init__(self, filename)
-        self._id=Army._next_ID
-        Army._next_ID+=1
-        self._name=army_name
-        self._x=x0
-        self._y=y0
-        self._w=engine.tile_x
-        self._h=engine.tile_y
-        self._colour=colour
-        self._map_obj=map_obj
-        
-        self._moves_per_turn=float(10)
-        self._moves_left=self._moves_per_turn
-
-        self._current_time=start_time
-        self._speed = 2
-        
-        self._resources={'food':food,'gold':gold,'ore':ore, 'gems':gems}
-                
-        self._soldiers=soldiers
-
-        """Initialize map visibility"""
-        self.initializeVisibility(self._map_obj)
-        
-    def walk(self,dx,dy,map_obj):
-        """Evaluate if it is possible to move the army a vector distance (dx,dy)
-        in pixels from its current position. dx, dy go in the same direction as
-        the coordinates of the map surface, which are positive going down and
-        right"""
-        
-        if map_obj.getIsWalkable(self.rect.right-1+dx,self.rect.top+dy):            
-            if map_obj.getIsWalkable(self.rect.right-1+dx,self.rect.bottom-1+dy):
-                if map_obj.getIsWalkable(self.rect.left+dx,self.rect.top+dy):
-                    if map_obj.getIsWalkable(self.rect.left+dx,
-                    self.rect.bottom-1+dy):
-                        
-                        self.move(self._x+dx,self._y+dy)
-
-    def move(self,x1,y1):
-        """Move the army to the position (x1,y1). This coordinates are pixel
-        coordinates of the MapCanvas gui element."""
-        
-        self._x=x1
-        self._y=y1
-    
-    def display(self,surface):
-        """Draw the Army in the destination surface"""
-        
-        self.rect.x=self._x
-        self.rect.y=self._y
-        surface.set_colorkey((255,0,255))
-        surface.blit(self.image, self.rect)
-
-    def getMovesLeft(self):
-        """Get the number of moves the army has left for the turn"""
-        
-        return self._moves_left
-
-    def getID(self):
-        """Get the army's ID"""
-        
-        return self._id
-
-    def updateResource(self, res_type, amount):
-        """Update the specified resource type in 'amount' units"""
-
-        self._resources[res_type]+=amount
-
-    def getResources(self):
-        """Get the resource amounts"""
-
-        return self._resources
+        self.initDisplay(filename)
+        ArmyModel.__init__(self, army_name, x0, y0, start_time, colour,
+        map_obj, food,gold,ore,gems,soldiers)
 
-    def getSoldiers(self):
-        """Get the amount of soldiers"""
+    def initDisplay(self, filename):
+        """Initialize the image of the army and the state of its display"""
 
-        return self._soldiers
+        SpriteObj.__init__(self, filename)
 
-    def initializeVisibility(self, map_obj):
-        """Initialize the army's visibility of the game map"""
+        """rects of the map surface drawn in the last display, and the draw
+        state they were drawn with. _view_offset is the map pixel at the
+        upper left corner of the surface"""
+        self._drawn_rects=[]
+        self._drawn_state=None
+        self._view_offset=(0,0)
+    
+    def display(self,surface,dirty_rects=None,queue=None,camera=None):
+        """Draw the Army in the destination surface and return the list of
+        rects of the surface that changed.
 
-        self._cell_visibility=[]
-        map_dims = map_obj.getDimensions()
+        dirty_rects are the rects of the surface drawn again by the map in this
+        frame. If given, the army is only drawn when its draw state changed or
+        when it overlaps them.
 
-        for i in range(0,map_dims['num_rows']):
-            self._cell_visibility.append([])
-            for j in range(0,map_dims['num_cols']):
-                self._cell_visibility[i].append(0)
+        If queue is given, a RenderQueue with the RENDER_LAYERS, the army is
+        added to its 'armies' layer to be drawn by the caller. If camera is
+        given, the surface shows the camera's view of the map."""
 
-        self.updateVisibility(map_obj)
+        if camera is None:
+            self._view_offset=(0,0)
+        else:
+            self._view_offset=camera.getOffset()
 
-    def update(self, clock, map_obj):
-        """Updates Army's attributes. Called in every game loop."""
+        state=self.getDrawState()
 
-        delta_t = clock - self._current_time
-        self._current_time = clock        
+        if dirty_rects is not None and state==self._drawn_state:
+            for r in self._drawn_rects:
+                if r.collidelist(dirty_rects)!=-1:
+                    break
+            else:
+                return []
 
-    def updateVisibility(self, map_obj):
-        """Update the army's visibility according to its current location"""
+        rects=[]
+        if state!=self._drawn_state:
+            rects=self._drawn_rects
 
-        current_cell=map_obj.getCellFromXY(self._x,self._y)
+        self._drawn_rects=self.draw(surface,queue)
+        self._drawn_state=state
 
-        self._cell_visibility[current_cell['row']][current_cell['col']]=1
+        return rects+self._drawn_rects
 
-        first_row=current_cell['row']==0
-        last_row=current_cell['row']==len(self._cell_visibility)-1
-        first_col=current_cell['col']==0
-        last_col=current_cell['col']==len(self._cell_visibility[0])-1
+    def draw(self,surface,queue=None):
+        """Draw the Army in the destination surface, or add it to the
+        'armies' layer of queue if given. The list of rects drawn is
+        returned"""
         
-        if not(first_row):
-            self._cell_visibility[current_cell['row']-1][current_cell['col']]=1
-
-        if not(last_row):
-            self._cell_visibility[current_cell['row']+1][current_cell['col']]=1
-
-        if not(first_col):
-            self._cell_visibility[current_cell['row']][current_cell['col']-1]=1
-
-        if not(last_col):
-            self._cell_visibility[current_cell['row']][current_cell['col']+1]=1
+        self.rect.x=self._x-self._view_offset[0]
+        self.rect.y=self._y-self._view_offset[1]
+        surface.set_colorkey((255,0,255))
 
-        if not(first_row) and not(first_col):
-            self._cell_visibility[current_cell['row']-1][current_cell['col']-1]=1
+        if queue is None:
+            surface.blit(self.image, self.rect)
+        else:
+            queue.add('armies',self.image,self.rect.topleft)
 
-        if not(first_row) and not(last_col):
-            self._cell_visibility[current_cell['row']-1][current_cell['col']+1]=1
+        return [pygame.Rect(self.rect)]
 
-        if not(last_row) and not(first_col):
-            self._cell_visibility[current_cell['row']+1][current_cell['col']-1]=1
+    def getDrawState(self):
+        """Return the values that define how the army looks on the map. The
+        army is only drawn again when they change"""
 
-        if not(last_row) and not(last_col):
-            self._cell_visibility[current_cell['row']+1][current_cell['col']+1]=1
+        return (self._x,self._y,self._view_offset)
 
-    def getCellVisibility(self):
-        """Return the cell visibility matrix"""
-        return self._cell_visibility
+    def getStaleRects(self):
+        """Return the rects drawn in the last display if the army has to be
+        drawn differently, so that the map can draw them again"""
 
-    def getColour(self):
-        """Return the army's colour"""
-        return self._colour
+        if self.getDrawState()!=self._drawn_state:
+            return self._drawn_rects
 
-    def updateSoldiers(self,amount):
-        """Update the amount of soldiers"""
+        return []
 
-        self._soldiers += amount
+    def getMapRect(self):
+        """Get the rect of the map covered by the army"""
 
-    def getName(self):
-        """Get the name of the army"""
-        return self._name
-       
+        return pygame.Rect(self._x,self._y,self._w,self._h)
        
 
-class Player(Army):
+class Player(PlayerModel, Army):
     """This class represents the army controlled by the player. It inherits the
-    attributes of its super class Army, but handles the user input."""
+    attributes of its super classes PlayerModel and Army, but handles the
+    user input."""
     
     def __init__(self, filename, army_name, x0, y0, start_time, colour, map_obj,
     food=100,gold=50,ore=50,gems=10,soldiers=10):    
         """Initialize the Player object"""
 
-        Army.__init__(self, filename, army_name, x0, y0, start_time, colour,
+        self.initDisplay(filename)
+        PlayerModel.__init__(self, army_name, x0, y0, start_time, colour,
         map_obj, food,gold,ore,gems,soldiers)
-        
-        self._path = Path()
-        self._is_moving=False
-        self._dir_x=0
-        self._dir_y=0
-        self._dest_x=None
-        self._dest_y=None
-        self._pathpoints=[]        
-        
-    def __str__(self):
-        """Return a string with information of the object"""
-        return army_name
 
     def handleKeyboard(self,key_event,map_obj):
         """Handle user keyboard input"""
         pass
 
 
-    def setPath(self,(x,y),map_obj):
-        """Obtain the path from the player's current position to a destination
-        point (x,y), in pixel coordinates of the map surface, using the A*
-        algorithm from the satar_modif file."""
+    def draw(self,surface,queue=None):
+        """Draw the Player in the destination surface, path lines will be
+        displayed if available. If queue is given, the player and then its
+        path are added to the 'armies' layer. The list of rects drawn is
+        returned."""
         
-        """prepare parameters for the satar_modif object"""
-        map_cost_1d = map_obj.getMoveCost1D()
-        dest_cell = map_obj.getCellFromXY(x,y)
-        current_cell = map_obj.getCellFromXY(self._x,self._y)                    
-        map_dims=map_obj.getDimensions()
-
-        if dest_cell != current_cell:
-            """setup the satar_modif object"""
-            astar = satar_modif.AStar(satar_modif.SQ_MapHandler(map_cost_1d,
-            map_dims['num_cols']-1,map_dims['num_rows']-1))
-            
-            start = satar_modif.SQ_Location(current_cell['col'],
-            current_cell['row'])
-
-            end = satar_modif.SQ_Location(dest_cell['col'],dest_cell['row'])
-
-            """find the path and convert the resulting nodes to pixels"""
-            p = astar.findPath(start,end)
-
-            if not p:
-                self._path.reset()
-                
-            else:
-                self._pathpoints = []
-                self._pathpoints.append((start.x*engine.tile_x+self._w/2,
-                start.y*engine.tile_y+self._h/2))
-
-                for n in p.nodes:
-                    self._pathpoints.append((
-                    n.location.x*engine.tile_x+self._w/2,
-                    n.location.y*engine.tile_y+self._h/2))
-                
-                """update the Path attribute"""                
-                self._path.update(self._pathpoints,self._moves_left,map_obj)
+        self.rect.x=self._x-self._view_offset[0]
+        self.rect.y=self._y-self._view_offset[1]
+        offset=(-self._view_offset[0],-self._view_offset[1])
 
-        else:
-            self._path.reset()
-    
-    def display(self,surface):
-        """Draw the Player in the destination surface, path lines will be
-        displayed if available."""
+        if queue is None:
+            surface.blit(self.image, self.rect)
+            return [pygame.Rect(self.rect)]+self._path.draw(surface, self,
+            offset)
+
+        queue.add('armies',self.image,self.rect.topleft)
+        queue.addDraw('armies',lambda surf: self._path.draw(surf, self,
+        offset))
+
+        return [pygame.Rect(self.rect)]+self._path.getRects(self,offset)
+
+    def getDrawState(self):
+        """Return the values that define how the player and its path look on
+        the map"""
+
+        return (self._x,self._y,self._view_offset,self._path.getDrawState())
+
+    def newPath(self):
+        """Create the Path object, which displays the path"""
+
+        return Path()
+
+    def onMoving(self):
+        """Update temporary gui elements, the city options button is closed
+        when the player leaves the city"""
+
+        gui.widgets[engine.getRightPanel()].closeCityOptionsButton()
+
+    def onNewTurn(self):
+        """Give the focus back to the map canvas"""
+
+        gui.setFocus(engine.getMapCanvas())
         
-        self.rect.x=self._x
-        self.rect.y=self._y
-        surface.blit(self.image, self.rect)
-        self._path.draw(surface, self)
 
-    def update(self, clock, map_obj):
-        """Updates Player's attributes. Called in every game loop."""
+class Camera():
+    """The part of the map that is displayed, a rect of width x height pixels
+    of the map moved to the position (x,y). The camera is kept inside the
+    map, unless the map is smaller than the view."""
 
-        Army.update(self,clock,map_obj)      
+    def __init__(self,width,height,map_width,map_height):
+        """Initialize the Camera object at the upper left corner of a map of
+        map_width x map_height pixels"""
 
-        if self._is_moving:
-            """update position"""
-            self._x +=self._speed * self._dir_x
-            self._y +=self._speed * self._dir_y
+        self._x=0
+        self._y=0
+        self._map_width=map_width
+        self._map_height=map_height
+        self.setSize(width,height)
 
-            """update temporary gui elements"""
-            """if its a city show city options button in the right panel"""
-            gui.widgets[engine.getRightPanel()].closeCityOptionsButton()
+    def setSize(self,width,height):
+        """Set the size of the view in pixels"""
 
-            """when the next cell is reached, the path is updated and a
-            checking is performed to see if the final cell of the path has
-            been reached"""
-            if self._x == self._dest_x and self._y == self._dest_y:
+        self._width=width
+        self._height=height
+        self.moveTo(self._x,self._y)
 
-                self._moves_left-=self._current_move_cost
-                
-                self._x = self._dest_x
-                self._y = self._dest_y
-                self._dir_x=0
-                self._dir_y=0
-
-                current_cell=map_obj.getCellFromXY(self._x,self._y)
-                final_destination=self._path.getFinalPoint()
-                final_cell=map_obj.getCellFromXY(final_destination[0],
-                final_destination[1])
-
-                """update visibility"""
-                self.updateVisibility(map_obj)
-
-                """collition detection with resource spots is performed"""
-                result, resource_id = map_obj.resOnCellXY(self._x,
-                self._y)
-
-                if result:
-                    
-                    """call the armyOnResource method of the resource"""
-                    map_obj.armyOnResource(self,resource_id)
-                    
-                """if the army reached its final destination, stop moving"""
-                if current_cell == final_cell:
-                    self._is_moving=False
-                    self._path.reset()
-
-                else:
-                    self.setPath((final_destination[0],final_destination[1]),
-                    map_obj)
-
-                    self.setMovingPath(map_obj)          
-   
+    def getSize(self):
+        """Get the size of the view in pixels"""
 
-    def destinationCircleClicked(self,(x,y), map_obj):
-        """Test if the destination circle of the path was clicked, in case
-        there is a path displayed on the screen"""
+        return (self._width,self._height)
 
-        if self._path.pathDisplayed():
-            dest_circle_xy=self._path.getDestCircleCoordinates()
+    def moveTo(self,x,y):
+        """Move the upper left corner of the view to the map pixel (x,y)"""
 
-            clicked_cell = map_obj.getCellFromXY(x,y)
-            circle_cell = map_obj.getCellFromXY(dest_circle_xy[0],
-            dest_circle_xy[1])
+        self._x=max(0,min(x,self._map_width-self._width))
+        self._y=max(0,min(y,self._map_height-self._height))
 
-            if clicked_cell == circle_cell:
-                return True
+    def scrollBy(self,dx,dy):
+        """Move the view dx, dy pixels"""
 
-            else:
-                return False
-        else:
-            return False
+        self.moveTo(self._x+dx,self._y+dy)
 
-    def setMovingPath(self, map_obj):
-        """Set the Army to follow the current path if there are moves left
-        on the current turn."""
-        
-        next_point=self._path.getNextPoint()
-        destination=map_obj.getCellCoordFromXY(next_point[0],next_point[1])
-             
-        """check if the user can move in the present turn"""
-        move_cost=map_obj.getCostBetween2Points((self._x,self._y),
-        (destination[0],destination[1]))
-
-        if self._moves_left - move_cost >= 0:
-
-            self._current_move_cost=move_cost
-            self._is_moving=True
-            
-            self._dest_x=destination[0]
-            self._dest_y=destination[1]
-            
-            current_cell = map_obj.getCellFromXY(self._x,self._y)
-            dest_cell = map_obj.getCellFromXY(self._dest_x,self._dest_y)
-            
-            if dest_cell['col']-current_cell['col'] < 0:
-                self._dir_x=-1
-                
-            elif dest_cell['col']-current_cell['col'] == 0:
-                self._dir_x=0
+    def centerOn(self,x,y):
+        """Move the view so that the map pixel (x,y) is at its center"""
 
-            elif dest_cell['col']-current_cell['col'] > 0:
-                self._dir_x=1
+        self.moveTo(x-self._width/2,y-self._height/2)
 
-            if dest_cell['row']-current_cell['row'] < 0:
-                self._dir_y=-1
-                
-            elif dest_cell['row']-current_cell['row'] == 0:
-                self._dir_y=0
+    def keepInView(self,rect,margin=0):
+        """Move the view the least possible so that a rect of the map, with
+        margin pixels around it, is inside the view"""
 
-            elif dest_cell['row']-current_cell['row'] > 0:
-                self._dir_y=1
+        area=pygame.Rect(rect).inflate(margin*2,margin*2)
+        x=self._x
+        y=self._y
 
-        else:
-            self._is_moving=False
+        if area.left<x:
+            x=area.left
+        elif area.right>x+self._width:
+            x=area.right-self._width
 
-    def isMoving(self):
-        """Return if the player is currently moving"""
+        if area.top<y:
+            y=area.top
+        elif area.bottom>y+self._height:
+            y=area.bottom-self._height
 
-        return self._is_moving
+        self.moveTo(x,y)
 
-    def newTurn(self,map_obj):
-        """Actions to be performed when the turn is over"""
+    def getOffset(self):
+        """Get the map pixel at the upper left corner of the view"""
 
-        self._moves_left = self._moves_per_turn
-        self.update(pygame.time.get_ticks(),map_obj)
+        return (self._x,self._y)
 
-        if self._path.pathDisplayed():
-            self.setPath(self._path.getFinalPoint(),map_obj)
-        map_obj.payTurnResources(self)
-        gui.setFocus(engine.getMapCanvas())
+    def getRect(self):
+        """Get the rect of the map in the view"""
 
-    def buySoldiers(self, num_sold, city_obj):
-        """Try to buy soldiers depending on the cost of the soldiers,
-        the quantity, and the available resources"""
+        return pygame.Rect(self._x,self._y,self._width,self._height)
 
-        cost_gold, cost_ore = city_obj.getSoldierPrice()
+    def toMap(self,(x,y)):
+        """Convert a point of the view to map coordinates"""
 
-        tot_cost_gold=cost_gold*num_sold
-        tot_cost_ore=cost_ore*num_sold
+        return (x+self._x,y+self._y)
 
-        res=self.getResources()
-        
-        if tot_cost_gold > res['gold'] or tot_cost_ore > res['ore']:
-            return False
+    def toView(self,(x,y)):
+        """Convert a point of the map to view coordinates"""
+
+        return (x-self._x,y-self._y)
+
+    def getCellWindow(self,tile_x,tile_y):
+        """Return the (column,row,width,height) rectangle of the cells of
+        tile_x x tile_y pixels that are at least partly in the view, and
+        inside the map"""
+
+        first_col=self._x/tile_x
+        first_row=self._y/tile_y
+        last_col=min(self._x+self._width-1,self._map_width-1)/tile_x
+        last_row=min(self._y+self._height-1,self._map_height-1)/tile_y
+
+        return (first_col,first_row,max(last_col-first_col+1,0),
+        max(last_row-first_row+1,0))
 
-        else:
-            self.updateSoldiers(num_sold)
-            self.updateResource('gold',-tot_cost_gold)
-            self.updateResource('ore',-tot_cost_ore)
-            return True
-        
 
 class Polyline():
     """Represents a sequence of lines to be displayed on a surface"""
@@ -1053,18 +605,39 @@ class Polyline():
 
         self._points=points
         self._colour=colour
+        self._width=3
    
     def update(self,points):
         """Update the attributes of the Polyline object"""
 
         self._points=points
              
-    def draw(self,surf):
+    def draw(self,surf,offset=(0,0)):
         """Draw the polyline in the destination surface using
-        python.draw.aalines"""
+        python.draw.aalines, moved offset pixels. The rects covered by each
+        line are returned."""
         
         if len(self._points)>1:
-            pygame.draw.lines(surf, self._colour, False, self._points, 3)
+            pygame.draw.lines(surf, self._colour, False, [(x+offset[0],
+            y+offset[1]) for (x,y) in self._points], self._width)
+
+        return self.getRects(offset)
+
+    def getRects(self,offset=(0,0)):
+        """Return the rects covered by each line when drawn moved offset
+        pixels"""
+
+        rects=[]
+
+        if len(self._points)>1:
+            for k in range(len(self._points)-1):
+                (x0,y0)=self._points[k]
+                (x1,y1)=self._points[k+1]
+                rect=pygame.Rect(min(x0,x1)+offset[0],min(y0,y1)+offset[1],
+                abs(x1-x0)+1,abs(y1-y0)+1)
+                rects.append(rect.inflate(self._width*2+2,self._width*2+2))
+
+        return rects
 
     def reset(self):
         """Resets the Polyline so it wont be displayed"""
@@ -1076,6 +649,11 @@ class Polyline():
         
         return len(self._points)
 
+    def getPoints(self):
+        """Get the points of the polyline"""
+
+        return self._points
+
     def changeSinglePoint(self,pos,x_new,y_new):
         """Change a single point withing the line, located in the position
         pos"""
@@ -1083,7 +661,7 @@ class Polyline():
         if len(self._points)>0:
             self._points[pos]=(x_new, y_new)
 
-class Path():
+class Path(PathModel):
     """Represents the visual path from the player's current position to a
     destination cell. It is composed of a green polyline representing the
     part of the path that can be completed in the current turn, a red
@@ -1093,176 +671,130 @@ class Path():
     def __init__(self):
         """Initialize the Path objects"""
 
+        PathModel.__init__(self)
+
         self._blue=(0,102,204)
         self._red=(237,0,0)
         self._blueline = Polyline([],self._blue)
         self._redline = Polyline([],self._red)
-        self._circle_drawn=False
-        self._circle_pos=[]
-        self._points=[]
-        self._drawing_points=[]
                 
-    def update(self, points, moves_left, map_obj):
-        """Update the path to a new destination. This is done by obtaining
-        the sections of the path that can be done in the current turn."""
+    def update(self, points, moves_left, map_obj, reach=None):
+        """Update the path to a new destination, see PathModel.update, and
+        the polylines"""
 
-        self.reset()
+        PathModel.update(self, points, moves_left, map_obj, reach)
         
-        self._points=points
-        self._bluepoints=[points[0]]
-        self._redpoints=[]
-                
-        accum_cost = 0
-        i=0
+        self._blueline.update(self._bluepoints)
+        self._redline.update(self._redpoints)        
 
-        while (accum_cost <= moves_left) and (i<len(points)-1):
-            next_move=map_obj.getCostBetween2Points(points[i],points[i+1])
+    def advance(self):
+        """Remove the first point of the path, and update the polylines"""
+
+        PathModel.advance(self)
 
-            if (moves_left - next_move - accum_cost) >= 0:                
-                self._bluepoints.append(points[i+1])
-                accum_cost += map_obj.getCostBetween2Points(points[i],
-                points[i+1])
-                
-            else:
-                break
-            i+=1
-
-        if i<(len(points)-1):
-            self._redpoints=[points[i]]
-            while i<(len(points)-1):
-                self._redpoints.append(points[i+1])
-                i+=1
-        
         self._blueline.update(self._bluepoints)
         self._redline.update(self._redpoints)        
         
-    def draw(self,surf,army_obj):
+    def draw(self,surf,army_obj,offset=(0,0)):
         """Draw the polylines and destination circle in the surface using
-        pygame draw methods. The first point of the blue line is updated
-        at the game frame rate so to that the path is always drawn from
-        the army's current position."""         
+        pygame draw methods, moved offset pixels. The first point of the
+        blue line is updated at the game frame rate so to that the path is
+        always drawn from the army's current position. The list of rects
+        drawn is returned."""         
 
-        if self._blueline.getNumPoints()>1:
+        self.followArmy(army_obj)
 
-            self._blueline.changeSinglePoint(0,army_obj._x+engine.tile_x/2,
-            army_obj._y+engine.tile_y/2)
+        (final_x,final_y)=(0,0)
+        if self._points:
+            (final_x,final_y)=self._points[len(self._points)-1]
+        final=(final_x+offset[0],final_y+offset[1])
 
-            self._blueline.draw(surf)            
+        if self._blueline.getNumPoints()>1:
+            self._blueline.draw(surf,offset)            
                 
         if self._redline.getNumPoints()>1:                
-            self._redline.draw(surf)       
-            pygame.draw.circle(surf, self._red, self._points[len(
-            self._points)-1], engine.tile_x/4)
-
-            self._circle_drawn=True
-            self._circle_pos=self._points[len(self._points)-1]
+            self._redline.draw(surf,offset)       
+            pygame.draw.circle(surf, self._red, final, engine.tile_x/4)
                 
         elif self._redline.getNumPoints()<1 and self._blueline.getNumPoints()>1:
 
-            pygame.draw.circle(surf, self._blue, self._points[len(
-            self._points)-1], engine.tile_x/4)
+            pygame.draw.circle(surf, self._blue, final, engine.tile_x/4)
+
+        return self.getRects(army_obj,offset)
+
+    def followArmy(self,army_obj):
+        """Move the first point of the blue line to the army's current
+        position"""
+
+        if self._blueline.getNumPoints()>1:
+            self._blueline.changeSinglePoint(0,army_obj._x+engine.tile_x/2,
+            army_obj._y+engine.tile_y/2)
+
+    def getRects(self,army_obj,offset=(0,0)):
+        """Return the rects covered by the polylines and the destination
+        circle when the path is drawn for army_obj moved offset pixels,
+        without drawing it"""
+
+        self.followArmy(army_obj)
+
+        rects=self._blueline.getRects(offset)+self._redline.getRects(offset)
+
+        if self._redline.getNumPoints()>1 or self._blueline.getNumPoints()>1:
+            (x,y)=self._points[len(self._points)-1]
+            x+=offset[0]
+            y+=offset[1]
+            radius=engine.tile_x/4
+            rects.append(pygame.Rect(x-radius,y-radius,radius*2+1,
+            radius*2+1).inflate(4,4))
 
-            self._circle_drawn=True
-            self._circle_pos=self._points[len(self._points)-1]                
+        return rects
                 
     def reset(self):
         """Resets the Polyline so it wont be displayed"""
-        self._bluepoints=[]
+
+        PathModel.reset(self)
         self._blueline.reset()
-        self._redpoints=[]
         self._redline.reset()
-        self._circle_drawn=False
-        self._circle_pos=[]
-        self._drawing_points=[]
-
-    def pathDisplayed(self):
-        """Return if there is a path displayed on the screen"""
-        
-        return self._circle_drawn
-
-    def getDestCircleCoordinates(self):
-        """Get the coordinates of the destination circle"""
-
-        return self._circle_pos
-
-    def getNextPoint(self):
-        """Get the coordinates of the closest point to the current positon
-        of the Army"""
 
-        return self._points[1]
+    def getDrawState(self):
+        """Return the values that define how the path looks. The first point
+        of the blue line is left out since it follows the army."""
 
-    def getFinalPoint(self):
-        """Get the last point of the path"""
+        if self._points:
+            final=self._points[len(self._points)-1]
+        else:
+            final=None
 
-        return self._points[len(self._points)-1]
+        return (tuple(self._blueline.getPoints()[1:]),
+        tuple(self._redline.getPoints()),final)
 
 
-class Resource(SpriteObj):
-    """Represents a resource spot. A resource spot can be owned by an army. If
-    owned, it will give the army a certain amount of the resource at the end of
-    every turn."""
+class Resource(ResourceModel, SpriteObj):
+    """Represents a resource spot, see ResourceModel, displayed in the map
+    with its image and the flag of its owner."""
 
-    _nextID=1
+    """owner flags already drawn, keyed by (owner colour, width, height)"""
+    _flag_cache={}
 
     def __init__(self, type_id, filename, resource_type, resource_name,
     amount_per_turn, instant_amount, conquered_text, first_time_txt,x, y):
         """Initialize the Resource object. This is done from the Map object"""
 
         SpriteObj.__init__(self, filename)
-        self._type_id = type_id
-        self._type = resource_type
-        self._name = resource_name
-        self._turn_amount = randint(int(0.6*amount_per_turn),
-        int(1.4*amount_per_turn))
-
-        self._instant_amount = randint(int(0.5*instant_amount),
-        int(1.5*instant_amount))
+        ResourceModel.__init__(self, type_id, resource_type, resource_name,
+        amount_per_turn, instant_amount, conquered_text, first_time_txt,x, y)
 
-        self._conquered_text=conquered_text
-        self._first_time_txt=first_time_txt
-        
-        self._x=x
-        self._y=y
         self.rect.x=x
         self.rect.y=y
-        self._owner = None
-        self._owner_name = None
-        self._id = Resource._nextID
-        Resource._nextID += 1
-
-        self._is_city=False
-
-        """Owners flagpole properties. the flag is composed of a rectangle
-        for the flag itself, and a rectangle for the pole. The coordinates
-        of both rectangles are the upper left corners"""
-        self._xflag=self._x+2
-        self._yflag=self._y+engine.tile_y/8
-        self._wflag=engine.tile_x/3
-        self._hflag=engine.tile_y/4
-
-        self._xpole=self._xflag+self._wflag
-        self._ypole=self._yflag
-        self._wpole=2
-        self._hpole=engine.tile_y*2/3
-        self._pole_colour=(90,90,90)
-
-        self._flag_rect=pygame.Rect(self._xflag,self._yflag,self._wflag,
-        self._hflag)
-
-        self._pole_rect=pygame.Rect(self._xpole,self._ypole,self._wpole,
-        self._hpole)
+
+        """the owner's flag is drawn on top of the resource, see getFlag"""
+        self._flag=None
         
     def setOwner(self, army_id, army_name, colour):
-        """Set the owner of the resource"""
+        """Set the owner of the resource and its flag"""
 
-        self._owner = army_id
-        self._owner_name = army_name
-        self._owner_colour = colour
-
-    def getOwner(self):
-        """Get the owner of the resource"""
-
-        return self._owner, self._owner_name
+        ResourceModel.setOwner(self, army_id, army_name, colour)
+        self._flag = self.getFlag(colour)
 
     def display(self, surf):
         """Draw the image on the specified surface. If the resource is owned,
@@ -1271,66 +803,58 @@ class Resource(SpriteObj):
         SpriteObj.display(self,self._x,self._y,surf)
 
         if self._owner:
-            pygame.draw.rect(surf, self._owner_colour, self._flag_rect, 0)
-            pygame.draw.rect(surf, self._pole_colour, self._pole_rect, 0)
-                        
-
-    def getPos(self):
-        """Get the pixel coordinates of the Resource"""
-        return self._x, self._y
-
-    def getID(self):
-        """Return the id attribute"""
-        return self._id
-
-    def getConqueredText(self):
-        """Return a string to be displayed when the Resource is conquered"""
-
-        text=self._conquered_text
+            surf.blit(self._flag, (self._x,self._y))
 
-        if not(self._owner):
-            text=text + ' ' + self._first_time_txt
+    def addBlits(self, queue, clip=None, offset=(0,0)):
+        """Add the image to the 'resources' layer of a RenderQueue, and the
+        owner's flag to the 'flags' layer. offset is added to the position
+        of the resource, and only the part inside the clip rect is drawn,
+        if given."""
 
-        """replace keywords by attribute values"""
-        text=text.replace('_TURN_AMOUNT',str(self._turn_amount))
-        text=text.replace('_RESOURCE',str(self._type))
-        text=text.replace('_INSTANT_AMOUNT',str(self._instant_amount))
-                     
-        return self._name, text
+        x=self._x+offset[0]
+        y=self._y+offset[1]
 
-    def getType(self):
-        """Get the resource type"""
+        (source,dest,area)=self.getBlit(x,y)
+        queue.add('resources',source,dest,area,clip)
 
-        return self._type
-
-    def getTurnAmount(self):
-        """Get the amount of resource to be paid at the end of every turn"""
+        if self._owner:
+            queue.add('flags',self._flag,(x,y),None,clip)
 
-        return self._turn_amount
+    def getFlag(self, colour):
+        """Return a tile sized Surface with a flag of the colour drawn on it.
+        The flag is composed of a rectangle for the flag itself, and a
+        rectangle for the pole, the rest of the Surface is transparent. The
+        flags are kept in _flag_cache and shared by all the resources."""
 
-    def payFirstAmount(self):
-        """Get the amount of resource to be paid to the first army that owns
-        the resource spot."""
+        key=(colour,engine.tile_x,engine.tile_y)
+        flag=Resource._flag_cache.get(key)
 
-        first_payment = self._instant_amount
-        self._instant_amount = 0  
-        return first_payment
+        if flag is None:
+            flag=pygame.Surface((engine.tile_x,engine.tile_y))
+            flag.fill((255,0,255))
+            flag.set_colorkey((255,0,255))
 
-    def isCity(self):
-        """Check if the resource is a city or not"""
+            xflag=2
+            yflag=engine.tile_y/8
+            wflag=engine.tile_x/3
+            hflag=engine.tile_y/4
+            pole_colour=(90,90,90)
 
-        return self._is_city
+            pygame.draw.rect(flag, colour, pygame.Rect(xflag,yflag,wflag,
+            hflag), 0)
+            pygame.draw.rect(flag, pole_colour, pygame.Rect(xflag+wflag,yflag,
+            2,engine.tile_y*2/3), 0)
 
-    def getName(self):
-        """Get the name of the resource"""
+            Resource._flag_cache[key]=flag
 
-        return self._name
+        return flag
 
-class City(Resource):
-    """Represents a city. Cities have the same behaviour as resource spots,
-    but they also offer the option to buy soldiers."""
+    def getRect(self):
+        """Get the rect covered by the Resource when displayed"""
+        return pygame.Rect(self._x,self._y,self.rect.width,self.rect.height)
 
-    _nextID=1
+class City(CityModel, Resource):
+    """Represents a city, see CityModel, displayed like a resource spot."""
 
     def __init__(self, type_id, filename, resource_type, name,
     amount_per_turn, instant_amount, conquered_text, first_time_txt,x, y,
@@ -1341,12 +865,4 @@ class City(Resource):
         Resource.__init__(self, type_id, filename, resource_type, name,
         amount_per_turn, instant_amount, conquered_text, first_time_txt,x, y)
 
-        self._is_city=True
-        
-        self._price_gold=price_gold
-        self._price_ore=price_ore
-
-    def getSoldierPrice(self):
-        """Get the price of one soldier"""
-
-        return self._price_gold, self._price_ore        
+        self.initCity(price_gold, price_ore)
@@ -46,6 +46,7 @@ from gui_lib import *
 def main():
     """Main function of the GUI example"""
     
+    screen=get_screen()
     pygame.display.set_caption('GUI Example')
 
     """Create widgets by adding them to the GUI object"""
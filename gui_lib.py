@@ -46,15 +46,24 @@
 #   Widgets in the program.
 #
 #   Other classes in this file: Dialog, Button, TextWidget, ImageWidget,
-#   TextInput, SpriteObj (extended version of pygame Sprite class).
+#   TextInput, SpriteObj (extended version of pygame Sprite class), FontManager
+#   (fonts shared by all the widgets), ImageCache (images shared by all the
+#   SpriteObj objects), TextureAtlas (several images packed in one Surface),
+#   RenderQueue (blits of a frame drawn together, layer by layer),
+#   StartupTimer (time spent in each phase of the start of the application).
+#
+#   Importing this file doesn't open the window. The display, the fonts and
+#   the sound mixer are initialized the first time they are used, see
+#   get_screen, init_fonts and init_mixer.
 #
 ################################################################################
 
-import sys, pygame
-pygame.init()
+import sys, pygame, time
 
 size = width, height = 1024,768
-screen = pygame.display.set_mode(size)
+
+"""the display Surface, created by get_screen"""
+screen = None
 black = 0, 0, 0
 yellow = 255, 255, 120
 
@@ -62,6 +71,12 @@ MOUSE_RIGHT=(0,0,1)
 MOUSE_LEFT=(1,0,0)
 MOUSE_NOT_PRESSED=(0,0,0)
 
+"""above this number of dirty rects they are merged into a single one"""
+MAX_DIRTY_RECTS=32
+
+"""maximum number of rendered words kept by TextWidget"""
+MAX_CACHED_WORDS=1024
+
 class GUI:
     """A class to store and manage all the widgets in the application"""
 
@@ -75,6 +90,16 @@ class GUI:
         self._focus=1
         self.no_modal_dialog=True
 
+        """regions of the screen that changed since they were last displayed,
+        the first frame has to draw the whole screen"""
+        self._dirty_rects=[pygame.Rect((0,0),size)]
+
+        """text drawn by the widgets in the current and the previous frame.
+        'text' counts paragraphs drawn and 'font' words rendered with
+        pygame.font"""
+        self._renders={'text':0,'font':0}
+        self._frame_renders={'text':0,'font':0}
+
     def addWidget(self,new_widget):
         """Add a new Widget object into the widget dictionary"""
         
@@ -106,9 +131,432 @@ class GUI:
         """Update the state of all the widgets, this method is called at the
         frame rate of the game."""
 
+        self._frame_renders=self._renders
+        self._renders={'text':0,'font':0}
+
         for w in self.widgets:
             self.widgets[w].update(obj)        
 
+    def countRender(self, kind):
+        """Count a text render of the kind 'text' or 'font'"""
+
+        self._renders[kind]+=1
+
+    def getFrameRenders(self):
+        """Return the text renders of the previous frame, in a dictionary
+        with the keys 'text' and 'font'. Both are 0 when the GUI is idle."""
+
+        return dict(self._frame_renders)
+
+    def addDirtyRect(self, rect):
+        """Add a region of the screen that needs to be displayed again. rect
+        is in screen coordinates."""
+
+        rect=pygame.Rect(rect).clip(get_screen().get_rect())
+
+        if rect.width>0 and rect.height>0:
+            self._dirty_rects.append(rect)
+
+            if len(self._dirty_rects)>MAX_DIRTY_RECTS:
+                self._dirty_rects=[rect.unionall(self._dirty_rects)]
+
+    def invalidateAll(self):
+        """Set the whole screen to be displayed again"""
+
+        self._dirty_rects=[get_screen().get_rect()]
+
+    def getDirtyRects(self):
+        """Return the dirty regions of the screen and start a new empty list.
+        Overlapping rects are merged, so that no pixel is drawn twice."""
+
+        merged=[]
+        for r in self._dirty_rects:
+            r=pygame.Rect(r)
+            i=r.collidelist(merged)
+            while i!=-1:
+                r.union_ip(merged.pop(i))
+                i=r.collidelist(merged)
+            merged.append(r)
+
+        self._dirty_rects=[]
+
+        return merged
+
+    def displayDirty(self, surface, widget_id):
+        """Display the widget widget_id, and its subwidgets, only in the dirty
+        regions of the surface. The rects that were drawn are returned so that
+        only those are updated on the screen with pygame.display.update"""
+
+        rects=self.getDirtyRects()
+
+        for r in rects:
+            surface.set_clip(r)
+            self.widgets[widget_id].display(surface)
+        surface.set_clip(None)
+
+        return rects
+
+class FontManager:
+    """Keeps the fonts used by the widgets so that each font is only loaded
+    once. Fonts are identified by (family, size, style), where style is
+    'normal', 'bold', 'italic' or 'bold italic'."""
+
+    def __init__(self):
+        """Initialize the FontManager object. Fonts are loaded the first time
+        they are requested."""
+
+        self._fonts={}
+        self._loads=0
+        self._hits=0
+        self._load_time=0.0
+        self._first_load_time=0.0
+
+    def getFont(self, family, size, style='normal'):
+        """Return the pygame Font for family, size and style, loading it with
+        pygame.font.SysFont if needed"""
+
+        key=(family,size,style)
+
+        if key in self._fonts:
+            self._hits+=1
+            return self._fonts[key]
+
+        init_fonts()
+
+        startup.begin('assets')
+        start=time.time()
+        font=pygame.font.SysFont(family, size, 'bold' in style,
+        'italic' in style)
+        self._load_time+=time.time()-start
+        startup.end()
+
+        if not(self._loads):
+            self._first_load_time=self._load_time
+        self._loads+=1
+
+        self._fonts[key]=font
+        return font
+
+    def preload(self, font_list):
+        """Load in advance a list of (family, size, style) tuples, for example
+        before building the widgets of the application"""
+
+        for (family,size,style) in font_list:
+            if (family,size,style) not in self._fonts:
+                self.getFont(family,size,style)
+                
+    def getStats(self):
+        """Return a dictionary with the number of fonts loaded, the number of
+        requests served without loading, the time spent loading in seconds,
+        and the time saved, estimated as the average load time times the
+        number of requests served without loading.
+
+        The first load also reads the list of system fonts, so it is left out
+        of the average unless it is the only one."""
+
+        if self._loads>1:
+            avg=(self._load_time-self._first_load_time)/(self._loads-1)
+        elif self._loads:
+            avg=self._load_time
+        else:
+            avg=0.0
+
+        return {'loaded':self._loads, 'hits':self._hits,
+        'load_time':self._load_time, 'time_saved':avg*self._hits}
+
+
+class ImageCache:
+    """Keeps the Surfaces loaded from image files, so that each image is
+    loaded and transformed only once and shared by all the SpriteObj objects.
+
+    Entries are keyed by (filename, transforms), where transforms is a tuple
+    with the transforms applied in order to the loaded image, as created by
+    SpriteObj.resize. An entry is removed when no SpriteObj uses it anymore.
+    A transformed entry uses the entry it was made from."""
+
+    def __init__(self):
+        """Initialize the ImageCache object"""
+
+        self._surfs={}
+        self._refs={}
+        self._bases={}
+        self._loads=0
+        self._hits=0
+        self._load_time=0.0
+
+    def acquire(self, key):
+        """Return the Surface of the entry key, loading or transforming it if
+        needed, and count one more user of it"""
+
+        if key in self._surfs:
+            self._hits+=1
+            self._refs[key]+=1
+            return self._surfs[key]
+
+        (filename,transforms)=key
+
+        if not(transforms):
+            """converting the image needs the display"""
+            get_screen()
+
+            startup.begin('assets')
+            start=time.time()
+            surf=pygame.image.load(filename).convert()
+            surf.set_colorkey((255,0,255))
+            self._load_time+=time.time()-start
+            self._loads+=1
+            startup.end()
+
+        else:
+            base_key=(filename,transforms[:-1])
+            base=self.acquire(base_key)
+            self._bases[key]=base_key
+            surf=self.transform(base,transforms[-1])
+
+        self._surfs[key]=surf
+        self._refs[key]=1
+        return surf
+
+    def release(self, key):
+        """Count one user less of the entry key, which is removed when it is
+        not used anymore"""
+
+        self._refs[key]-=1
+
+        if self._refs[key]==0:
+            del self._surfs[key]
+            del self._refs[key]
+
+            if key in self._bases:
+                self.release(self._bases.pop(key))
+
+    def transform(self, surf, transform):
+        """Return a new Surface with a transform applied to surf. transform is
+        either ('mosaic',w,h,mosaic,step_w,step_h), to draw surf in a larger
+        surface, or ('cut',x,y,w,h), to take a subsurface"""
+
+        if transform[0]=='mosaic':
+            (kind,w,h,mosaic,step_w,step_h)=transform
+            new_surf=pygame.Surface((w, h))
+            if mosaic:
+                for i in range(0,w,step_w):
+                    for j in range(0,h,step_h):
+                        new_surf.blit(surf,pygame.Rect(i,j,w,h))
+            else:
+                new_surf.blit(surf,pygame.Rect(0,0,w,h))
+            return new_surf
+
+        else:
+            (kind,x,y,w,h)=transform
+            return surf.subsurface(pygame.Rect(x,y,w,h))
+
+    def getStats(self):
+        """Return a dictionary with the number of entries, the number of
+        SpriteObj using them, the files loaded, the requests served from the
+        cache, the time spent loading files in seconds, and the bytes of pixel
+        data kept. Subsurfaces share the pixels of their parent and don't add
+        any bytes."""
+
+        size=0
+        for key in self._surfs:
+            surf=self._surfs[key]
+            if surf.get_parent() is None:
+                size+=surf.get_width()*surf.get_height()*surf.get_bytesize()
+
+        return {'entries':len(self._surfs),'references':sum(self._refs.values()),
+        'loaded':self._loads,'hits':self._hits,'load_time':self._load_time,
+        'bytes':size}
+
+
+class TextureAtlas:
+    """Packs the images of several files into a single Surface, so that they
+    are drawn from the same block of memory and can be blitted together with
+    Surface.blits. Images are placed in rows, sorted by height, and the area
+    of the atlas taken by every file is kept."""
+
+    def __init__(self, filenames, width=512):
+        """Initialize the TextureAtlas object by packing the images of the
+        files in filenames. The rows of the atlas are at most width pixels
+        long, unless a single image is longer."""
+
+        surfs={}
+        for f in filenames:
+            if f not in surfs:
+                surfs[f]=images.acquire((f,()))
+
+        order=sorted(surfs, key=lambda f: (-surfs[f].get_height(), f))
+
+        self._areas={}
+        x=0
+        y=0
+        row_h=0
+        atlas_w=1
+
+        for f in order:
+            (w,h)=surfs[f].get_size()
+
+            if x>0 and x+w>width:
+                y+=row_h
+                x=0
+                row_h=0
+
+            self._areas[f]=pygame.Rect(x,y,w,h)
+            x+=w
+            row_h=max(row_h,h)
+            atlas_w=max(atlas_w,x)
+
+        """transparent pixels of the images keep the colour key"""
+        self._surf=pygame.Surface((atlas_w,max(y+row_h,1))).convert()
+        self._surf.fill((255,0,255))
+        self._surf.set_colorkey((255,0,255))
+
+        for f in order:
+            self._surf.blit(surfs[f],self._areas[f])
+            images.release((f,()))
+
+    def hasImage(self, filename):
+        """Return if the image of filename is in the atlas"""
+        return filename in self._areas
+
+    def getArea(self, filename):
+        """Return the rect of the atlas taken by the image of filename"""
+        return self._areas[filename]
+
+    def getSurface(self):
+        """Return the Surface of the atlas"""
+        return self._surf
+
+
+class RenderQueue:
+    """Gathers the blits of a frame in layers, so that each layer is drawn
+    with a single blit_list call. Layers are drawn in the order given when
+    the queue is created. Drawing functions can be added to a layer as well,
+    they are called after the blits of the layer, for things that can't be
+    blitted such as lines."""
+
+    def __init__(self, layers):
+        """Initialize the RenderQueue object. layers is a list with the names
+        of the layers, from bottom to top"""
+
+        self._layers=list(layers)
+        self._blits={}
+        self._draws={}
+        for l in self._layers:
+            self._blits[l]=[]
+            self._draws[l]=[]
+
+        """blits and blit_list calls of the last flush"""
+        self._stats={'blits':0,'calls':0}
+
+    def add(self, layer, source, dest, area=None, clip=None):
+        """Add the blit of source at dest, a (x,y) position, to a layer. area
+        is the rect of source to blit, the whole source if None. If clip is
+        given, only the part inside the clip rect is blitted."""
+
+        if clip is not None:
+            if area is None:
+                area=source.get_rect()
+            dest_rect=pygame.Rect(dest[0],dest[1],area.width,area.height)
+            inside=dest_rect.clip(clip)
+
+            if inside.width<=0 or inside.height<=0:
+                return
+
+            area=pygame.Rect(area.x+inside.x-dest_rect.x,
+            area.y+inside.y-dest_rect.y,inside.width,inside.height)
+            dest=inside.topleft
+
+        self._blits[layer].append((source,dest,area))
+
+    def addDraw(self, layer, function):
+        """Add a function to be called with the destination surface after the
+        blits of a layer"""
+
+        self._draws[layer].append(function)
+
+    def flush(self, surface):
+        """Draw all the layers on surface and empty the queue"""
+
+        self._stats={'blits':0,'calls':0}
+
+        for l in self._layers:
+            if self._blits[l]:
+                blit_list(surface,self._blits[l])
+                self._stats['blits']+=len(self._blits[l])
+                self._stats['calls']+=1
+                self._blits[l]=[]
+
+            for function in self._draws[l]:
+                function(surface)
+            self._draws[l]=[]
+
+    def getStats(self):
+        """Return a dictionary with the number of blits and blit_list calls
+        of the last flush"""
+
+        return dict(self._stats)
+
+
+class StartupTimer:
+    """Time spent in each phase of the start of the application, such as
+    'import', 'display', 'assets' (images and fonts) or 'scenario'. Phases
+    are timed with begin and end, and can be nested: the time of a phase
+    started inside another one is only counted for the inner phase."""
+
+    def __init__(self):
+        """Initialize the StartupTimer object"""
+
+        """{phase: seconds}, phases in the order they were first timed, and
+        the phases begun and not ended, innermost last"""
+        self._times={}
+        self._order=[]
+        self._stack=[]
+        self._since=0.0
+
+    def add(self, phase, seconds):
+        """Count seconds more for phase, for phases timed by the caller"""
+
+        if phase not in self._times:
+            self._times[phase]=0.0
+            self._order.append(phase)
+
+        self._times[phase]+=seconds
+
+    def begin(self, phase):
+        """Start timing phase, the phase it is inside of is paused"""
+
+        now=time.time()
+        if self._stack:
+            self.add(self._stack[-1],now-self._since)
+
+        self._stack.append(phase)
+        self._since=now
+
+    def end(self):
+        """Stop timing the last phase begun, the phase it was inside of goes
+        on"""
+
+        now=time.time()
+        self.add(self._stack.pop(),now-self._since)
+        self._since=now
+
+    def getTimes(self):
+        """Return a list of (phase, seconds) tuples, in the order the phases
+        were first timed"""
+
+        return [(phase,self._times[phase]) for phase in self._order]
+
+    def report(self):
+        """Return the time of every phase and the total as text, one phase
+        per line"""
+
+        lines=['%-10s %.3f s' % (phase,seconds) for (phase,seconds) in
+        self.getTimes()]
+        lines.append('%-10s %.3f s' % ('total',sum(self._times.values())))
+
+        return '\n'.join(lines)
+
+
 class Widget:
     """Widget object represents a superclass for all the gui elements in the
     application"""
@@ -151,6 +599,7 @@ class Widget:
             self._rect.y=0
             
         self._shown = True
+        self.setDirty()
 
         """if this parameter is True, set all the subwidgets to shown"""
         if show_subwidgets:
@@ -163,6 +612,21 @@ class Widget:
         pygame.draw.rect(self._surf,colour,self._rect, 1)
         self._surf.fill(colour)         
         
+    def setDirty(self):
+        """Tell the gui that the area of the widget needs to be displayed
+        again. Called whenever the widget changes its appearance."""
+
+        if self._shown:
+            gui.addDirtyRect(self._rect)
+
+    def addDirtyRects(self, rects):
+        """Tell the gui about regions of the widget's surface that were drawn
+        by other objects, such as the map. rects are in the coordinates of
+        the widget's surface."""
+
+        for r in rects:
+            gui.addDirtyRect(r.move(self._rect.x,self._rect.y).clip(self._rect))
+
     def addSubwidget(self,child_id):
         """Tell the widget about a new child"""
         self.sub_widgets.append(child_id)
@@ -227,6 +691,7 @@ class Widget:
         """Close a widget and all of its subwidgets. A widget is closed by
         setting its Surface attribute _surf to an empty Surface"""
 
+        self.setDirty()
         self._shown = False
         
         for j in self.sub_widgets:            
@@ -292,7 +757,7 @@ class Button(Widget):
             self._image=SpriteObj(filename)
             self._image.resize(width,height,True)
 
-        self._font = pygame.font.SysFont('arial', font_size)
+        self._font = fonts.getFont('arial', font_size)
         self._textsurf = self._font.render(self._text, True, pygame.Color(
         'gray20'))
         
@@ -347,7 +812,7 @@ class Dialog(Widget):
             self._image=SpriteObj(filename)
             self._image.resize(width,height,True)
 
-        self._font = pygame.font.SysFont('arial', font_size)
+        self._font = fonts.getFont('arial', font_size)
         self._textsurf = self._font.render(self._title, True, pygame.Color(
         'gray20'))
 
@@ -382,10 +847,17 @@ class Dialog(Widget):
         text_x=int((self._width-w)*0.5)
         text_y=int(self._title_y)
         self._textrect = pygame.Rect(text_x,text_y,w,h)
+        self.setDirty()
         
 
 class TextWidget(Widget):
-    """Represents a text box to be displayed inside other widget objects"""    
+    """Represents a text box to be displayed inside other widget objects.
+
+    The text is only drawn again when it changes. The words rendered are
+    shared by all the TextWidgets in the class attribute _word_cache, with
+    keys (font family, font size, colour, word)"""    
+
+    _word_cache={}
     
     def __init__(self, parent,width,height,background,pos_x,pos_y,paragraph,
     font_size=10,font_colour='black',ipad=5):
@@ -401,13 +873,17 @@ class TextWidget(Widget):
         proper size for the text box so that the text will fit properly"""
     
         Widget.__init__(self, parent,width,height,background,pos_x,pos_y)
+        self._font_family='arial'
         self._font_size=font_size
-        self._font = pygame.font.SysFont('arial', self._font_size)
+        self._font = fonts.getFont(self._font_family, self._font_size)
         self._paragraph=paragraph
         self._ipad=ipad
         self._font_colour=font_colour        
         self._current_colour = self._background
 
+        """text and background colour drawn in the surface"""
+        self._drawn=None
+
     def show(self):
         """Method to show set up the widget to be displayed"""
         
@@ -415,7 +891,13 @@ class TextWidget(Widget):
         self.splitLines()
         
     def changeText(self,new_text):
-        """Change the text in the widget"""
+        """Change the text in the widget. Nothing is done if the text is
+        already drawn."""
+
+        if (new_text,self._current_colour)==self._drawn:
+            return
+
+        self.setDirty()
         
         self.initSurface(self._current_colour)
         self._paragraph=new_text
@@ -430,10 +912,10 @@ class TextWidget(Widget):
         self._font_size)
 
         splitted_parag=self._paragraph.split()
+        gui.countRender('text')
         
         for w in splitted_parag:
-            current_word=self._font.render(w, True, pygame.Color(
-            self._font_colour))
+            current_word=self.renderWord(w)
 
             current_size=current_word.get_width()+5
             
@@ -454,9 +936,28 @@ class TextWidget(Widget):
             self._surf.blit(current_word, dest_rect)
             pixel+=current_size
 
+        self._drawn=(self._paragraph,self._current_colour)
+
         def getText(self):
             return self._paragraph
 
+    def renderWord(self,word):
+        """Return a Surface with the word rendered in the widget's font and
+        colour. Words are taken from the cache when possible."""
+
+        key=(self._font_family,self._font_size,self._font_colour,word)
+        surf=TextWidget._word_cache.get(key)
+
+        if surf is None:
+            if len(TextWidget._word_cache)>=MAX_CACHED_WORDS:
+                TextWidget._word_cache.clear()
+
+            surf=self._font.render(word, True, pygame.Color(self._font_colour))
+            TextWidget._word_cache[key]=surf
+            gui.countRender('font')
+
+        return surf
+
         
 class ImageWidget(Widget):
     """This class, which inherits from Widget, displays an image inside of a
@@ -473,8 +974,11 @@ class ImageWidget(Widget):
 
     def changeImage(self, filename):
         """Change the image displayed"""
+        if hasattr(self,'_image'):
+            self._image.release()
         self._image=SpriteObj(filename)
         self._image.resize(self._width,self._height,True)
+        self.setDirty()
     
     def display(self,surface):
         """Display the image on the screen. This is done by drawing the
@@ -525,12 +1029,14 @@ class TextInput(TextWidget):
         self._current_colour =self._focus_colour
         self.initSurface(self._current_colour)
         self.splitLines()
+        self.setDirty()
 
     def deactivate(self):
         """This method is called when the widget loses the user focus"""
         self._current_colour =self._background
         self.initSurface(self._current_colour)
         self.splitLines()
+        self.setDirty()
 
     def handleKeyboard(self, key_event, obj=None):
         """This method is called when the widget has the focus and a key is
@@ -601,6 +1107,10 @@ class SpriteObj(pygame.sprite.Sprite):
     """An extension of the pygame.Sprite class, to include more attributes and
     methods such as transparency, cutting a larger image into a smaller surface
     and displaying as a mosaic (both done by the resize method).
+
+    The image Surface is taken from the ImageCache images and shared with the
+    other SpriteObj objects made from the same file and transforms, so it
+    must not be drawn on.
     """
 
     def __init__(self, filename):
@@ -615,9 +1125,14 @@ class SpriteObj(pygame.sprite.Sprite):
 
         pygame.sprite.Sprite.__init__(self)
         self._filename = filename
-        self.image = pygame.image.load(self._filename).convert()
-        self.image.set_colorkey((255,0,255))
+        self._image_key = (self._filename,())
+        self.image = images.acquire(self._image_key)
         self.rect = self.image.get_rect()
+
+        """Surface and area the image is taken from, the atlas when the
+        sprite uses one, and the image itself otherwise"""
+        self._blit_surf = self.image
+        self._blit_area = None
                
     def display(self,x,y,surface):
         """Draw the image on the specified surface. surface could
@@ -627,24 +1142,108 @@ class SpriteObj(pygame.sprite.Sprite):
         self.rect.y=y        
         surface.blit(self.image, self.rect)
 
+    def getBlit(self,x,y):
+        """Return the (source, dest, area) tuple to draw the image at x,y, to be
+        used with blit_list"""
+
+        self.rect.x=x
+        self.rect.y=y
+        return (self._blit_surf, (x,y), self._blit_area)
+
+    def useAtlas(self,atlas):
+        """Take the image from a TextureAtlas. Nothing is done if the atlas
+        doesn't have the image file or the image was resized."""
+
+        if self._image_key is None or self._image_key[1] or \
+        not(atlas.hasImage(self._filename)):
+            return
+
+        self._blit_surf=atlas.getSurface()
+        self._blit_area=atlas.getArea(self._filename)
+        self.image=self._blit_surf.subsurface(self._blit_area)
+
+        """the image in the ImageCache is not used anymore"""
+        images.release(self._image_key)
+        self._image_key=None
+
+    def getFilename(self):
+        """Return the name of the image file"""
+        return self._filename
+
     def resize(self,w,h,mosaic=False):
         """Check if the image is smaller than the new dimesions
         if it is smaller, it can be displayed as a mosaic,
         if the image is bigger, it is cut"""
         
         if self.rect.width<w or self.rect.height<h:
-            new_surf=pygame.Surface((w, h))
-            if mosaic:
-                for i in range(0,w,self.rect.width):
-                    for j in range(0,h,self.rect.height):
-                        new_surf.blit(self.image,pygame.Rect(i,j,w,h))
-            else:
-                new_surf.blit(self.image,pygame.Rect(0,0,w,h))
-            self.image=new_surf        
+            transform=('mosaic',w,h,mosaic,self.rect.width,self.rect.height)
         else:
             self.rect.width=w
             self.rect.height=h
-            self.image=self.image.subsurface(self.rect)
+            transform=('cut',self.rect.x,self.rect.y,w,h)
+
+        if self._image_key is None:
+            """the image is taken from an atlas, the file is loaded again"""
+            key=(self._filename,(transform,))
+            self.image=images.acquire(key)
+        else:
+            key=(self._filename,self._image_key[1]+(transform,))
+            self.image=images.acquire(key)
+            images.release(self._image_key)
+        self._image_key=key
+        self._blit_surf=self.image
+        self._blit_area=None
+
+    def release(self):
+        """Stop using the image from the cache. Called when the SpriteObj
+        is not going to be displayed anymore"""
+
+        if self._image_key is not None:
+            images.release(self._image_key)
+            self._image_key=None
+
+def get_screen():
+    """Return the display Surface. The first time it is called the display is
+    initialized and the window of size pixels is opened"""
+
+    global screen
+
+    if screen is None:
+        startup.begin('display')
+        pygame.display.init()
+        screen=pygame.display.set_mode(size)
+        startup.end()
+
+    return screen
+
+def init_fonts():
+    """Initialize the font module, the first time it is called. FontManager
+    calls it before loading a font"""
+
+    if not(pygame.font.get_init()):
+        startup.begin('display')
+        pygame.font.init()
+        startup.end()
+
+def init_mixer():
+    """Initialize the sound mixer, the first time it is called. The widgets
+    don't play sounds, so opening the audio device is left to the
+    applications that do"""
+
+    if not(pygame.mixer.get_init()):
+        startup.begin('mixer')
+        pygame.mixer.init()
+        startup.end()
+
+def blit_list(surface, blit_seq):
+    """Blit a list of (source, dest, area) tuples on surface, with a single
+    Surface.blits call when the pygame version has it"""
+
+    if hasattr(surface,'blits'):
+        surface.blits(blit_seq, False)
+    else:
+        for (source,dest,area) in blit_seq:
+            surface.blit(source,dest,area)
 
 def button_close():
     """Close the current widget"""
@@ -664,8 +1263,18 @@ def button_change_img((widget_id,img)):
     gui.widgets[widget_id].changeImage(img)
     return None
 
+def toggle_fullscreen():
+    """Switch between fullscreen and windowed mode. The whole screen is
+    displayed again afterwards"""
+    pygame.display.toggle_fullscreen()
+    gui.invalidateAll()
+    return None
+
 def show_widget(widget_id):
     """Sets a widget to be displayed on the screen"""
     gui.widgets[widget_id].show(True)
 
 gui=GUI()
+fonts=FontManager()
+images=ImageCache()
+startup=StartupTimer()
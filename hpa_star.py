@@ -0,0 +1,521 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: hpa_star.py
+#
+#   Description: This file contains a hierarchical path planner based on
+#   HPA* (Botea, Mueller and Schaeffer) for maps that are too large for a flat
+#   A* search over every cell.
+#
+#   The map is split into square clusters. Where two neighbouring clusters
+#   share walkable cells on their border, entrance cells are placed, and the
+#   cost between the entrances of each cluster is precomputed with local
+#   searches that don't leave the cluster. A path is first found on this
+#   small graph of entrances, and then refined cell by cell, again with
+#   searches restricted to one cluster at a time.
+#
+#   The cost model is the same as in satar_modif.py and dstar_lite.py:
+#   entering a cell costs its move cost, multiplied by 1.4142 for diagonal
+#   moves, and cells with a cost of -1 can't be walked. Diagonal moves are
+#   allowed between two cells even when both cells beside the move can't be
+#   walked, so borders are also crossed diagonally, and clusters that only
+#   touch at a corner are joined through their corner cells.
+#
+################################################################################
+
+import heapq
+import satar_modif
+
+"""move cost multipliers, same values used by SQ_MapHandler"""
+NEIGHBOURS = ((1,0,1),(-1,0,1),(0,1,1),(0,-1,1),
+(1,1,satar_modif.DIAGONAL),(-1,-1,satar_modif.DIAGONAL),
+(-1,1,satar_modif.DIAGONAL),(1,-1,satar_modif.DIAGONAL))
+
+"""entrances longer than this get a transition at each end instead of a
+single one in the middle"""
+MAX_SINGLE_ENTRANCE = 6
+
+"""borders of a cluster with the clusters on its right and below, and with
+the clusters that only touch its bottom right and bottom left corners"""
+SIDES = ('right','bottom','bottomright','bottomleft')
+
+"""position of the other cluster of each side"""
+SIDE_OFFSETS = {'right':(1,0), 'bottom':(0,1), 'bottomright':(1,1),
+'bottomleft':(-1,1)}
+
+class ClusterMap:
+    """Abstract graph of cluster entrances built over a move cost list.
+    Cells are (column, row) tuples and clusters (cluster column, cluster row)
+    tuples."""
+
+    def __init__(self, mapdata, width, height, cluster_size=10,
+    heuristic=satar_modif.octile, min_cost=1):
+        """Split the map in clusters and precompute the abstract graph.
+        mapdata is not copied, so the caller has to call updateCells after
+        changing the cost of a cell.
+
+        (list, int, int, int, function, int) --> ()"""
+
+        self.m = mapdata
+        self.w = width
+        self.h = height
+        self.size = cluster_size
+        self.heuristic = heuristic
+        self.min_cost = min_cost
+
+        self.clusters_x = (width+cluster_size-1)/cluster_size
+        self.clusters_y = (height+cluster_size-1)/cluster_size
+
+        """transitions of every border, keyed by (cluster, side) where side
+        is one of SIDES. Each transition is a pair of cells, one on each
+        side of the border"""
+        self._borders = {}
+
+        """edges between the two cells of a transition, and edges between
+        the entrances of a cluster, both as {cell: {cell: cost}}"""
+        self._inter = {}
+        self._intra = {}
+
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                for side in SIDES:
+                    if self._hasBorder((cx,cy),side):
+                        self._buildBorder((cx,cy),side)
+
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                self._buildCluster((cx,cy))
+
+    def getCluster(self, (x,y)):
+        """Return the cluster that contains a cell"""
+
+        return (x/self.size, y/self.size)
+
+    def getNumEntrances(self):
+        """Return the number of entrance cells in the abstract graph"""
+
+        return len(self._inter)
+
+    def updateCells(self, cells):
+        """Recompute the parts of the abstract graph affected by a change in
+        the move cost of some cells. Only the borders that contain those
+        cells and the clusters next to them are recomputed."""
+
+        dirty = set()
+
+        for (x,y) in cells:
+            cx, cy = self.getCluster((x,y))
+            dirty.add((cx,cy))
+
+            """cells on the edge of a cluster can be in any of its
+            borders"""
+            if x % self.size in (0,self.size-1) or \
+            y % self.size in (0,self.size-1):
+                for cluster, side in self._clusterBorders((cx,cy)):
+                    self._buildBorder(cluster, side)
+                    dirty.add(cluster)
+                    dirty.add(self._otherCluster(cluster, side))
+
+        for cluster in dirty:
+            self._buildCluster(cluster)
+
+    def findPath(self, start, goal):
+        """Return the list of cells from start (not included) to goal, or
+        None if the goal can't be reached."""
+
+        if not self._inMap(start) or not self._inMap(goal):
+            return None
+
+        if self._cost(start) == -1 or self._cost(goal) == -1:
+            return None
+
+        if start == goal:
+            return []
+
+        start_cluster = self.getCluster(start)
+        goal_cluster = self.getCluster(goal)
+
+        """short paths are also searched directly over the clusters
+        involved, since the detour through the entrances can be long
+        compared to the path"""
+        local = None
+        if abs(start_cluster[0]-goal_cluster[0]) <= 1 and \
+        abs(start_cluster[1]-goal_cluster[1]) <= 1:
+            local = self._localPath(start, goal, start_cluster, goal_cluster)
+
+        """connect the start and the goal to the entrances of their
+        clusters"""
+        start_costs = self._localCosts(start, start_cluster)
+        goal_costs = self._localCosts(goal, goal_cluster, True)
+
+        start_edges = {}
+        for e in self._entrances(start_cluster):
+            if e in start_costs:
+                start_edges[e] = start_costs[e]
+        if start_cluster == goal_cluster and goal in start_costs:
+            start_edges[goal] = start_costs[goal]
+
+        goal_edges = {}
+        for e in self._entrances(goal_cluster):
+            if e in goal_costs:
+                goal_edges[e] = goal_costs[e]
+
+        abstract = self._abstractSearch(start, goal, start_edges, goal_edges)
+        if abstract is None:
+            return local
+
+        """refine every abstract edge inside its cluster"""
+        cells = []
+        for i in range(len(abstract)-1):
+            a = abstract[i]
+            b = abstract[i+1]
+            if b in self._inter.get(a,{}) and \
+            self.getCluster(a) != self.getCluster(b):
+                cells.append(b)
+            else:
+                cells.extend(self._localPath(a, b, self.getCluster(a)))
+
+        if local is not None and \
+        self._pathCost(start,local) <= self._pathCost(start,cells):
+            return local
+        return cells
+
+    def _pathCost(self, start, cells):
+        """Return the cost of following a list of cells from start"""
+
+        cost = 0
+        x, y = start
+        for (nx,ny) in cells:
+            if nx != x and ny != y:
+                cost += self.m[ny*self.w+nx]*satar_modif.DIAGONAL
+            else:
+                cost += self.m[ny*self.w+nx]
+            x, y = nx, ny
+        return cost
+
+    def _otherCluster(self, (cx,cy), side):
+        dx, dy = SIDE_OFFSETS[side]
+        return (cx+dx,cy+dy)
+
+    def _hasBorder(self, cluster, side):
+        """Return if the other cluster of a side is inside the map"""
+
+        cx, cy = self._otherCluster(cluster, side)
+        return cx >= 0 and cx < self.clusters_x and cy < self.clusters_y
+
+    def _clusterBorders(self, (cx,cy)):
+        """Return the (cluster, side) keys of all the borders of a
+        cluster"""
+
+        borders = []
+        for side in SIDES:
+            dx, dy = SIDE_OFFSETS[side]
+            for cluster in ((cx,cy),(cx-dx,cy-dy)):
+                if cluster[0] >= 0 and cluster[1] >= 0 and \
+                cluster[0] < self.clusters_x and \
+                self._hasBorder(cluster, side):
+                    borders.append((cluster, side))
+        return borders
+
+    def _stepCost(self, (x0,y0), (x1,y1)):
+        """Return the cost of moving between two neighbouring cells"""
+
+        if x0 != x1 and y0 != y1:
+            return self._cost((x1,y1))*satar_modif.DIAGONAL
+        return self._cost((x1,y1))
+
+    def _cost(self, (x,y)):
+        return self.m[y*self.w+x]
+
+    def _inMap(self, (x,y)):
+        return x >= 0 and x < self.w and y >= 0 and y < self.h
+
+    def _bounds(self, (cx,cy)):
+        """Return the cell limits of a cluster as x0, y0, x1, y1, where x1
+        and y1 are not included"""
+
+        return (cx*self.size, cy*self.size, min((cx+1)*self.size,self.w),
+        min((cy+1)*self.size,self.h))
+
+    def _entrances(self, cluster):
+        return self._intra.get(cluster,{}).keys()
+
+    def _buildBorder(self, cluster, side):
+        """Find the transitions of a border and update the edges between
+        the two cells of each transition"""
+
+        for a, b in self._borders.get((cluster,side),[]):
+            self._removeInter(a,b)
+            self._removeInter(b,a)
+
+        x0, y0, x1, y1 = self._bounds(cluster)
+        if side == 'bottomright':
+            transitions = [((x1-1,y1-1),(x1,y1))]
+        elif side == 'bottomleft':
+            transitions = [((x0,y1-1),(x0-1,y1))]
+        else:
+            transitions = self._sideTransitions(x0, y0, x1, y1, side)
+
+        transitions = [(a,b) for (a,b) in transitions if
+        self._cost(a) != -1 and self._cost(b) != -1]
+
+        for a, b in transitions:
+            self._inter.setdefault(a,{})[b] = self._stepCost(a,b)
+            self._inter.setdefault(b,{})[a] = self._stepCost(b,a)
+
+        self._borders[(cluster,side)] = transitions
+
+    def _sideTransitions(self, x0, y0, x1, y1, side):
+        """Return the transitions of the right or bottom border of the
+        cluster with bounds x0, y0, x1, y1.
+
+        The border is crossed from a cell on one side to any of the three
+        cells next to it on the other side. The walkable cells along the
+        border form runs on each side, and the crossings between the same
+        two runs form an entrance, since any of them can be reached from the
+        others without leaving the clusters. Each entrance gets one
+        transition in the middle, or one at each end if it is long.
+        Straight crossings are preferred for the middle one."""
+
+        if side == 'right':
+            near = [(x1-1,y) for y in range(y0,y1)]
+            far = [(x1,y) for y in range(y0,y1)]
+        else:
+            near = [(x,y1-1) for x in range(x0,x1)]
+            far = [(x,y1) for x in range(x0,x1)]
+
+        near_runs = self._runs(near)
+        far_runs = self._runs(far)
+
+        entrances = {}
+        for i in range(len(near)):
+            if near_runs[i] is None:
+                continue
+            for j in (i-1, i, i+1):
+                if j >= 0 and j < len(far) and far_runs[j] is not None:
+                    entrances.setdefault((near_runs[i],far_runs[j]),
+                    []).append((i,j))
+
+        transitions = []
+        for key in sorted(entrances):
+            entrance = entrances[key]
+            if entrance[-1][0]-entrance[0][0] >= MAX_SINGLE_ENTRANCE:
+                chosen = [entrance[0], entrance[-1]]
+            else:
+                straight = [(i,j) for (i,j) in entrance if i == j]
+                candidates = straight or entrance
+                chosen = [candidates[len(candidates)/2]]
+
+            for (i,j) in chosen:
+                transitions.append((near[i],far[j]))
+
+        return transitions
+
+    def _runs(self, cells):
+        """Return a list with the number of the run of walkable cells that
+        every cell of a line belongs to, or None for the cells that can't
+        be walked"""
+
+        runs = []
+        run = 0
+        for c in cells:
+            if self._cost(c) == -1:
+                runs.append(None)
+                run += 1
+            else:
+                runs.append(run)
+        return runs
+
+    def _removeInter(self, a, b):
+        edges = self._inter.get(a)
+        if edges is not None and b in edges:
+            del edges[b]
+            if not edges:
+                del self._inter[a]
+
+    def _buildCluster(self, cluster):
+        """Precompute the cost between every pair of entrances of a
+        cluster"""
+
+        x0, y0, x1, y1 = self._bounds(cluster)
+        entrances = set()
+        for border in self._clusterBorders(cluster):
+            for pair in self._borders.get(border,[]):
+                for (x,y) in pair:
+                    if x >= x0 and x < x1 and y >= y0 and y < y1:
+                        entrances.add((x,y))
+
+        edges = {}
+        for e in entrances:
+            costs = self._localCosts(e, cluster)
+            edges[e] = {}
+            for other in entrances:
+                if other != e and other in costs:
+                    edges[e][other] = costs[other]
+
+        self._intra[cluster] = edges
+
+    def _localCosts(self, source, cluster, reverse=False):
+        """Dijkstra search that doesn't leave the cluster. Return the cost
+        from source to every reachable cell of the cluster, or from every
+        cell to source if reverse is True"""
+
+        x0, y0, x1, y1 = self._bounds(cluster)
+        costs = {source: 0}
+        queue = [(0, source)]
+        done = set()
+
+        while queue:
+            cost, (x,y) = heapq.heappop(queue)
+            if (x,y) in done:
+                continue
+            done.add((x,y))
+
+            for dx, dy, multi in NEIGHBOURS:
+                nx = x+dx
+                ny = y+dy
+                if nx < x0 or nx >= x1 or ny < y0 or ny >= y1:
+                    continue
+                c = self.m[ny*self.w+nx]
+                if c == -1:
+                    continue
+                if reverse:
+                    new_cost = cost+self.m[y*self.w+x]*multi
+                else:
+                    new_cost = cost+c*multi
+                if new_cost < costs.get((nx,ny),new_cost+1):
+                    costs[(nx,ny)] = new_cost
+                    heapq.heappush(queue,(new_cost,(nx,ny)))
+
+        return costs
+
+    def _localPath(self, a, b, cluster, other_cluster=None):
+        """A* search from a to b that doesn't leave the cluster, or the
+        rectangle of clusters between cluster and other_cluster. Return the
+        cells from a (not included) to b, or None if b can't be reached"""
+
+        x0, y0, x1, y1 = self._bounds(cluster)
+        if other_cluster is not None:
+            ox0, oy0, ox1, oy1 = self._bounds(other_cluster)
+            x0 = min(x0,ox0)
+            y0 = min(y0,oy0)
+            x1 = max(x1,ox1)
+            y1 = max(y1,oy1)
+
+        g = {a: 0}
+        parents = {a: None}
+        queue = [(0, 0, a)]
+        done = set()
+        seq = 0
+
+        while queue:
+            f, s, (x,y) = heapq.heappop(queue)
+            if (x,y) in done:
+                continue
+            if (x,y) == b:
+                break
+            done.add((x,y))
+
+            for dx, dy, multi in NEIGHBOURS:
+                nx = x+dx
+                ny = y+dy
+                if nx < x0 or nx >= x1 or ny < y0 or ny >= y1:
+                    continue
+                c = self.m[ny*self.w+nx]
+                if c == -1:
+                    continue
+                new_cost = g[(x,y)]+c*multi
+                if new_cost < g.get((nx,ny),new_cost+1):
+                    g[(nx,ny)] = new_cost
+                    parents[(nx,ny)] = (x,y)
+                    h = self.heuristic(abs(nx-b[0]),abs(ny-b[1]))*self.min_cost
+                    seq += 1
+                    heapq.heappush(queue,(new_cost+h,-seq,(nx,ny)))
+
+        if b not in parents:
+            return None
+
+        cells = []
+        cell = b
+        while cell != a:
+            cells.append(cell)
+            cell = parents[cell]
+        cells.reverse()
+        return cells
+
+    def _abstractSearch(self, start, goal, start_edges, goal_edges):
+        """A* search on the graph of entrances, with the start and the goal
+        connected to it by start_edges and goal_edges. Return the list of
+        abstract nodes from start to goal"""
+
+        g = {start: 0}
+        parents = {start: None}
+        queue = [(0, 0, start)]
+        done = set()
+        seq = 0
+
+        while queue:
+            f, s, node = heapq.heappop(queue)
+            if node in done:
+                continue
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                path.reverse()
+                return path
+            done.add(node)
+
+            if node == start:
+                edges = start_edges.items()
+                edges += self._inter.get(node,{}).items()
+            else:
+                edges = self._intra[self.getCluster(node)].get(node,{}).items()
+                edges += self._inter.get(node,{}).items()
+                if node in goal_edges:
+                    edges.append((goal, goal_edges[node]))
+
+            for other, cost in edges:
+                new_cost = g[node]+cost
+                if new_cost < g.get(other,new_cost+1):
+                    g[other] = new_cost
+                    parents[other] = node
+                    h = self.heuristic(abs(other[0]-goal[0]),
+                    abs(other[1]-goal[1]))*self.min_cost
+                    seq += 1
+                    heapq.heappush(queue,(new_cost+h,-seq,other))
+
+        return None
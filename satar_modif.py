@@ -19,6 +19,27 @@
 #
 ################################################################################
 
+import heapq
+
+# Heuristics for the 8-connected cost model of SQ_MapHandler, where a
+# diagonal move costs 1.4142 times a straight one. dx and dy are distances in
+# cells; SQ_MapHandler scales the result by the lowest move cost of the map,
+# so none of them overestimates the real cost.
+DIAGONAL = 1.4142
+
+def octile(dx,dy):
+    return max(dx,dy)+(DIAGONAL-1)*min(dx,dy)
+
+def chebyshev(dx,dy):
+    return max(dx,dy)
+
+def zero(dx,dy):
+    return 0
+
+HEURISTICS = {'octile':octile, 'chebyshev':chebyshev, 'zero':zero}
+
+DIRECTIONS = ((1,0),(-1,0),(0,1),(0,-1),(1,1),(-1,-1),(-1,1),(1,-1))
+
 class Path:
     def __init__(self,nodes, totalCost):
         self.nodes = nodes;
@@ -48,82 +69,280 @@ class AStar:
 
     def __init__(self,maphandler):
         self.mh = maphandler
-                
+        self.expanded = 0 # nodes expanded by the last findPath call
+
+    # The open list is a binary heap of (score, -seq, node) entries, self.on
+    # maps each open lid to its current node and self.c is a set of closed
+    # lids. Nodes replaced by a cheaper one are left in the heap and skipped
+    # when popped (lazy deletion). The -seq part makes ties go to the most
+    # recently opened node, which is what the old linear scan returned.
+    def _pushOpenNode(self,n):
+        self.seq += 1
+        self.on[n.lid] = n
+        heapq.heappush(self.o,(n.score,-self.seq,n))
+
     def _getBestOpenNode(self):
-        bestNode = None        
-        for n in self.on:
-            if not bestNode:
-                bestNode = n
-            else:
-                if n.score<=bestNode.score:
-                    bestNode = n
-        return bestNode
+        while self.o:
+            n = heapq.heappop(self.o)[2]
+            if self.on.get(n.lid) is n:
+                return n
+        return None
 
     def _tracePath(self,n):
         nodes = [];
         totalCost = n.mCost;
         p = n.parent;
-        nodes.insert(0,n);       
-        
+        nodes.append(n);
+
         while 1:
-            if p.parent is None: 
+            if p.parent is None:
                 break
 
-            nodes.insert(0,p)
+            nodes.append(p)
             p=p.parent
-        
+
+        nodes.reverse()
         return Path(nodes,totalCost)
 
-    def _handleNode(self,node,end):        
-        i = self.o.index(node.lid)
-        self.on.pop(i)
-        self.o.pop(i)
-        self.c.append(node.lid)
+    def _handleNode(self,node,end):
+        del self.on[node.lid]
+        self.c.add(node.lid)
+        self.expanded += 1
+
+        # the destination is checked when it is expanded and not when it is
+        # first seen, otherwise a cheaper path through another node could be
+        # missed
+        if node.location == end and node.parent is not None:
+            return node
 
         nodes = self.mh.getAdjacentNodes(node,end)
-                   
+
         for n in nodes:
-            if n.location == end:
-                # reached the destination
-                return n
-            elif n.lid in self.c:
+            if n.lid in self.c:
                 # already in close, skip this
                 continue
-            elif n.lid in self.o:
+            elif n.lid in self.on:
                 # already in open, check if better score
-                i = self.o.index(n.lid)
-                on = self.on[i];
-                if n.mCost<on.mCost:
-                    self.on.pop(i);
-                    self.o.pop(i);
-                    self.on.append(n);
-                    self.o.append(n.lid);
+                if n.mCost<self.on[n.lid].mCost:
+                    self._pushOpenNode(n)
             else:
                 # new node, append to open list
-                self.on.append(n);                
-                self.o.append(n.lid);
+                self._pushOpenNode(n)
 
         return None
 
     def findPath(self,fromlocation, tolocation):
         self.o = []
-        self.on = []
-        self.c = []
+        self.on = {}
+        self.c = set()
+        self.seq = 0
+        self.expanded = 0
+
+        # the path to the start itself has no nodes, the search below would
+        # only stop at the start after coming back to it
+        if fromlocation == tolocation:
+            return Path([],0)
 
         end = tolocation
         fnode = self.mh.getNode(fromlocation,1)
-        self.on.append(fnode)
-        self.o.append(fnode.lid)
-        nextNode = fnode 
-               
-        while nextNode is not None: 
+        self._pushOpenNode(fnode)
+        nextNode = self._getBestOpenNode()
+
+        while nextNode is not None:
             finish = self._handleNode(nextNode,end)
-            if finish:                
+            if finish:
                 return self._tracePath(finish)
             nextNode=self._getBestOpenNode()
-                
+
         return None
-      
+
+class JPS:
+    """Jump Point Search over the weighted grid of an SQ_MapHandler.
+
+    Plain JPS needs a uniform cost grid. Here a jump also stops at a cell
+    where one of the cells compared for its direction has another move
+    cost, so jumps only cross cells of a single terrain cost, and all the
+    neighbours of such a cell are expanded. Blocked cells and the map
+    border only stop a jump when they force a neighbour, as in plain JPS.
+    The cost found is the same as the one of AStar with an admissible
+    heuristic."""
+
+    def __init__(self,maphandler):
+        self.mh = maphandler
+        self.expanded = 0 # jump points expanded by the last findPath call
+        # for each direction, {lid: True if the cell is a jump point}
+        self._jump_points = dict([(d,{}) for d in DIRECTIONS])
+
+    def _cost(self,x,y):
+        mh = self.mh
+        if x<0 or x>=mh.w or y<0 or y>=mh.h:
+            return -1
+        return mh.m[(y*mh.w)+x]
+
+    def _isJumpPoint(self,x,y,dx,dy):
+        # (x,y) is entered moving (dx,dy), the result is cached for each
+        # cell and direction
+        points = self._jump_points[(dx,dy)]
+        lid = (y*self.mh.w)+x
+        b = points.get(lid)
+        if b is None:
+            b = self._checkJumpPoint(x,y,dx,dy)
+            points[lid] = b
+        return b
+
+    def _checkJumpPoint(self,x,y,dx,dy):
+        # the cells ahead of the move, and (blocker, hidden) pairs: when the
+        # blocker can't be crossed the hidden cell is a forced neighbour.
+        # Moves cut corners, so a straight move is blocked beside the cell
+        # and a diagonal one behind it.
+        if dx and dy:
+            ahead = ((x+dx,y),(x,y+dy),(x+dx,y+dy))
+            pairs = (((x-dx,y),(x-dx,y+dy)),((x,y-dy),(x+dx,y-dy)))
+        elif dx:
+            ahead = ((x+dx,y),)
+            pairs = (((x,y+1),(x+dx,y+1)),((x,y-1),(x+dx,y-1)))
+        else:
+            ahead = ((x,y+dy),)
+            pairs = (((x+1,y),(x+1,y+dy)),((x-1,y),(x-1,y+dy)))
+
+        c = self._cost(x,y)
+        for (ax,ay) in ahead:
+            a = self._cost(ax,ay)
+            if a != -1 and a != c:
+                return True
+        for (bx,by),(hx,hy) in pairs:
+            b = self._cost(bx,by)
+            h = self._cost(hx,hy)
+            if b != -1 and b != c:
+                return True
+            if h != -1 and (h != c or b == -1):
+                return True
+        return False
+
+    def _jump(self,x,y,dx,dy,gx,gy):
+        # walk from (x,y) in the direction (dx,dy) until a jump point is
+        # found, return it with the number of steps, or None
+        m = self.mh.m
+        w = self.mh.w
+        h = self.mh.h
+        points = self._jump_points[(dx,dy)]
+        steps = 0
+        while 1:
+            x += dx
+            y += dy
+            steps += 1
+            if x<0 or x>=w or y<0 or y>=h:
+                return None
+            lid = (y*w)+x
+            if m[lid] == -1:
+                return None
+            if x == gx and y == gy:
+                return x,y,steps
+            b = points.get(lid)
+            if b is None:
+                b = self._isJumpPoint(x,y,dx,dy)
+            if b:
+                return x,y,steps
+            if dx and dy:
+                if self._jump(x,y,dx,0,gx,gy) or self._jump(x,y,0,dy,gx,gy):
+                    return x,y,steps
+
+    def _successorDirections(self,x,y,px,py):
+        # cells reached along a jump only keep the natural neighbours of its
+        # direction, the start and the jump points keep all
+        if px is None:
+            return DIRECTIONS
+        dx = cmp(x,px)
+        dy = cmp(y,py)
+        if self._isJumpPoint(x,y,dx,dy):
+            return DIRECTIONS
+        if dx and dy:
+            return ((dx,0),(0,dy),(dx,dy))
+        return ((dx,dy),)
+
+    def _tracePath(self,parents,gx,gy):
+        # the jump points are joined cell by cell, so the result has the same
+        # form as the Path returned by AStar
+        points = [(gx,gy)]
+        while parents[points[-1]] is not None:
+            points.append(parents[points[-1]])
+        points.reverse()
+
+        x,y = points[0]
+        node = Node(SQ_Location(x,y),self._cost(x,y),(y*self.mh.w)+x)
+        nodes = []
+        for (jx,jy) in points[1:]:
+            dx = cmp(jx,x)
+            dy = cmp(jy,y)
+            multi = 1
+            if dx and dy:
+                multi = DIAGONAL
+            while (x,y) != (jx,jy):
+                x += dx
+                y += dy
+                node = Node(SQ_Location(x,y),node.mCost+self._cost(x,y)*multi,
+                (y*self.mh.w)+x,node)
+                nodes.append(node)
+
+        return Path(nodes,node.mCost)
+
+    def findPath(self,fromlocation,tolocation):
+        mh = self.mh
+        sx,sy = fromlocation.x,fromlocation.y
+        gx,gy = tolocation.x,tolocation.y
+        self.expanded = 0
+
+        if self._cost(sx,sy) == -1 or self._cost(gx,gy) == -1:
+            return None
+        if (sx,sy) == (gx,gy):
+            return Path([],0)
+
+        g = {(sx,sy):self._cost(sx,sy)}
+        parents = {(sx,sy):None}
+        closed = set()
+        heap = [(g[(sx,sy)],0,(sx,sy))]
+        seq = 0
+
+        while heap:
+            f,s,cell = heapq.heappop(heap)
+            if cell in closed:
+                continue
+            closed.add(cell)
+            self.expanded += 1
+
+            x,y = cell
+            if (x,y) == (gx,gy) and parents[cell] is not None:
+                return self._tracePath(parents,gx,gy)
+
+            parent = parents[cell]
+            if parent is None:
+                px,py = None,None
+            else:
+                px,py = parent
+
+            for dx,dy in self._successorDirections(x,y,px,py):
+                jp = self._jump(x,y,dx,dy,gx,gy)
+                if jp is None:
+                    continue
+                jx,jy,steps = jp
+                if (jx,jy) in closed:
+                    continue
+
+                # every cell crossed by a jump has the cost of the first one
+                multi = 1
+                if dx and dy:
+                    multi = DIAGONAL
+                ng = g[cell]+steps*self._cost(x+dx,y+dy)*multi
+
+                if ng < g.get((jx,jy),ng+1):
+                    g[(jx,jy)] = ng
+                    parents[(jx,jy)] = cell
+                    h = mh.heuristic(abs(jx-gx),abs(jy-gy))*mh.min_cost
+                    seq += 1
+                    heapq.heappush(heap,(ng+h,-seq,(jx,jy)))
+
+        return None
+
 class SQ_Location:
     """A simple Square Map Location implementation"""
     def __init__(self,x,y):
@@ -140,10 +359,15 @@ class SQ_Location:
 class SQ_MapHandler:
     """A simple Square Map implementation"""
 
-    def __init__(self,mapdata,width,height):
+    def __init__(self,mapdata,width,height,heuristic=octile,min_cost=1):
+        # heuristic is one of the functions in HEURISTICS, min_cost has to be
+        # the lowest move cost of a walkable cell so that the estimate is
+        # admissible
         self.m = mapdata
         self.w = width
         self.h = height
+        self.heuristic = heuristic
+        self.min_cost = min_cost
 
     def getNode(self, location,multi):
         """MUST BE IMPLEMENTED"""
@@ -177,13 +401,13 @@ class SQ_MapHandler:
         if n: result.append(n)
 
         #Diagonal nodes
-        n = self._handleNode(cl.x+1,cl.y+1,curnode,dl.x,dl.y,1.4142) # multi is 1.4142
+        n = self._handleNode(cl.x+1,cl.y+1,curnode,dl.x,dl.y,DIAGONAL) # multi is 1.4142
         if n: result.append(n)
-        n = self._handleNode(cl.x-1,cl.y-1,curnode,dl.x,dl.y,1.4142)
+        n = self._handleNode(cl.x-1,cl.y-1,curnode,dl.x,dl.y,DIAGONAL)
         if n: result.append(n)
-        n = self._handleNode(cl.x-1,cl.y+1,curnode,dl.x,dl.y,1.4142)
+        n = self._handleNode(cl.x-1,cl.y+1,curnode,dl.x,dl.y,DIAGONAL)
         if n: result.append(n)
-        n = self._handleNode(cl.x+1,cl.y-1,curnode,dl.x,dl.y,1.4142)
+        n = self._handleNode(cl.x+1,cl.y-1,curnode,dl.x,dl.y,DIAGONAL)
         if n: result.append(n)
 
         return result
@@ -194,7 +418,7 @@ class SQ_MapHandler:
         if n is not None:
             dx = max(x,destx) - min(x,destx)
             dy = max(y,desty) - min(y,desty)
-            emCost = dx+dy
+            emCost = self.heuristic(dx,dy)*self.min_cost
             n.mCost += fromnode.mCost                                   
             n.score = n.mCost+emCost
             n.parent=fromnode
@@ -0,0 +1,135 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/common.py
+#
+#   Description: This file contains helpers shared by the tests: random move
+#   cost grids, a plain Dijkstra search used as the reference for the path
+#   finders, and the cost of a path with the cost model of the game.
+#
+#   The tests are run from the folder WOH, like the game:
+#
+#   python -m unittest discover -s tests -t .
+#
+################################################################################
+
+import heapq
+import os
+from random import Random
+
+import satar_modif
+
+"""folder of the game, the files of the scenario are in it"""
+ROOT=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIO_FILES=('map.txt','terrtypes.txt','resource_types.txt',
+'resource_pos.txt','cities.txt','cities_pos.txt')
+
+NEIGHBOURS=((1,0,1),(-1,0,1),(0,1,1),(0,-1,1),
+(1,1,satar_modif.DIAGONAL),(-1,-1,satar_modif.DIAGONAL),
+(-1,1,satar_modif.DIAGONAL),(1,-1,satar_modif.DIAGONAL))
+
+
+def scenario_files(folder=ROOT):
+    """Return the paths of the six text files of the scenario in folder"""
+
+    return [os.path.join(folder,f) for f in SCENARIO_FILES]
+
+
+def random_costs(seed, width, height, blocked=0.25, max_cost=4):
+    """Return a list of width*height move costs, -1 for the cells that
+    can't be walked"""
+
+    rand=Random(seed)
+    costs=[]
+    for i in range(width*height):
+        if rand.random()<blocked:
+            costs.append(-1)
+        else:
+            costs.append(rand.randint(1,max_cost))
+    return costs
+
+
+def dijkstra(costs, width, height, start):
+    """Return {(col,row): cost} of the cheapest path from start to every
+    reachable cell, entering a cell costs its move cost, times
+    satar_modif.DIAGONAL for diagonal moves"""
+
+    dist={start:0}
+    queue=[(0,start)]
+    done=set()
+
+    while queue:
+        cost,(x,y)=heapq.heappop(queue)
+        if (x,y) in done:
+            continue
+        done.add((x,y))
+
+        for dx,dy,multi in NEIGHBOURS:
+            nx=x+dx
+            ny=y+dy
+            if nx<0 or nx>=width or ny<0 or ny>=height:
+                continue
+            c=costs[ny*width+nx]
+            if c==-1:
+                continue
+            if cost+c*multi<dist.get((nx,ny),cost+c*multi+1):
+                dist[(nx,ny)]=cost+c*multi
+                heapq.heappush(queue,(cost+c*multi,(nx,ny)))
+
+    return dist
+
+
+def path_cost(costs, width, start, cells):
+    """Return the cost of following a list of cells from start, or None if
+    two consecutive cells aren't neighbours or a cell can't be walked"""
+
+    total=0
+    (x,y)=start
+    for (nx,ny) in cells:
+        if max(abs(nx-x),abs(ny-y))!=1 or costs[ny*width+nx]==-1:
+            return None
+        if nx!=x and ny!=y:
+            total+=costs[ny*width+nx]*satar_modif.DIAGONAL
+        else:
+            total+=costs[ny*width+nx]
+        (x,y)=(nx,ny)
+    return total
+
+
+def walkable_cells(costs, width):
+    """Return the (col,row) cells that can be walked"""
+
+    return [(i%width,i/width) for i in range(len(costs)) if costs[i]!=-1]
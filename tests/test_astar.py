@@ -0,0 +1,164 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_astar.py
+#
+#   Description: Tests of the A* path finder of satar_modif, compared with a
+#   Dijkstra search over every cell.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import satar_modif
+from satar_modif import SQ_Location
+from tests.common import random_costs, dijkstra, path_cost, walkable_cells
+
+
+def find_path(finder_class, costs, width, height, start, goal,
+heuristic=satar_modif.octile, min_cost=1):
+    """Return the cells of the path found by an AStar or JPS object, or
+    None"""
+
+    map_handler=satar_modif.SQ_MapHandler(costs,width,height,heuristic,
+    min_cost)
+    p=finder_class(map_handler).findPath(SQ_Location(*start),
+    SQ_Location(*goal))
+
+    if not p:
+        return None
+    return [(n.location.x,n.location.y) for n in p.nodes]
+
+
+class PathFinderTest(unittest.TestCase):
+    """Base class of the tests of a path finder class"""
+
+    finder_class=satar_modif.AStar
+
+    def checkQueries(self, costs, width, height, queries, seed,
+    heuristic=satar_modif.octile, min_cost=1):
+        rand=Random(seed)
+        cells=walkable_cells(costs,width)
+
+        for i in range(queries):
+            start=rand.choice(cells)
+            goal=rand.choice(cells)
+            if start==goal:
+                continue
+
+            dist=dijkstra(costs,width,height,start)
+            path=find_path(self.finder_class,costs,width,height,start,goal,
+            heuristic,min_cost)
+
+            if goal not in dist:
+                self.assertEqual(path,None)
+                continue
+
+            self.assertNotEqual(path,None)
+            self.assertEqual(path[-1],goal)
+            self.assertAlmostEqual(path_cost(costs,width,start,path),
+            dist[goal],6)
+
+
+class AStarTest(PathFinderTest):
+
+    def testRandomMaps(self):
+        for seed in range(4):
+            costs=random_costs(seed,30,20,blocked=0.3)
+            self.checkQueries(costs,30,20,30,seed)
+
+    def testNoPath(self):
+        x=-1
+        costs=[1,1,x,1,
+               1,1,x,1,
+               x,x,x,1]
+        self.assertEqual(find_path(self.finder_class,costs,4,3,(0,0),
+        (3,0)),None)
+        self.assertEqual(find_path(self.finder_class,costs,4,3,(0,0),
+        (2,1)),None)
+
+    def testSameCell(self):
+        """a path from a cell to itself has no cells"""
+
+        costs=random_costs(1,30,20,blocked=0.3)
+        for cell in walkable_cells(costs,30)[:20]:
+            self.assertEqual(find_path(self.finder_class,costs,30,20,cell,
+            cell),[])
+
+    def testStraightLine(self):
+        costs=[1]*10
+        self.assertEqual(find_path(self.finder_class,costs,10,1,(0,0),
+        (9,0)),[(x,0) for x in range(1,10)])
+
+
+class HeuristicTest(PathFinderTest):
+
+    def testAdmissible(self):
+        """no heuristic overestimates the cost of the cheapest path, scaled
+        by the lowest move cost"""
+
+        for seed in range(3):
+            costs=[c+1 if c>0 else c for c in random_costs(seed,20,20)]
+            min_cost=min([c for c in costs if c>0])
+            start=walkable_cells(costs,20)[0]
+            dist=dijkstra(costs,20,20,start)
+
+            for heuristic in satar_modif.HEURISTICS.values():
+                for ((x,y),cost) in dist.items():
+                    self.assertTrue(heuristic(abs(x-start[0]),
+                    abs(y-start[1]))*min_cost<=cost+1e-9)
+
+    def testOptimalPaths(self):
+        """every heuristic gives the cheapest paths, on maps where the
+        lowest move cost is not 1"""
+
+        for seed in range(2):
+            costs=[c+1 if c>0 else c for c in random_costs(seed,25,20)]
+            for heuristic in satar_modif.HEURISTICS.values():
+                self.checkQueries(costs,25,20,15,seed,heuristic,2)
+
+    def testDiagonalCost(self):
+        """a diagonal move costs 1.4142 times a straight one"""
+
+        costs=[1]*9
+        path=find_path(satar_modif.AStar,costs,3,3,(0,0),(2,2))
+        self.assertEqual(path,[(1,1),(2,2)])
+        self.assertAlmostEqual(path_cost(costs,3,(0,0),path),
+        2*satar_modif.DIAGONAL)
+
+
+if __name__ == '__main__':
+    unittest.main()
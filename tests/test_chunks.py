@@ -0,0 +1,214 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_chunks.py
+#
+#   Description: Tests of the chunked map storage. A map kept in chunks, with
+#   a cache smaller than the map, is compared with the same compiled
+#   scenario kept in memory.
+#
+################################################################################
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from random import Random
+
+import woh_engine
+from woh_engine import engine, MapModel, Simulation, VisibilityMask, \
+ChunkedVisibilityMask, circular_stencil
+from tests.common import scenario_files
+
+
+class ChunkedMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self._options=(engine.map_storage,engine.chunk_size,
+        engine.chunk_cache_size,engine.path_algorithm)
+        engine.chunk_size=8
+        engine.chunk_cache_size=4
+
+        self.folder=tempfile.mkdtemp()
+        self.filename=os.path.join(self.folder,'scenario.wohs')
+        MapModel(*scenario_files()).saveCompiled(self.filename)
+
+    def tearDown(self):
+        (engine.map_storage,engine.chunk_size,engine.chunk_cache_size,
+        engine.path_algorithm)=self._options
+        shutil.rmtree(self.folder)
+
+    def loadMap(self, storage):
+        """Load the compiled scenario, the amounts of the resources are
+        random so the seed is always the same"""
+
+        engine.map_storage=storage
+        random.seed(5)
+        return MapModel(self.filename)
+
+    def testLayers(self):
+        memory=self.loadMap('memory')
+        chunked=self.loadMap('chunked')
+
+        self.assertTrue(chunked.isChunked())
+        self.assertEqual(list(chunked.getMoveCost1D()),
+        list(memory.getMoveCost1D()))
+        self.assertEqual(chunked.getChunkStore().getStats()['resident'],4)
+
+    def testTerrainEdits(self):
+        """cells changed in chunks that were dropped keep their terrain"""
+
+        memory=self.loadMap('memory')
+        chunked=self.loadMap('chunked')
+        dims=memory.getDimensions()
+        rand=Random(2)
+
+        for i in range(200):
+            cell={'col':rand.randrange(dims['num_cols']-1),
+            'row':rand.randrange(dims['num_rows']-1)}
+            terrain_id=rand.choice(['1','2','3','4','8'])
+            memory.setCellTerrain(cell,terrain_id)
+            chunked.setCellTerrain(cell,terrain_id)
+
+        self.assertTrue(chunked.getChunkStore().getStats()['evictions']>0)
+        self.assertEqual(list(chunked.getMoveCost1D()),
+        list(memory.getMoveCost1D()))
+
+        memory.saveCompiled(os.path.join(self.folder,'memory.wohs'))
+        chunked.saveCompiled(os.path.join(self.folder,'chunked.wohs'))
+        self.assertEqual(open(os.path.join(self.folder,'chunked.wohs'),
+        'rb').read(),open(os.path.join(self.folder,'memory.wohs'),
+        'rb').read())
+
+    def testLastChunk(self):
+        """cells read again from the last chunk see the changes, and the
+        ones of chunks dropped in between"""
+
+        memory=self.loadMap('memory')
+        chunked=self.loadMap('chunked')
+        dims=memory.getDimensions()
+        costs=chunked.getMoveCost1D()
+        rand=Random(3)
+
+        for i in range(200):
+            cell={'col':rand.randrange(dims['num_cols']-1),
+            'row':rand.randrange(dims['num_rows']-1)}
+            index=cell['row']*(dims['num_cols']-1)+cell['col']
+            costs[index]
+            terrain_id=rand.choice(['1','2','3','4','8'])
+            memory.setCellTerrain(cell,terrain_id)
+            chunked.setCellTerrain(cell,terrain_id)
+            self.assertEqual(costs[index],memory.getMoveCost1D()[index])
+
+        self.assertTrue(chunked.getChunkStore().getStats()['evictions']>0)
+
+    def play(self, storage):
+        """Return the position, resources and visible cells of the armies
+        after some turns"""
+
+        simulation=Simulation(self.loadMap(storage),1)
+        for (name,cell) in zip(('red','blue','green','yellow'),
+        ((0,0),(20,2),(5,15),(15,10))):
+            simulation.addArmy(name,cell)
+        simulation.run(100)
+
+        return [(army_obj.getPos(),army_obj.getResources(),
+        len(army_obj.getRevealedCells())) for army_obj in
+        simulation.getArmies()]
+
+    def testSimulation(self):
+        """with A* the armies take the same paths on both maps. D* Lite
+        and HPA* are replaced by A* on chunked maps, so their paths can be
+        different"""
+
+        engine.path_algorithm='astar'
+        self.assertEqual(self.play('chunked'),self.play('memory'))
+
+        engine.path_algorithm='dstar'
+        self.assertEqual(self.loadMap('chunked').getPathAlgorithm(),'astar')
+        self.assertEqual(self.loadMap('memory').getPathAlgorithm(),'dstar')
+
+
+class ChunkedVisibilityMaskTest(unittest.TestCase):
+
+    def testSameCells(self):
+        rand=Random(4)
+        rows=37
+        cols=45
+        memory=VisibilityMask(rows,cols)
+        chunked=ChunkedVisibilityMask(rows,cols,8)
+
+        for i in range(40):
+            stencil=circular_stencil(rand.randint(0,6))
+            row=rand.randrange(-3,rows+3)
+            col=rand.randrange(-3,cols+3)
+            self.assertEqual(sorted(chunked.reveal(stencil,row,col)),
+            sorted(memory.reveal(stencil,row,col)))
+
+            cells=[(rand.randrange(cols),rand.randrange(rows)) for j in
+            range(5)]
+            self.assertEqual(sorted(chunked.revealCells(cells)),
+            sorted(memory.revealCells(cells)))
+
+        self.assertEqual(chunked.count(),memory.count())
+        for row in range(rows):
+            for col in range(cols):
+                self.assertEqual(chunked.isVisible(row,col),
+                memory.isVisible(row,col))
+
+    def testUnionIntersection(self):
+        rand=Random(5)
+        masks=[]
+        for i in range(2):
+            memory=VisibilityMask(30,30)
+            chunked=ChunkedVisibilityMask(30,30,8)
+            cells=[(rand.randrange(30),rand.randrange(30)) for j in
+            range(200)]
+            memory.revealCells(cells)
+            chunked.revealCells(cells)
+            masks.append((memory,chunked))
+
+        ((m1,c1),(m2,c2))=masks
+        for (memory,chunked) in ((m1.union(m2),c1.union(c2)),
+        (m1.intersection(m2),c1.intersection(c2))):
+            self.assertEqual(chunked.count(),memory.count())
+            all_cells=[(r,c) for r in range(30) for c in range(30)]
+            self.assertEqual(chunked.getVisibleCells(all_cells),
+            memory.getVisibleCells(all_cells))
+
+
+if __name__ == '__main__':
+    unittest.main()
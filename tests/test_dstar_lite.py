@@ -0,0 +1,145 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_dstar_lite.py
+#
+#   Description: Tests of the incremental D* Lite planner, compared with a
+#   Dijkstra search over every cell after the planner repairs its search.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import dstar_lite
+import woh_engine
+from tests.common import random_costs, dijkstra, path_cost, walkable_cells, \
+scenario_files
+
+
+class DStarLiteTest(unittest.TestCase):
+
+    def checkPath(self, costs, width, height, start, goal, path):
+        """Check that path is a cheapest path from start to goal"""
+
+        dist=dijkstra(costs,width,height,start)
+
+        if goal not in dist:
+            self.assertEqual(path,None)
+            return
+
+        self.assertNotEqual(path,None)
+        if start==goal:
+            return
+
+        self.assertEqual(path[-1],goal)
+        self.assertAlmostEqual(path_cost(costs,width,start,path),dist[goal],
+        6)
+
+    def testFirstSearch(self):
+        rand=Random(1)
+        costs=random_costs(1,30,20)
+        cells=walkable_cells(costs,30)
+
+        for i in range(30):
+            start=rand.choice(cells)
+            goal=rand.choice(cells)
+            planner=dstar_lite.DStarLite(costs,30,20)
+            self.checkPath(costs,30,20,start,goal,planner.findPath(start,
+            goal))
+
+    def testIncrementalRepair(self):
+        """the start walks along the path while random cells change their
+        cost, and the planner repairs its search after each change"""
+
+        """seed 96 stopped the search early when km was rounded"""
+        for seed in range(6)+[96]:
+            rand=Random(seed)
+            costs=random_costs(seed,24,24,blocked=0.2)
+            cells=walkable_cells(costs,24)
+            planner=dstar_lite.DStarLite(costs,24,24)
+
+            start=rand.choice(cells)
+            goal=rand.choice(cells)
+
+            for step in range(60):
+                path=planner.findPath(start,goal)
+                self.checkPath(costs,24,24,start,goal,path)
+
+                if path:
+                    start=path[0]
+                else:
+                    start=rand.choice(cells)
+                    goal=rand.choice(cells)
+
+                """the changed cells are given on every other step, the
+                planner compares every cell on the others"""
+                changed=[]
+                for i in range(rand.randint(0,3)):
+                    cell=rand.randrange(len(costs))
+                    if (cell%24,cell/24) not in (start,goal):
+                        costs[cell]=rand.choice([-1,1,1,2,3,4])
+                        changed.append(cell)
+                if step%2:
+                    planner.updateCosts(costs,changed)
+                else:
+                    planner.updateCosts(costs)
+
+                """cells that became walkable can be new starts"""
+                cells=walkable_cells(costs,24)
+                if costs[start[1]*24+start[0]]==-1:
+                    start=rand.choice(cells)
+                    goal=rand.choice(cells)
+
+    def testMapCostChanges(self):
+        """the map logs the cells changed by setCellTerrain for the
+        planners"""
+
+        map_obj=woh_engine.MapModel(*scenario_files())
+        cols=map_obj.getDimensions()['num_cols']-1
+        version=map_obj.getCostVersion()
+        self.assertEqual(map_obj.getCostChanges(version),[])
+        self.assertEqual(map_obj.getCostChanges(version-1),None)
+
+        terrain_id=map_obj._terrain_list[0].getID()
+        for (col,row) in ((3,4),(5,1),(3,4)):
+            map_obj.setCellTerrain({'col':col,'row':row},terrain_id)
+        self.assertEqual(map_obj.getCostChanges(version),
+        [4*cols+3,1*cols+5,4*cols+3])
+        self.assertEqual(map_obj.getCostChanges(version+2),[4*cols+3])
+
+
+if __name__ == '__main__':
+    unittest.main()
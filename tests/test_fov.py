@@ -0,0 +1,123 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_fov.py
+#
+#   Description: Tests of the field of view: without opaque cells every cell
+#   within the radius is seen, opaque cells hide the cells behind them, and
+#   adding opaque cells never shows more cells.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import fov
+import woh_engine
+from tests.common import scenario_files
+
+
+def disk(x, y, radius, width, height):
+    """Return the set of (column,row) cells within radius of (x,y)"""
+
+    limit=radius*(radius+1)
+    return set([(c,r) for r in range(height) for c in range(width) if
+    (c-x)**2+(r-y)**2<=limit])
+
+
+class FieldOfViewTest(unittest.TestCase):
+
+    def testOpenMap(self):
+        field=fov.FieldOfView([0]*30*20,30,20)
+        for (cell,radius) in (((10,10),0),((10,10),4),((0,0),6),((29,19),3),
+        ((5,18),9)):
+            self.assertEqual(set(field.compute(cell,radius)),
+            disk(cell[0],cell[1],radius,30,20))
+
+    def testWall(self):
+        """a wall across the map, the cells of the wall are seen but not the
+        cells behind it"""
+
+        opacity=[0]*20*20
+        for x in range(20):
+            opacity[12*20+x]=1
+        field=fov.FieldOfView(opacity,20,20)
+
+        visible=set(field.compute((10,8),8))
+        self.assertTrue((10,12) in visible)
+        self.assertTrue((14,12) in visible)
+        self.assertEqual([(x,y) for (x,y) in visible if y>12],[])
+
+    def testMoreOpaqueCells(self):
+        rand=Random(3)
+        for i in range(20):
+            opacity=[int(rand.random()<0.15) for j in range(25*25)]
+            more=[o or int(rand.random()<0.1) for o in opacity]
+            cell=(rand.randrange(25),rand.randrange(25))
+            radius=rand.randint(1,8)
+
+            visible=set(fov.FieldOfView(opacity,25,25).compute(cell,radius))
+            fewer=set(fov.FieldOfView(more,25,25).compute(cell,radius))
+
+            self.assertTrue(cell in visible)
+            self.assertTrue(visible<=disk(cell[0],cell[1],radius,25,25))
+            self.assertTrue(fewer<=visible)
+
+    def testCache(self):
+        opacity=[0]*10*10
+        field=fov.FieldOfView(opacity,10,10)
+        first=field.getVisible((2,2),5,1)
+        self.assertEqual(field.getVisible((2,2),5,1),first)
+        self.assertEqual(field.getStats()['hits'],1)
+
+        """the opacity changes with a new version"""
+        for y in range(10):
+            opacity[y*10+4]=1
+        visible=field.getVisible((2,2),5,2)
+        self.assertEqual([(x,y) for (x,y) in visible if x>4],[])
+
+
+    def testScenarioTerrains(self):
+        """forests and mountains block the sight"""
+
+        map_obj=woh_engine.MapModel(*scenario_files())
+        for terrain in map_obj._terrain_list:
+            name=terrain.getTerrainName()
+            self.assertEqual(terrain.getIsOpaque(),'forest' in name or
+            'mountain' in name,name)
+
+
+if __name__ == '__main__':
+    unittest.main()
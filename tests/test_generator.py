@@ -0,0 +1,110 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_generator.py
+#
+#   Description: Tests of the procedural scenario generator: a seed always
+#   gives the same scenario, and every walkable cell of it can be reached
+#   from the others.
+#
+################################################################################
+
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+
+import woh_engine
+import woh_generator
+from tests.common import SCENARIO_FILES, scenario_files, dijkstra, \
+walkable_cells
+
+
+class ScenarioGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder=tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def generate(self, name, seed, cols=80, rows=50):
+        """Generate a scenario in a folder of the temporary folder and return
+        the path of the folder"""
+
+        directory=os.path.join(self.folder,name)
+        generator=woh_generator.ScenarioGenerator(cols,rows,seed)
+        generator.generate()
+        generator.write(directory)
+        return directory
+
+    def testSameSeed(self):
+        first=self.generate('first',7)
+        second=self.generate('second',7)
+        other=self.generate('other',8)
+
+        (match,mismatch,errors)=filecmp.cmpfiles(first,second,
+        SCENARIO_FILES,shallow=False)
+        self.assertEqual(sorted(match),sorted(SCENARIO_FILES))
+
+        self.assertFalse(filecmp.cmp(os.path.join(first,'map.txt'),
+        os.path.join(other,'map.txt'),shallow=False))
+
+    def testConnected(self):
+        for seed in (1,2,3):
+            map_obj=woh_engine.MapModel(*scenario_files(self.generate(
+            str(seed),seed)))
+            dims=map_obj.getDimensions()
+            cols=dims['num_cols']-1
+            rows=dims['num_rows']-1
+            costs=list(map_obj.getMoveCost1D())
+
+            """every spot is on a walkable cell, and every walkable cell is
+            reached from the first city"""
+            index=map_obj.getResourceIndex()
+            cities=map_obj.getCities()
+            self.assertTrue(len(cities)>=4)
+            for res_id in map_obj._resource_spots:
+                (col,row)=index.getCell(res_id)
+                self.assertNotEqual(costs[row*cols+col],-1)
+
+            reached=dijkstra(costs,cols,rows,index.getCell(cities[0]))
+            self.assertEqual(sorted(reached),sorted(walkable_cells(costs,
+            cols)))
+
+
+if __name__ == '__main__':
+    unittest.main()
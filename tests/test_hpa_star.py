@@ -0,0 +1,185 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_hpa_star.py
+#
+#   Description: Tests of the hierarchical path finding, compared with a
+#   Dijkstra search over every cell.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import hpa_star
+import woh_engine
+import woh_generator
+from tests.common import random_costs, dijkstra, path_cost, walkable_cells, \
+scenario_files
+
+
+def generated_costs(cols, rows, seed, ocean, mountains):
+    """Return the move costs of the terrain of a generated scenario"""
+
+    generator=woh_generator.ScenarioGenerator(cols,rows,seed,ocean=ocean,
+    mountains=mountains)
+    generator.generate()
+    return [woh_generator.TERRAIN_TYPES[code][2] for code in
+    generator._grid]
+
+
+class ClusterMapTest(unittest.TestCase):
+
+    def checkQueries(self, costs, width, height, cluster_size, queries,
+    seed=1):
+        """Compare random queries with Dijkstra, return the mean ratio
+        between the cost of the paths and the optimal cost"""
+
+        cluster_map=hpa_star.ClusterMap(costs,width,height,cluster_size)
+        rand=Random(seed)
+        cells=walkable_cells(costs,width)
+        ratios=[]
+
+        for i in range(queries):
+            start=rand.choice(cells)
+            goal=rand.choice(cells)
+            dist=dijkstra(costs,width,height,start)
+            path=cluster_map.findPath(start,goal)
+
+            if goal not in dist:
+                self.assertEqual(path,None)
+                continue
+
+            self.assertNotEqual(path,None,'no path from %s to %s' %
+            (start,goal))
+            if start==goal:
+                continue
+
+            self.assertEqual(path[-1],goal)
+            cost=path_cost(costs,width,start,path)
+            self.assertNotEqual(cost,None)
+            self.assertTrue(cost>=dist[goal]-1e-6)
+            ratios.append(cost/dist[goal])
+
+        return sum(ratios)/max(len(ratios),1)
+
+    def testRandomMaps(self):
+        for seed in range(4):
+            costs=random_costs(seed,40,30,blocked=0.3)
+            for cluster_size in (3,4,10):
+                ratio=self.checkQueries(costs,40,30,cluster_size,40,seed)
+                self.assertTrue(ratio<1.25,ratio)
+
+    def testGeneratedMap(self):
+        """narrow diagonal passes between oceans and mountains"""
+
+        costs=generated_costs(150,90,1,0.45,0.25)
+        for cluster_size in (4,10):
+            self.checkQueries(costs,150,90,cluster_size,60)
+
+    def testDiagonalBorderCrossing(self):
+        """the only way to the right cluster is a diagonal move across the
+        border"""
+
+        x=-1
+        costs=[1,1,1,x,x,x,
+               1,1,1,x,x,x,
+               x,x,x,1,1,1]
+        cluster_map=hpa_star.ClusterMap(costs,6,3,3)
+        path=cluster_map.findPath((0,0),(5,2))
+        self.assertNotEqual(path,None)
+        self.assertEqual(path[2:],[(3,2),(4,2),(5,2)])
+        self.assertAlmostEqual(path_cost(costs,6,(0,0),path),
+        dijkstra(costs,6,3,(0,0))[(5,2)])
+
+    def testCornerCrossing(self):
+        """two clusters that only touch at a corner"""
+
+        x=-1
+        costs=[1,1,x,x,
+               1,1,x,x,
+               x,x,1,1,
+               x,x,1,1]
+        cluster_map=hpa_star.ClusterMap(costs,4,4,2)
+        path=cluster_map.findPath((0,0),(3,3))
+        self.assertNotEqual(path,None)
+        self.assertEqual(path_cost(costs,4,(0,0),path),
+        dijkstra(costs,4,4,(0,0))[(3,3)])
+
+    def testOutsideMap(self):
+        """the scenario of the game has a resource spot below the last
+        row"""
+
+        costs=random_costs(2,10,10,blocked=0)
+        cluster_map=hpa_star.ClusterMap(costs,10,10,5)
+        for (start,goal) in (((1,1),(2,10)),((2,10),(1,1)),((1,1),(-1,3)),
+        ((1,1),(10,3))):
+            self.assertEqual(cluster_map.findPath(start,goal),None)
+
+    def testUpdateCellsMatchesRebuild(self):
+        rand=Random(3)
+        costs=random_costs(3,30,30)
+        cluster_map=hpa_star.ClusterMap(costs,30,30,5)
+
+        for i in range(200):
+            cell=(rand.randrange(30),rand.randrange(30))
+            costs[cell[1]*30+cell[0]]=rand.choice([-1,1,2,3])
+            cluster_map.updateCells([cell])
+
+        rebuilt=hpa_star.ClusterMap(list(costs),30,30,5)
+        self.assertEqual(cluster_map._inter,rebuilt._inter)
+        self.assertEqual(cluster_map._intra,rebuilt._intra)
+
+    def testMapPrecompute(self):
+        """the map builds its cluster graph when it is loaded if HPA* is the
+        selected algorithm, and the first time it is used otherwise"""
+
+        engine=woh_engine.engine
+        algorithm=engine.path_algorithm
+        try:
+            engine.path_algorithm='hpa'
+            map_obj=woh_engine.MapModel(*scenario_files())
+            self.assertNotEqual(map_obj._cluster_map,None)
+
+            engine.path_algorithm='dstar'
+            map_obj=woh_engine.MapModel(*scenario_files())
+            self.assertEqual(map_obj._cluster_map,None)
+            self.assertNotEqual(map_obj.getClusterMap(),None)
+        finally:
+            engine.path_algorithm=algorithm
+
+
+if __name__ == '__main__':
+    unittest.main()
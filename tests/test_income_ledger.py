@@ -0,0 +1,119 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_income_ledger.py
+#
+#   Description: Tests of the income ledger of the map, compared with the
+#   income added up from the owner of every resource spot.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import woh_engine
+from woh_engine import PlayerModel
+from tests.common import scenario_files
+
+
+class IncomeLedgerTest(unittest.TestCase):
+
+    def getIncome(self, map_obj, owner):
+        """Return the income of owner, added up from every resource spot"""
+
+        income={}
+        for res_obj in map_obj._resource_spots.values():
+            if res_obj.getOwner()[0]==owner:
+                res_type=res_obj.getType()
+                income[res_type]=income.get(res_type,0)+ \
+                res_obj.getTurnAmount()
+        return income
+
+    def checkLedger(self, map_obj, armies):
+        ledger=map_obj.getIncomeLedger()
+        for army_obj in armies:
+            owner=army_obj.getID()
+            expected=self.getIncome(map_obj,owner)
+
+            income=ledger.getIncome(owner)
+            for res_type in income.keys():
+                if income[res_type]==0 and res_type not in expected:
+                    del income[res_type]
+            self.assertEqual(income,expected)
+
+            self.assertEqual(sorted(ledger.getSpots(owner)),sorted([r for r
+            in map_obj._resource_spots if
+            map_obj.getResourceOwner(r)[0]==owner]))
+
+    def testOwnerChanges(self):
+        map_obj=woh_engine.MapModel(*scenario_files())
+        armies=[PlayerModel(name,0,0,0,(0,0,0),map_obj) for name in
+        ('red','blue','green')]
+        rand=Random(2)
+
+        for i in range(300):
+            res_ids=sorted(map_obj._resource_spots)
+            res_id=rand.choice(res_ids)
+            army_obj=rand.choice(armies)
+
+            if rand.random()<0.05:
+                map_obj.removeResourceSpot(res_id)
+            else:
+                map_obj.setResourceOwner(army_obj.getID(),
+                army_obj.getName(),res_id,army_obj.getColour())
+
+            self.checkLedger(map_obj,armies)
+
+    def testPayment(self):
+        map_obj=woh_engine.MapModel(*scenario_files())
+        army_obj=PlayerModel('red',0,0,0,(0,0,0),map_obj)
+        res_ids=sorted(map_obj._resource_spots)[:10]
+
+        for res_id in res_ids:
+            map_obj.setResourceOwner(army_obj.getID(),army_obj.getName(),
+            res_id,army_obj.getColour())
+
+        before=dict(army_obj.getResources())
+        map_obj.payTurnResources(army_obj)
+        after=army_obj.getResources()
+
+        income=self.getIncome(map_obj,army_obj.getID())
+        for res_type in after:
+            self.assertEqual(after[res_type]-before[res_type],
+            income.get(res_type,0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_jps.py
+#
+#   Description: Tests of the Jump Point Search of satar_modif. The tests of
+#   A* are run with JPS, and more queries are made on maps with large areas
+#   of a single terrain cost, where JPS jumps the furthest.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import satar_modif
+import tests.test_astar as test_astar
+from tests.common import random_costs
+
+
+def region_costs(seed, width, height, size):
+    """Return a list of width*height move costs made of square regions of
+    size cells with a single cost, -1 for the regions that can't be
+    walked"""
+
+    rand=Random(seed)
+    regions={}
+    for y in range(0,height,size):
+        for x in range(0,width,size):
+            if rand.random()<0.15:
+                regions[(x,y)]=-1
+            else:
+                regions[(x,y)]=rand.randint(1,3)
+    return [regions[((i%width)/size*size,(i/width)/size*size)] for i in
+    range(width*height)]
+
+
+class JPSTest(test_astar.AStarTest):
+
+    finder_class=satar_modif.JPS
+
+    def testUniformMap(self):
+        costs=random_costs(5,40,30,blocked=0.1,max_cost=1)
+        self.checkQueries(costs,40,30,30,5)
+
+    def testRegionMap(self):
+        for seed in (1,2):
+            costs=region_costs(seed,80,50,10)
+            self.checkQueries(costs,80,50,30,seed)
+
+    def testChebyshev(self):
+        """the jump points are ordered by the heuristic of the map handler,
+        the paths are the cheapest with the other heuristics too"""
+
+        costs=region_costs(3,60,40,8)
+        self.checkQueries(costs,60,40,20,3,satar_modif.chebyshev)
+
+    def testJumpsAlongWalls(self):
+        """on a single cost with a wall, the cells along the wall and the
+        map border are not jump points, JPS expands far fewer cells than
+        AStar"""
+
+        costs=[1]*60*60
+        for y in range(5,55):
+            costs[y*60+30]=-1
+        map_handler=satar_modif.SQ_MapHandler(costs,60,60)
+        start=satar_modif.SQ_Location(2,30)
+        goal=satar_modif.SQ_Location(57,30)
+
+        astar=satar_modif.AStar(map_handler)
+        jps=satar_modif.JPS(map_handler)
+        self.assertAlmostEqual(jps.findPath(start,goal).getTotalMoveCost(),
+        astar.findPath(start,goal).getTotalMoveCost())
+        self.assertTrue(jps.expanded*10<astar.expanded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_path_cache.py
+#
+#   Description: Tests of the least recently used cache of paths of a map,
+#   and of the paths the armies take from it.
+#
+################################################################################
+
+import unittest
+
+import woh_engine
+from woh_engine import PathCache, PlayerModel, engine
+from tests.common import scenario_files
+
+
+class PathCacheTest(unittest.TestCase):
+
+    def testLeastRecentlyUsed(self):
+        cache=PathCache(2)
+        cache.put((0,0),(2,0),'astar',[(1,0),(2,0)],1)
+        cache.put((0,1),(2,1),'astar',[(1,1),(2,1)],1)
+
+        """the first path is used, so the second one is the oldest"""
+        self.assertEqual(cache.get((0,0),(2,0),'astar',1),[(1,0),(2,0)])
+        cache.put((0,2),(2,2),'astar',[(1,2),(2,2)],1)
+
+        self.assertEqual(cache.get((0,1),(2,1),'astar',1),None)
+        self.assertEqual(cache.get((0,0),(2,0),'astar',1),[(1,0),(2,0)])
+        self.assertEqual(cache.get((0,2),(2,2),'astar',1),[(1,2),(2,2)])
+        self.assertEqual(cache.getStats()['size'],2)
+
+    def testSubpath(self):
+        cache=PathCache(4)
+        cache.put((0,0),(3,0),'astar',[(1,0),(2,0),(3,0)],1)
+
+        self.assertEqual(cache.get((1,0),(3,0),'astar',1),[(2,0),(3,0)])
+        self.assertEqual(cache.get((1,0),(3,0),'hpa',1),None)
+        self.assertEqual(cache.getStats()['subpath_hits'],1)
+
+    def testAlgorithmAndVersion(self):
+        cache=PathCache(4)
+        cache.put((0,0),(2,0),'hpa',[(1,1),(2,0)],1)
+
+        self.assertEqual(cache.get((0,0),(2,0),'astar',1),None)
+        self.assertEqual(cache.get((0,0),(2,0),'hpa',1),[(1,1),(2,0)])
+
+        """a new cost version empties the cache"""
+        self.assertEqual(cache.get((0,0),(2,0),'hpa',2),None)
+        self.assertEqual(cache.getStats()['size'],0)
+
+    def testCopies(self):
+        cache=PathCache(4)
+        cells=[(1,0),(2,0)]
+        cache.put((0,0),(2,0),'astar',cells,1)
+        cells.append((3,0))
+        cache.get((0,0),(2,0),'astar',1).append((3,0))
+
+        self.assertEqual(cache.get((0,0),(2,0),'astar',1),[(1,0),(2,0)])
+
+
+class ArmyPathTest(unittest.TestCase):
+
+    def setUp(self):
+        self._algorithm=engine.path_algorithm
+        self.map_obj=woh_engine.MapModel(*scenario_files())
+        self.army=PlayerModel('red',0,0,0,(220,20,60),self.map_obj)
+
+    def tearDown(self):
+        engine.path_algorithm=self._algorithm
+
+    def testAlgorithmChange(self):
+        """a path found with one algorithm is not returned for another"""
+
+        start=(1,1)
+        end=(20,15)
+
+        for algorithm in ('hpa','astar','dstar','jps'):
+            engine.path_algorithm=algorithm
+            self.assertEqual(self.army.findPathCells(start,end,self.map_obj),
+            self.army.searchPathCells(start,end,self.map_obj))
+
+        self.assertEqual(self.map_obj.getPathCache().getStats()['size'],4)
+
+
+if __name__ == '__main__':
+    unittest.main()
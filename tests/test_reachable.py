@@ -0,0 +1,158 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_reachable.py
+#
+#   Description: Tests of the cells an army can reach in a turn, compared
+#   with a Dijkstra search over the whole map with the costs charged to the
+#   armies.
+#
+################################################################################
+
+import heapq
+import unittest
+from random import Random
+
+import satar_modif
+import woh_engine
+from tests.common import scenario_files
+
+
+def charged_costs(map_obj, start):
+    """Return {cell: cost} of every cell reachable from start, with the cost
+    charged to an army that moves between two cells"""
+
+    dims=map_obj.getDimensions()
+    cols=dims['num_cols']-1
+    rows=dims['num_rows']-1
+    move_cost=map_obj.getMoveCost1D()
+
+    dist={start:0}
+    queue=[(0,start)]
+    while queue:
+        cost,cell=heapq.heappop(queue)
+        if cost>dist[cell]:
+            continue
+        for dx,dy in satar_modif.DIRECTIONS:
+            (x,y)=(cell[0]+dx,cell[1]+dy)
+            if x<0 or x>=cols or y<0 or y>=rows or move_cost[y*cols+x]==-1:
+                continue
+            new_cost=cost+map_obj.getCostBetweenCells(cell,(x,y))
+            if new_cost<dist.get((x,y),new_cost+1):
+                dist[(x,y)]=new_cost
+                heapq.heappush(queue,(new_cost,(x,y)))
+
+    return dist
+
+
+class ReachableAreaTest(unittest.TestCase):
+
+    def testBudgets(self):
+        map_obj=woh_engine.MapModel(*scenario_files())
+        rand=Random(1)
+        move_cost=map_obj.getMoveCost1D()
+        cols=map_obj.getDimensions()['num_cols']-1
+        cells=[(i%cols,i/cols) for i in range(len(move_cost)) if
+        move_cost[i]!=-1]
+
+        for i in range(10):
+            start=rand.choice(cells)
+            dist=charged_costs(map_obj,start)
+
+            for budget in (0,1,4.5,10,30):
+                reach=map_obj.getReachable(start,budget)
+                expected=[c for c in dist if dist[c]<=budget]
+                self.assertEqual(sorted(reach.getCells()),sorted(expected))
+
+                for cell in reach.getCells():
+                    self.assertAlmostEqual(reach.getCost(cell),dist[cell])
+
+                    """the path is made of adjacent cells and costs what
+                    the area says"""
+                    cost=0
+                    previous=start
+                    for c in reach.getPathTo(cell):
+                        self.assertTrue(max(abs(c[0]-previous[0]),
+                        abs(c[1]-previous[1]))==1)
+                        cost+=map_obj.getCostBetweenCells(previous,c)
+                        previous=c
+                    self.assertAlmostEqual(cost,reach.getCost(cell))
+
+        self.assertFalse(reach.isReachable((-1,-1)))
+
+    def testPlayerPath(self):
+        """the path of the player is found with the selected algorithm, and
+        it is blue up to where the moves of the turn run out"""
+
+        map_obj=woh_engine.MapModel(*scenario_files())
+        engine=woh_engine.engine
+        rand=Random(2)
+        move_cost=map_obj.getMoveCost1D()
+        cols=map_obj.getDimensions()['num_cols']-1
+        cells=[(i%cols,i/cols) for i in range(len(move_cost)) if
+        move_cost[i]!=-1]
+
+        for i in range(30):
+            start=rand.choice(cells)
+            end=rand.choice(cells)
+            player=woh_engine.PlayerModel('red',start[0]*engine.tile_x,
+            start[1]*engine.tile_y,0,(0,0,0),map_obj)
+            player.setPath((end[0]*engine.tile_x,end[1]*engine.tile_y),
+            map_obj)
+
+            path=player._path
+            points=path.getBluePoints()+path.getRedPoints()[1:]
+            found=player.findPathCells(start,end,map_obj)
+            if start==end or not found:
+                continue
+            self.assertEqual([(x/engine.tile_x,y/engine.tile_y) for (x,y)
+            in points[1:]],found)
+
+            blue=[(x/engine.tile_x,y/engine.tile_y) for (x,y) in
+            path.getBluePoints()]
+            cost=0
+            for j in range(len(blue)-1):
+                cost+=map_obj.getCostBetweenCells(blue[j],blue[j+1])
+            self.assertTrue(cost<=player.getMovesLeft())
+
+            """the first red cell costs more than the moves left"""
+            if path.getRedPoints():
+                next_cell=found[len(blue)-1]
+                self.assertTrue(cost+map_obj.getCostBetweenCells(blue[-1],
+                next_cell)>player.getMovesLeft())
+
+
+if __name__ == '__main__':
+    unittest.main()
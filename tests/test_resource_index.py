@@ -0,0 +1,116 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_resource_index.py
+#
+#   Description: Tests of the index of resource spots by cell, with the
+#   spots of the scenario and with random spots compared with a search over
+#   every spot.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import woh_engine
+from tests.common import scenario_files
+
+
+class ResourceIndexTest(unittest.TestCase):
+
+    def testScenarioSpots(self):
+        """every spot of the scenario is indexed, also the ones that share
+        a cell with another spot"""
+
+        map_obj=woh_engine.MapModel(*scenario_files())
+        index=map_obj.getResourceIndex()
+        spots=map_obj._resource_spots
+
+        self.assertEqual(len(index),len(spots))
+
+        for res_id in spots:
+            x,y=spots[res_id].getPos()
+            cell=map_obj.getCellFromXY(x,y)
+            self.assertTrue(res_id in index.getAllAt((cell['col'],
+            cell['row'])))
+            self.assertEqual(map_obj.resOnCellXY(x,y)[0],True)
+
+    def testSharedCell(self):
+        index=woh_engine.ResourceIndex(4)
+        index.add(1,(3,3))
+        index.add(2,(3,3))
+
+        self.assertEqual(index.getAt((3,3)),1)
+        self.assertEqual(index.getAllAt((3,3)),[1,2])
+        self.assertEqual(sorted(index.getInCellRect((3,3,1,1))),[1,2])
+        self.assertEqual(sorted(index.getInRadius((0,0),10)),[1,2])
+
+        index.remove(1)
+        self.assertEqual(index.getAt((3,3)),2)
+        index.remove(2)
+        self.assertEqual(index.getAt((3,3)),None)
+        self.assertEqual(len(index),0)
+
+    def testRandomQueries(self):
+        rand=Random(3)
+        index=woh_engine.ResourceIndex(8)
+        cells={}
+        for res_id in range(300):
+            cells[res_id]=(rand.randrange(100),rand.randrange(60))
+            index.add(res_id,cells[res_id])
+
+        for res_id in range(0,300,3):
+            index.remove(res_id)
+            del cells[res_id]
+
+        for i in range(200):
+            col=rand.randrange(-10,100)
+            row=rand.randrange(-10,60)
+            width=rand.randint(1,40)
+            height=rand.randint(1,40)
+            expected=[r for r,(c,w) in cells.items() if c>=col and
+            c<col+width and w>=row and w<row+height]
+            self.assertEqual(sorted(index.getInCellRect((col,row,width,
+            height))),sorted(expected))
+
+            radius=rand.uniform(0,20)
+            expected=[r for r,(c,w) in cells.items() if
+            (c-col)**2+(w-row)**2<=radius*radius]
+            self.assertEqual(sorted(index.getInRadius((col,row),radius)),
+            sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_scenario.py
+#
+#   Description: Tests of the compiled scenario format: a scenario compiled
+#   and opened again gives the same map as the text files, and damaged files
+#   raise ScenarioError.
+#
+################################################################################
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import woh_engine
+import woh_scenario
+from tests.common import scenario_files
+
+
+class CompiledScenarioTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder=tempfile.mkdtemp()
+        self.filename=os.path.join(self.folder,'scenario.wohs')
+        self.map_obj=woh_engine.MapModel(*scenario_files())
+        self.map_obj.saveCompiled(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def getSpots(self, map_obj):
+        """Return the sorted (type id, position) of the spots of a map"""
+
+        spots=map_obj._resource_spots
+        return sorted((spots[r].getTypeID(),spots[r].getPos()) for r in
+        spots)
+
+    def testRoundTrip(self):
+        compiled=woh_engine.MapModel(self.filename)
+        dims=self.map_obj.getDimensions()
+
+        self.assertEqual(compiled.getDimensions(),dims)
+        self.assertEqual(list(compiled.getMoveCost1D()),
+        list(self.map_obj.getMoveCost1D()))
+
+        rect=(0,0,dims['num_cols']-1,dims['num_rows']-1)
+        self.assertEqual(compiled.getWalkableMask(rect),
+        self.map_obj.getWalkableMask(rect))
+
+        self.assertEqual(compiled._resource_types,
+        self.map_obj._resource_types)
+        self.assertEqual(self.getSpots(compiled),self.getSpots(self.map_obj))
+
+    def testCompiledAgain(self):
+        """a compiled map saved again gives the same file"""
+
+        filename=os.path.join(self.folder,'again.wohs')
+        woh_engine.MapModel(self.filename).saveCompiled(filename)
+
+        self.assertEqual(open(filename,'rb').read(),
+        open(self.filename,'rb').read())
+
+    def checkDamaged(self, data):
+        f=open(self.filename,'wb')
+        f.write(data)
+        f.close()
+
+        self.assertRaises(woh_scenario.ScenarioError,
+        woh_scenario.CompiledScenario,self.filename)
+
+    def testEmptyFile(self):
+        self.checkDamaged('')
+
+    def testTruncatedFile(self):
+        data=open(self.filename,'rb').read()
+        for size in (1,10,39,40,60,200,len(data)/2,len(data)-1):
+            self.checkDamaged(data[:size])
+
+    def testOtherFile(self):
+        self.checkDamaged(open(scenario_files()[0],'rb').read())
+
+    def testOtherVersion(self):
+        data=open(self.filename,'rb').read()
+        self.checkDamaged(data[:4]+'\x63\x00'+data[6:])
+
+    def testUnknownTerrain(self):
+        scenario=woh_scenario.CompiledScenario(self.filename)
+        (cols,rows)=scenario.getDimensions()
+        data=open(self.filename,'rb').read()
+        header=struct.unpack_from(woh_scenario.HEADER_FORMAT,data)
+        (n_terrains,grid_offset)=(header[5],header[10])
+        self.checkDamaged(data[:grid_offset+7]+chr(n_terrains)+
+        data[grid_offset+8:])
+
+        """two bytes per cell, the last cell is wrong"""
+        grid=struct.pack('<%dH' % (cols*rows),*([0]*(cols*rows-1)+
+        [n_terrains]))
+        woh_scenario.write_scenario(self.filename,scenario.getTerrains(),
+        scenario.getResourceTypes(),scenario.getSpots(),cols,rows,2,grid)
+        self.assertRaises(woh_scenario.ScenarioError,
+        woh_scenario.CompiledScenario,self.filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_simulation.py
+#
+#   Description: Tests of the headless simulation of the game.
+#
+################################################################################
+
+import random
+import unittest
+
+import woh_engine
+from woh_engine import MapModel, Simulation
+from tests.common import scenario_files
+
+
+class SimulationTest(unittest.TestCase):
+
+    def play(self, seed, turns=150):
+        """Return the position, resources and owned spots of the armies after
+        some turns. The amounts of the resources are random, so the random
+        module is seeded too"""
+
+        random.seed(seed)
+        map_obj=MapModel(*scenario_files())
+        simulation=Simulation(map_obj,seed)
+        for (name,cell) in zip(('red','blue','green','yellow'),
+        ((0,0),(20,2),(5,15),(15,10))):
+            simulation.addArmy(name,cell)
+
+        stats=simulation.run(turns)
+        self.assertEqual(stats['turns'],turns)
+
+        """resource ids are different in every map, the spots are compared
+        by position"""
+        ledger=map_obj.getIncomeLedger()
+        index=map_obj.getResourceIndex()
+        return [(army_obj.getPos(),army_obj.getResources(),
+        sorted([index.getCell(res_id) for res_id in
+        ledger.getSpots(army_obj.getID())])) for army_obj in
+        simulation.getArmies()]
+
+    def testSameSeed(self):
+        self.assertEqual(self.play(1),self.play(1))
+
+    def testArmiesOnTheMap(self):
+        """the armies move, conquer spots and stay on walkable cells"""
+
+        map_obj=MapModel(*scenario_files())
+        simulation=Simulation(map_obj,2)
+        for cell in ((0,0),(20,2)):
+            simulation.addArmy('army',cell)
+        simulation.run(50)
+
+        cols=map_obj.getDimensions()['num_cols']-1
+        costs=map_obj.getMoveCost1D()
+        for army_obj in simulation.getArmies():
+            (x,y)=army_obj.getPos()
+            cell=map_obj.getCellFromXY(x,y)
+            self.assertNotEqual(costs[cell['row']*cols+cell['col']],-1)
+            self.assertTrue(map_obj.getIncomeLedger().getSpots(
+            army_obj.getID()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: tests/test_visibility.py
+#
+#   Description: Tests of the visibility masks of the armies, compared with
+#   sets of the visible cells.
+#
+################################################################################
+
+import unittest
+from random import Random
+
+import woh_engine
+from woh_engine import VisibilityMask, circular_stencil
+
+
+def stencil_cells(stencil, row, col, rows, cols):
+    """Return the set of (row,col) cells of a stencil inside the map"""
+
+    return set([(row+dr,c) for (dr,dc0,dc1) in stencil for c in
+    range(col+dc0,col+dc1+1) if row+dr>=0 and row+dr<rows and c>=0 and
+    c<cols])
+
+
+class VisibilityMaskTest(unittest.TestCase):
+
+    def testStencil(self):
+        self.assertEqual(len(stencil_cells(circular_stencil(1),5,5,10,10)),9)
+        self.assertEqual(circular_stencil(0),[(0,0,0)])
+
+        for radius in range(8):
+            cells=stencil_cells(circular_stencil(radius),20,20,40,40)
+            limit=radius*(radius+1)
+            self.assertEqual(cells,set([(r,c) for r in range(40) for c in
+            range(40) if (r-20)**2+(c-20)**2<=limit]))
+
+    def testReveal(self):
+        rand=Random(1)
+        mask=VisibilityMask(25,35)
+        visible=set()
+
+        for i in range(60):
+            if rand.random()<0.5:
+                stencil=circular_stencil(rand.randint(0,5))
+                row=rand.randrange(-4,29)
+                col=rand.randrange(-4,39)
+                new=stencil_cells(stencil,row,col,25,35)-visible
+                self.assertEqual(sorted(mask.reveal(stencil,row,col)),
+                sorted(new))
+            else:
+                cells=[(rand.randrange(35),rand.randrange(25)) for j in
+                range(4)]
+                new=set([(r,c) for (c,r) in cells])-visible
+                self.assertEqual(sorted(set(mask.revealCells(cells))),
+                sorted(new))
+
+            visible|=new
+            self.assertEqual(mask.count(),len(visible))
+
+        all_cells=[(r,c) for r in range(25) for c in range(35)]
+        self.assertEqual(mask.getVisibleCells(all_cells),sorted(visible))
+
+    def testLongAndSets(self):
+        rand=Random(2)
+        masks=[]
+        sets=[]
+        for i in range(2):
+            mask=VisibilityMask(20,20)
+            cells=[(rand.randrange(20),rand.randrange(20)) for j in
+            range(120)]
+            mask.revealCells(cells)
+            masks.append(mask)
+            sets.append(set([(r,c) for (c,r) in cells]))
+
+        copy=VisibilityMask(20,20)
+        copy.fromLong(masks[0].toLong())
+        all_cells=[(r,c) for r in range(20) for c in range(20)]
+        self.assertEqual(copy.getVisibleCells(all_cells),
+        masks[0].getVisibleCells(all_cells))
+
+        union=masks[0].union(masks[1])
+        intersection=masks[0].intersection(masks[1])
+        self.assertEqual(set(union.getVisibleCells(all_cells)),
+        sets[0]|sets[1])
+        self.assertEqual(set(intersection.getVisibleCells(all_cells)),
+        sets[0]&sets[1])
+
+        """union and intersection don't change the masks"""
+        self.assertEqual(set(masks[0].getVisibleCells(all_cells)),sets[0])
+
+    def testLargeMasks(self):
+        """masks of several blocks of cells, the last one not full, are
+        combined block by block"""
+
+        rand=Random(3)
+        rows=2*woh_engine.MASK_BLOCK/90+5
+        masks=[]
+        sets=[]
+        for i in range(2):
+            mask=VisibilityMask(rows,90)
+            cells=[(rand.randrange(90),rand.randrange(rows)) for j in
+            range(3000)]
+            mask.revealCells(cells)
+            masks.append(mask)
+            sets.append(set([(r,c) for (c,r) in cells]))
+
+        all_cells=[(r,c) for r in range(rows) for c in range(90)]
+        self.assertEqual(set(masks[0].union(masks[1]).getVisibleCells(
+        all_cells)),sets[0]|sets[1])
+        self.assertEqual(set(masks[0].intersection(masks[1]).getVisibleCells(
+        all_cells)),sets[0]&sets[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
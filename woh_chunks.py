@@ -0,0 +1,480 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: woh_chunks.py
+#
+#   Description: This file contains the chunked storage of the map grid, for
+#   worlds too large to keep in memory. The grid of a compiled scenario (see
+#   woh_scenario) is split in square chunks of cells, which are read from the
+#   file when a cell in them is used. Only a limited number of chunks stay in
+#   memory, the least recently used ones are dropped when more are needed.
+#
+#   Every chunk has the terrain codes of its cells and the move cost, the
+#   walkability and the opacity derived from them. ChunkLayer objects index
+#   one of these like the arrays of a map kept in memory, cell number
+#   row*columns+column, so the path finding and the field of view work across
+#   chunk boundaries without knowing about the chunks. D* Lite and HPA* keep
+#   data for every cell, so chunked maps use A* in their place.
+#
+#   Chunks can be loaded in advance by a background thread, for example the
+#   chunks along the path of an army. Terrain changes are kept in memory
+#   when their chunk is dropped, the scenario file is never written.
+#
+################################################################################
+
+import sys
+import threading
+import Queue
+from array import array
+
+"""layers of a chunk: terrain codes, move cost, walkability and opacity"""
+TILES=0
+MOVE_COST=1
+WALKABLE=2
+OPAQUE=3
+
+
+class Chunk:
+    """The cells of a chunk, its layers are arrays of width cells per row"""
+
+    def __init__(self, key, layers, width, generation, edited):
+        """Initialize the Chunk object. key is the (column,row) of the chunk,
+        generation the one of the code values used to make the layers, and
+        edited if the terrain codes come from the changes kept in memory
+        instead of the file"""
+
+        self.key=key
+        self.layers=layers
+        self.width=width
+        self.generation=generation
+        self.edited=edited
+        self.used=0
+        self.dirty=False
+
+
+class ChunkStore:
+    """Least recently used cache of the chunks of the grid of a compiled
+    scenario.
+
+    Constructor: ChunkStore(str, int, int, int, int, int, int)
+    """
+
+    def __init__(self, filename, offset, cols, rows, itemsize, chunk_size,
+    max_chunks):
+        """Initialize the ChunkStore object over the grid of cols*rows cells
+        that starts at offset in the file filename, with itemsize bytes per
+        cell. Chunks have chunk_size*chunk_size cells, or less on the right
+        and bottom borders of the map, and at most max_chunks are kept in
+        memory"""
+
+        self._filename=filename
+        self._offset=offset
+        self._cols=cols
+        self._rows=rows
+        self._itemsize=itemsize
+        self._chunk_size=chunk_size
+        self._max_chunks=max(max_chunks,2)
+
+        if itemsize==1:
+            self._typecodes=['B','b','B','B']
+        else:
+            self._typecodes=['H','i','B','B']
+
+        """the file is read with seek and read, which let other threads run
+        while the disk is read. The prefetch thread has its own file"""
+        self._file=open(filename,'rb')
+
+        """{(column,row): Chunk} of the chunks in memory, the lock is held to
+        add and remove chunks, and to change them"""
+        self._resident={}
+        self._lock=threading.RLock()
+        self._tick=0
+
+        """{(column,row): string} with the terrain codes of the chunks that
+        were changed and then dropped from memory"""
+        self._edited={}
+
+        """the code values are set with setCodeValues"""
+        self._generation=0
+        self._code_values=None
+
+        self._queue=None
+        self._thread=None
+
+        self._loads=0
+        self._prefetched=0
+        self._evictions=0
+
+    def setCodeValues(self, code_cost, code_walkable, code_opaque):
+        """Set the move cost, walkability and opacity of every terrain code,
+        lists indexed by code. The chunks in memory are dropped, since their
+        layers were made with the previous values."""
+
+        self._lock.acquire()
+        try:
+            self._generation+=1
+
+            if self._itemsize==1:
+                if min(code_cost)>=-128 and max(code_cost)<=127:
+                    self._typecodes[MOVE_COST]='b'
+                else:
+                    self._typecodes[MOVE_COST]='i'
+
+                """the layers of a byte per cell are made with translate"""
+                self._code_values=[self.translateTable(code_cost),
+                self.translateTable(code_walkable),
+                self.translateTable(code_opaque)]
+
+            else:
+                self._code_values=[code_cost,code_walkable,code_opaque]
+
+            for key in self._resident.keys():
+                self.evict(key)
+        finally:
+            self._lock.release()
+
+    def translateTable(self, code_values):
+        """Return the table for str.translate that changes a code into its
+        value, in a byte"""
+
+        table=[chr(0)]*256
+        for code in range(len(code_values)):
+            table[code]=chr(code_values[code] & 0xff)
+        return ''.join(table)
+
+    def getChunkSize(self):
+        """Return the number of cells of the side of a chunk"""
+
+        return self._chunk_size
+
+    def getChunkKey(self, col, row):
+        """Return the (column,row) of the chunk that contains a cell"""
+
+        return (col/self._chunk_size,row/self._chunk_size)
+
+    def getChunk(self, key):
+        """Return the Chunk object of the chunk key, reading it from the file
+        if it is not in memory"""
+
+        self._lock.acquire()
+        try:
+            chunk=self._resident.get(key)
+            if chunk is None:
+                chunk=self.insert(self.readChunk(key,self._file))
+                self._loads+=1
+
+            self._tick+=1
+            chunk.used=self._tick
+            return chunk
+        finally:
+            self._lock.release()
+
+    def isResident(self, key):
+        """Return if the chunk key is in memory"""
+
+        return key in self._resident
+
+    def readChunk(self, key, f):
+        """Read the terrain codes of the chunk key from the file object f, or
+        from the changes kept in memory, and make a new Chunk object with its
+        layers"""
+
+        size=self._chunk_size
+        col0=key[0]*size
+        row0=key[1]*size
+        width=min(size,self._cols-col0)
+        height=min(size,self._rows-row0)
+
+        generation=self._generation
+        code_values=self._code_values
+        codes=self._edited.get(key)
+        edited=codes is not None
+
+        if not edited:
+            parts=[]
+            for row in range(row0,row0+height):
+                f.seek(self._offset+(row*self._cols+col0)*self._itemsize)
+                parts.append(f.read(width*self._itemsize))
+            codes=''.join(parts)
+
+        tiles=array(self._typecodes[TILES])
+        tiles.fromstring(codes)
+
+        if self._itemsize==2 and not edited and sys.byteorder=='big':
+            tiles.byteswap()
+
+        layers=[tiles]
+        for i in range(3):
+            values=array(self._typecodes[i+1])
+            if self._itemsize==1:
+                values.fromstring(codes.translate(code_values[i]))
+            else:
+                values.extend([code_values[i][c] for c in tiles])
+            layers.append(values)
+
+        return Chunk(key,layers,width,generation,edited)
+
+    def insert(self, chunk):
+        """Add a chunk read with readChunk, dropping the least recently used
+        chunks if there are too many. Return the chunk in memory, which is
+        the one already there if another thread added it first, or None if
+        the chunk is out of date."""
+
+        self._lock.acquire()
+        try:
+            old=self._resident.get(chunk.key)
+            if old is not None:
+                return old
+
+            """the chunk was changed and dropped while it was read from the
+            file, or the code values changed"""
+            if (chunk.key in self._edited and not chunk.edited) or \
+            chunk.generation!=self._generation:
+                if threading.currentThread() is self._thread:
+                    return None
+                chunk=self.readChunk(chunk.key,self._file)
+
+            while len(self._resident)>=self._max_chunks:
+                lru=min(self._resident.itervalues(),key=lambda c: c.used)
+                self.evict(lru.key)
+
+            chunk.used=self._tick
+            self._resident[chunk.key]=chunk
+            return chunk
+        finally:
+            self._lock.release()
+
+    def evict(self, key):
+        """Drop a chunk from memory, the terrain codes of a changed chunk are
+        kept. Must be called with the lock held."""
+
+        chunk=self._resident.pop(key)
+        if chunk.dirty:
+            self._edited[key]=chunk.layers[TILES].tostring()
+        self._evictions+=1
+
+    def prefetch(self, keys):
+        """Load the chunks in the list keys in a background thread, in order.
+        A new call replaces the chunks of the previous one that weren't loaded
+        yet. At most half of the chunks kept in memory are loaded."""
+
+        keys=[k for k in keys[:self._max_chunks/2] if k not in self._resident]
+        if not keys:
+            return
+
+        if self._queue is None:
+            self._queue=Queue.Queue()
+            self._thread=threading.Thread(target=self.prefetchLoop)
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+        self._queue.put(keys)
+
+    def prefetchLoop(self):
+        """Body of the prefetch thread"""
+
+        f=open(self._filename,'rb')
+
+        while True:
+            keys=self._queue.get()
+
+            for key in keys:
+                """a newer list of chunks replaces this one"""
+                if not self._queue.empty():
+                    break
+
+                if key not in self._resident:
+                    if self.insert(self.readChunk(key,f)):
+                        self._prefetched+=1
+
+            self._queue.task_done()
+
+    def waitPrefetch(self):
+        """Wait until the background thread has loaded the chunks asked
+        for"""
+
+        if self._queue is not None:
+            self._queue.join()
+
+    def getLayer(self, layer):
+        """Return a ChunkLayer for one of the layers, TILES, MOVE_COST,
+        WALKABLE or OPAQUE"""
+
+        return ChunkLayer(self,layer)
+
+    def tostring(self):
+        """Return the terrain codes of the whole grid as a string, row by
+        row, with the changes made to them, like array.tostring"""
+
+        self._lock.acquire()
+        try:
+            for chunk in self._resident.values():
+                if chunk.dirty:
+                    self._edited[chunk.key]=chunk.layers[TILES].tostring()
+                    chunk.dirty=False
+                    chunk.edited=True
+        finally:
+            self._lock.release()
+
+        f=open(self._filename,'rb')
+        f.seek(self._offset)
+        grid=array(self._typecodes[TILES])
+        grid.fromstring(f.read(self._cols*self._rows*self._itemsize))
+        f.close()
+
+        if self._itemsize==2 and sys.byteorder=='big':
+            grid.byteswap()
+
+        size=self._chunk_size
+        for ((chunk_col,chunk_row),codes) in self._edited.items():
+            tiles=array(self._typecodes[TILES])
+            tiles.fromstring(codes)
+
+            col0=chunk_col*size
+            width=min(size,self._cols-col0)
+            for i in range(len(tiles)/width):
+                start=(chunk_row*size+i)*self._cols+col0
+                grid[start:start+width]=tiles[i*width:(i+1)*width]
+
+        return grid.tostring()
+
+    def getStats(self):
+        """Return a dictionary with the number of chunks in memory, loaded
+        when they were used, loaded by the prefetch thread and dropped"""
+
+        return {'resident':len(self._resident), 'loads':self._loads,
+        'prefetched':self._prefetched, 'evictions':self._evictions}
+
+
+class ChunkLayer:
+    """One layer of the cells of a ChunkStore, indexed like an array by cell
+    number, row*columns+column. Slices give arrays."""
+
+    def __init__(self, store, layer):
+        """Initialize the ChunkLayer object"""
+
+        self._store=store
+        self._layer=layer
+        self._cols=store._cols
+        self._length=store._cols*store._rows
+        self.itemsize=array(store._typecodes[layer]).itemsize
+
+        """chunk of the last cell read, its cells and values, and the number
+        of chunks the store had dropped when it was taken, see __getitem__"""
+        self._chunk=None
+        self._values=None
+        self._col0=self._col1=self._row0=self._row1=0
+        self._width=0
+        self._evictions=0
+
+    def __len__(self):
+        """Return the number of cells"""
+
+        return self._length
+
+    def __getitem__(self, i):
+        """Return the value of the cell i, or an array with the values of a
+        slice of cells"""
+
+        """path finders read cells next to each other, so the chunk of the
+        last cell is used again without the lock. It is still in memory,
+        and up to date, as long as the store has not dropped any chunk since
+        it was taken"""
+        if not isinstance(i, slice):
+            row,col=divmod(i,self._cols)
+            if self._row0<=row<self._row1 and self._col0<=col<self._col1 and \
+            self._evictions==self._store._evictions:
+                self._chunk.used=self._store._tick
+                return self._values[(row-self._row0)*self._width+col-self._col0]
+
+            return self.readCell(i,row,col)
+
+        values=array(self._store._typecodes[self._layer])
+        values.extend([self[j] for j in xrange(*i.indices(self._length))])
+        return values
+
+    def readCell(self, i, row, col):
+        """Return the value of the cell i, in the row and column, taking its
+        chunk from the store"""
+
+        if i<0 or i>=self._length:
+            raise IndexError('grid index out of range')
+
+        store=self._store
+        size=store._chunk_size
+        self._evictions=store._evictions
+        chunk=store.getChunk((col/size,row/size))
+
+        self._chunk=chunk
+        self._values=chunk.layers[self._layer]
+        self._width=chunk.width
+        self._col0=col-col%size
+        self._col1=self._col0+chunk.width
+        self._row0=row-row%size
+        self._row1=self._row0+len(self._values)/chunk.width
+
+        return self._values[(row-self._row0)*self._width+col-self._col0]
+
+    def __setitem__(self, i, value):
+        """Change the value of the cell i"""
+
+        if i<0 or i>=self._length:
+            raise IndexError('grid index out of range')
+
+        store=self._store
+        row,col=divmod(i,store._cols)
+        size=store._chunk_size
+
+        """the chunk can't be dropped by the prefetch thread while it is
+        changed"""
+        store._lock.acquire()
+        try:
+            chunk=store.getChunk((col/size,row/size))
+            chunk.layers[self._layer][(row%size)*chunk.width+col%size]=value
+            chunk.dirty=True
+        finally:
+            store._lock.release()
+
+    def __iter__(self):
+        """Iterate over the values of all the cells"""
+
+        for i in xrange(self._length):
+            yield self[i]
+
+    def tostring(self):
+        """Return the terrain codes of all the cells as a string, only for
+        the TILES layer"""
+
+        return self._store.tostring()
@@ -0,0 +1,2858 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: woh_engine.py
+#
+#   Description: This file contains the gameplay rules of World of Heroes,
+#   without anything related to the display, so that games can be simulated
+#   without pygame, for example to test the game or to try computer players.
+#
+#   EngineObject keeps track of general gameplay variables. MapModel manages
+#   the game map, its terrain, resource spots and cities, ArmyModel and
+#   PlayerModel the armies, and PathModel the path an army follows. The
+#   classes in game_lib add the display to each of them.
+#
+#   Simulation plays turns of the game with these classes, thousands of
+#   turns per second on the scenario of the game.
+#
+#   Maps are loaded from the text files of a scenario, or from a scenario
+#   compiled with woh_scenario, which is opened without parsing it. The grid
+#   of a compiled scenario can also be kept in chunks read from the file when
+#   they are used, see woh_chunks, for worlds too large for the memory.
+#
+################################################################################
+
+import satar_modif
+import dstar_lite
+import hpa_star
+import fov
+import woh_scenario
+import woh_chunks
+import time
+from random  import *
+from heapq import heappush, heappop
+from array import array
+from collections import OrderedDict
+from binascii import hexlify, unhexlify
+import operator
+
+class EngineObject:
+    """This class manages gameplay variables and methods such as the default
+    size of the sprites, and the turn system.    
+    """
+
+    current_turn = 1
+    
+    def __init__(self):
+        """Initialize the EngineObject"""
+        self.tile_x=32
+        self.tile_y=32
+
+        """frames per second"""
+        self.fps=50
+
+        """heuristic used by the path finding, one of the names in
+        satar_modif.HEURISTICS: 'octile', 'chebyshev' or 'zero'"""
+        self.path_heuristic='octile'
+
+        """path finding algorithm used by the player: 'dstar' (incremental
+        D* Lite), 'astar', 'jps' (Jump Point Search, faster on maps with
+        large areas of a single terrain cost) or 'hpa' (hierarchical, for
+        very large maps, paths may be slightly longer than the optimal)"""
+        self.path_algorithm='dstar'
+
+        """size in cells of the clusters used by the hierarchical path
+        finding"""
+        self.hpa_cluster_size=10
+
+        """maximum number of paths kept in the path cache of the map"""
+        self.path_cache_size=64
+
+        """size in cells of the buckets of the resource spots index, used
+        for range queries such as the resources within a radius"""
+        self.res_bucket_size=8
+
+        """number of cells around an army that it can see"""
+        self.sight_radius=1
+
+        """how the cells seen by an army are found: 'fov' (field of view,
+        opaque terrains block the sight) or 'radius' (every cell within the
+        sight radius)"""
+        self.visibility_mode='fov'
+
+        """maximum number of fields of view kept in the cache of the map"""
+        self.fov_cache_size=256
+
+        """size in pixels of the part of the map displayed, until the map
+        canvas sets its own size"""
+        self.view_width=896
+        self.view_height=736
+
+        """pixels scrolled by the camera with the arrow keys"""
+        self.scroll_step=32
+
+        """how the cells of a compiled scenario are stored: 'memory' (the
+        whole grid) or 'chunked' (chunks of the grid are read from the file
+        when they are used, see woh_chunks). Chunked maps find paths with
+        'astar' when path_algorithm is 'dstar' or 'hpa', which keep data
+        for every cell of the map, so with those algorithms the armies can
+        take other paths than on the same map kept in memory"""
+        self.map_storage='memory'
+
+        """size in cells of the side of the chunks of a chunked map, and
+        maximum number of chunks kept in memory"""
+        self.chunk_size=64
+        self.chunk_cache_size=256
+
+        """number of chunks along the path of an army loaded in advance"""
+        self.chunk_prefetch=16
+
+    def newTurn(self, (player, map_obj)):
+        """Prepare all the game elements for a new turn"""
+
+        player.newTurn(map_obj)
+        EngineObject.current_turn+=1
+
+    def setMapCanvas(self, widget_id):
+        """Keep track of the id of the MapCanvas widget"""
+        
+        self._map_canvas_id=widget_id
+
+    def getMapCanvas(self):
+        """Return the id of the MapCanvas widget"""
+
+        return self._map_canvas_id
+
+    def setRightPanel(self, widget_id):
+        """Keep track of the id of the RightPanel widget"""
+        
+        self._right_panel_id=widget_id
+
+    def getRightPanel(self):
+        """Return the id of the RightPanel widget"""
+
+        return self._right_panel_id
+
+engine=EngineObject()
+
+
+class TerrainModel:
+    """Represents the terrain types and their attributes
+
+    Constructor: TerrainModel(str, str, int, boolean, boolean)
+    """
+
+    def __init__(self, terrain_id, terrain_name, move_cost, is_walkable,
+    is_opaque=0):
+
+        self._terrain_id=terrain_id
+        self._terrain_name=terrain_name
+        self._move_cost=int(move_cost)
+        self._is_walkable=int(is_walkable)
+        self._is_opaque=int(is_opaque)
+
+    def __str__(self):
+        """Represent a Terrain object as string"""
+
+        terr_str="Terrain ID:" + str(self._terrain_id) + ", Name:"
+        terr_str=terr_str+str(self._terrain_name) + ", Is_walkable:"
+        terr_str=terr_str+ str(self._is_walkable)+ ", Move cost:" 
+        terr_str=terr_str+str(self._move_cost)
+
+        return terr_str  
+        
+    def getMoveCost(self):
+        """Get the terrain type's move cost"""
+        return self._move_cost
+
+    def getIsWalkable(self):
+        """Get if the terrain is walkable or not"""
+        return self._is_walkable
+
+    def getTerrainName(self):
+        """Get the name of the terrain type"""
+        return self._terrain_name
+
+    def getIsOpaque(self):
+        """Get if the terrain blocks the sight of the armies"""
+        return self._is_opaque
+
+    def getID(self):
+        """Get the id of the terrain type"""
+        return self._terrain_id
+
+
+class MapModel:
+    """This class represents the game map, which is a 2D grill where each
+    cell represents a certain terrain type. From this class the map is loaded
+    from differente text files containing cell and terrain information.
+
+    This class also manages gameplay related map operations and elements, such
+    as resource spots, cities, and part of the path finding and armies updating.
+    It doesn't display anything, the Map class of game_lib adds the drawing
+    on top of it. The objects of the map are created with the newTerrain,
+    newResource and newCity methods, and the changes that have to be shown to
+    the player are reported to the on... methods, which do nothing here.
+    """
+
+    def __init__(self, tileset_file, terrains_file=None,
+    resource_type_file=None, resource_pos_file=None,cities_file=None,
+    cities_pos_file=None):
+        """Initialize the game map from the six text files of a scenario, or
+        from a compiled scenario, see woh_scenario, given as the only
+        argument"""
+        
+        self._tileset_file=tileset_file
+        self._terrains_file=terrains_file
+        self._resource_type_file=resource_type_file
+        self._resource_pos_file = resource_pos_file
+        self._cities_file=cities_file
+        self._cities_pos_file=cities_pos_file
+
+        """Terrain information is in two files, terrains_file contains the
+        description of every terrain type. tileset contains the terrain
+        type of every cell in the map.
+
+        Each terrain type also gets a small integer code, its position in
+        _terrain_list. The map grid is stored as an array of these codes,
+        and the move cost and walkability of every code are kept in arrays
+        as well, so that cell queries are plain array lookups"""
+        self._terrain_types={}
+        self._terrain_list=[]
+        self._terrain_codes={}
+        self._terrain_files=[]
+
+        """ChunkStore of a chunked map, see loadCompiled"""
+        self._chunks=None
+
+        """a compiled scenario has everything in a single file"""
+        if terrains_file is None:
+            scenario=woh_scenario.CompiledScenario(tileset_file)
+        else:
+            scenario=None
+            self.loadTerrainTypes()
+            self.loadTileset()
+
+        """resource information is stored in two different files,
+        resource_types_file contains the description of every
+        different kind of resource spot in the game, two resource spots can
+        deliver the same resource, for example a small farm and a big
+        farm will both deliver food. resource_spots_file contains the position
+        of every resource spot in the game map"""
+        self._resource_spots={}
+        self._resource_types={}
+
+        """index of the resource spots and cities by cell, see
+        ResourceIndex"""
+        self._res_index=ResourceIndex(engine.res_bucket_size)
+
+        """end of turn income of every army, see IncomeLedger"""
+        self._ledger=IncomeLedger()
+
+        if scenario:
+            self.loadCompiled(scenario)
+
+        else:
+            self.loadResourceTypes()
+            self.loadResourcePos()
+
+            """cities info stored in two files, just like for the resources,
+            there is a file to store the cities attributes and a file to store
+            their positions"""
+            self.loadCities()
+            self.loadCitiesPos()
+
+        """size of the map in pixels"""
+        self._map_width=self._tiles_x*engine.tile_x
+        self._map_height=self._tiles_y*engine.tile_y
+
+        """the cost version is increased every time the move costs change,
+        so that path planners can tell when they need to be repaired"""
+        self._cost_version=0
+        self.setMoveCost1D()
+
+        """fields of view of the armies, computed over the opacity of the
+        cells and cached until the terrain changes"""
+        self._fov=fov.FieldOfView(self._1d_opaque,self._tiles_x-1,
+        self._tiles_y-1,engine.fov_cache_size)
+
+        """the hierarchical path finding graph is precomputed when it is the
+        selected algorithm, otherwise it is built the first time it is used,
+        see getClusterMap"""
+        self._cluster_map=None
+        if self.getPathAlgorithm()=='hpa':
+            self.buildClusterMap()
+
+        """paths already found, shared by all the armies on the map"""
+        self._path_cache=PathCache(engine.path_cache_size)
+        
+
+    def loadTerrainTypes(self):
+        """Load text file with terrain types information. The file's format is:
+
+        terrain_id, terrain_name, move_cost, is_walkable, image_filename,
+          (int)       (str)         (int)       (int)        (str)
+
+        is_opaque
+          (int)
+
+        is_opaque is optional, 1 for terrains that block the sight of the
+        armies, 0 by default.
+        """
+        
+        f = open(self._terrains_file, 'U')
+        
+        for line in f:
+
+            """read and process each line that has data, and save the info in
+            the dictionary"""
+            if line.rfind(',') != -1:
+
+                """splits each line into a list"""
+                sline=line.split(',')
+                
+                """the info is stored in the dictorionary. Whitespaces, tabs and
+                new lines are removed"""
+                is_opaque=0
+                if len(sline)>5 and sline[5].strip():
+                    is_opaque=sline[5].strip()
+
+                self.addTerrainType(sline[4].strip(),sline[0].strip(),
+                sline[1].strip(),sline[2].strip(),sline[3].strip(),is_opaque)
+       
+        """close the file"""
+        f.close()        
+
+        self.setTerrainCodes()
+
+    def addTerrainType(self, filename, terrain_id, terrain_name, move_cost,
+    is_walkable, is_opaque):
+        """Add a terrain type to the map, its code is the next free one"""
+
+        self._terrain_types[terrain_id]=self.newTerrain(filename,terrain_id,
+        terrain_name,move_cost,is_walkable,is_opaque)
+
+        self._terrain_codes[terrain_id]=len(self._terrain_list)
+        self._terrain_list.append(self._terrain_types[terrain_id])
+        self._terrain_files.append(filename)
+
+    def setTerrainCodes(self):
+        """Generate the arrays with the move cost, the walkability and the
+        opacity of every terrain code"""
+
+        self._code_move_cost=array('i',[t.getMoveCost() for t in
+        self._terrain_list])
+        self._code_walkable=array('B',[t.getIsWalkable() for t in
+        self._terrain_list])
+        self._code_opaque=array('B',[t.getIsOpaque() for t in
+        self._terrain_list])
+
+    def loadTileset(self):
+        """Load the map grid from a text file. This file is organized
+        as a nxm matrix where n is the number of rows of the map, and m the
+        number of columns. Each value representes a terrain id. Values are
+        separated by commas, and rows by new lines
+
+        Precondition: the values in the file must exist in the file where
+        the terrain types are defined, terrains_file."""
+
+        """array to store the terrain code of every cell, row by row, in a
+        byte per cell when there are few terrain types"""        
+        if len(self._terrain_list)<=256:
+            self._tiles=array('B')
+        else:
+            self._tiles=array('H')
+        
+        f = open(self._tileset_file, 'U')
+
+        i=0
+        for line in f:
+
+            """read and process each line that has data"""
+            if line.rfind(',') != -1:
+
+                """splits each line into a list"""
+                splitted_line=line.split(',')
+
+                j=0
+
+                for t in splitted_line:
+                    self._tiles.append(self._terrain_codes[t.strip()])
+                    j+=1
+                i+=1
+                
+                
+        """close the file"""
+        f.close()
+
+        """save dimensions of the map"""
+        self._tiles_x=j+1
+        self._tiles_y=i+1
+    
+    def getIsWalkable(self,x,y):
+        """Return the _is_walkable attribute of the terrain located at
+        coordinates x,y. This coordinates are in pixels"""
+        
+        target_cell=self.getCellFromXY(x,y)
+
+        left_border=x<0
+        top_border=y<0
+        right_border=x>=self._map_width
+        bot_border=y>=self._map_height
+        
+        if (left_border or top_border) or (right_border or bot_border):
+            return False
+        
+        if target_cell['col']>=self._tiles_x-1 or \
+        target_cell['row']>=self._tiles_y-1:
+            return False
+
+        return self._1d_walkable[target_cell['row']*(self._tiles_x-1)+
+        target_cell['col']]
+
+    def getCellFromXY(self,x,y):
+        """Return the row and column of the cell located in some X, Y pixel
+        coordinates.getMoveCost1D
+
+        Precondition: the origin (0,0) is located on the upper left corner of
+        the map."""
+        
+        col=int((x - x%engine.tile_x)/engine.tile_x)
+        row=int((y - y%engine.tile_y)/engine.tile_y)
+        cell={'row':row, 'col':col}        
+        return cell
+
+    def getCellCoordFromXY(self,x,y):
+        """Return the coordinates of the upper left corner of the cell where
+        the point x,y is located. x,y in Pixel coordinates.
+
+        Precondition: the origin (0,0) is located on the upper left corner of
+        the map."""
+
+        current_cell = self.getCellFromXY(x,y)
+        x_left = current_cell['col']*engine.tile_x
+        y_left = current_cell['row']*engine.tile_y
+        return (x_left, y_left)
+        
+
+    def showTerrainInfo(self,cell):
+        """Returns data on the terrain located in cell "cell".
+        Parameter cell is a dictionary with the format:
+
+        dict{'row':row number, 'col':column number}"""
+        
+        return self._terrain_list[self._tiles[cell['row']*(self._tiles_x-1)+
+        cell['col']]]
+
+    def setMoveCost1D(self):
+        """Generate arrays with the move cost, the walkability and the
+        opacity of every cell in the map.
+
+        When the grid has a byte per cell the arrays are made by translating
+        the bytes of the codes into the bytes of the values, without going
+        through the cells one by one. The move costs are then kept in signed
+        bytes, if they fit."""
+
+        code_cost=self._code_move_cost
+        code_walkable=self._code_walkable
+        code_opaque=self._code_opaque
+
+        if self._chunks:
+            """the values are made for each chunk when it is read"""
+            self._chunks.setCodeValues(code_cost,code_walkable,code_opaque)
+            self._1d_move_cost=self._chunks.getLayer(woh_chunks.MOVE_COST)
+            self._1d_walkable=self._chunks.getLayer(woh_chunks.WALKABLE)
+            self._1d_opaque=self._chunks.getLayer(woh_chunks.OPAQUE)
+
+        elif self._tiles.itemsize==1:
+            cells=self._tiles.tostring()
+
+            self._1d_walkable=self.translateCodes(cells,'B',code_walkable)
+            self._1d_opaque=self.translateCodes(cells,'B',code_opaque)
+
+            if min(code_cost)>=-128 and max(code_cost)<=127:
+                self._1d_move_cost=self.translateCodes(cells,'b',code_cost)
+            else:
+                self._1d_move_cost=array('i',[code_cost[ord(c)] for c in
+                cells])
+
+        else:
+            self._1d_move_cost=array('i',[code_cost[c] for c in self._tiles])
+            self._1d_walkable=array('B',[code_walkable[c] for c in
+            self._tiles])
+            self._1d_opaque=array('B',[code_opaque[c] for c in self._tiles])
+
+        self._cost_version+=1
+
+        """indices of the cells changed by setCellTerrain after
+        _cost_changes_version, one per version, see getCostChanges"""
+        self._cost_changes=[]
+        self._cost_changes_version=self._cost_version
+
+    def translateCodes(self, cells, typecode, code_values):
+        """Return an array of typecode, 'b' or 'B', with the value of the
+        code of every cell. cells is a string with a code per byte."""
+
+        table=[chr(0)]*256
+        for code in range(len(code_values)):
+            table[code]=chr(code_values[code] & 0xff)
+
+        values=array(typecode)
+        values.fromstring(cells.translate(''.join(table)))
+        return values
+
+    def getCostsFor(self,cells):
+        """Return a list with the move cost of every (column,row) cell in
+        cells"""
+
+        costs=self._1d_move_cost
+        map_cols=self._tiles_x-1
+        return [costs[row*map_cols+col] for (col,row) in cells]
+
+    def getWalkableMask(self,(col,row,width,height)):
+        """Return an array with the walkability (1 or 0) of the cells inside
+        a rectangle of cells, row by row. The rectangle must be inside the
+        map."""
+
+        walkable=self._1d_walkable
+        map_cols=self._tiles_x-1
+        mask=array('B')
+        for r in range(row,row+height):
+            mask.extend(walkable[r*map_cols+col:r*map_cols+col+width])
+        return mask
+
+    def getMoveCost1D(self):
+        """Returns an array with the move cost of every cell in the map"""
+
+        return self._1d_move_cost
+
+    def buildClusterMap(self):
+        """Split the map in clusters and precompute the graph of cluster
+        entrances used by the hierarchical path finding"""
+
+        self._cluster_map=hpa_star.ClusterMap(self._1d_move_cost,
+        self._tiles_x-1,self._tiles_y-1,engine.hpa_cluster_size,
+        satar_modif.HEURISTICS[engine.path_heuristic],self.getMinMoveCost())
+
+    def getPathCache(self):
+        """Return the PathCache object of the map"""
+
+        return self._path_cache
+
+    def getClusterMap(self):
+        """Return the hpa_star.ClusterMap object of the map, it is built the
+        first time"""
+
+        if self._cluster_map is None:
+            self.buildClusterMap()
+
+        return self._cluster_map
+
+    def getReachable(self,(col,row),moves_left):
+        """Return a ReachableArea object with every cell that can be reached
+        from the cell (col,row) spending at most moves_left, using the same
+        costs charged to the armies when they move. It is computed with a
+        Dijkstra search that stops when the budget is spent."""
+
+        map_cols=self._tiles_x-1
+        map_rows=self._tiles_y-1
+
+        move_cost=self._1d_move_cost
+        cost_between=self.getCostBetweenCells
+
+        costs={(col,row):0}
+        parents={(col,row):None}
+        queue=[(0,(col,row))]
+        done=set()
+
+        while queue:
+            cost,cell=heappop(queue)
+            if cell in done:
+                continue
+            done.add(cell)
+
+            for dx,dy in satar_modif.DIRECTIONS:
+                x=cell[0]+dx
+                y=cell[1]+dy
+
+                if x<0 or x>=map_cols or y<0 or y>=map_rows:
+                    continue
+                if move_cost[y*map_cols+x]==-1 or (x,y) in done:
+                    continue
+
+                new_cost=cost+cost_between(cell,(x,y))
+                if new_cost<=moves_left and new_cost<costs.get((x,y),
+                new_cost+1):
+                    costs[(x,y)]=new_cost
+                    parents[(x,y)]=cell
+                    heappush(queue,(new_cost,(x,y)))
+
+        return ReachableArea((col,row),costs,parents)
+
+    def getFieldOfView(self,(col,row),radius):
+        """Return the list of (col,row) cells that an army on the cell
+        (col,row) can see within radius. Opaque terrains are visible but
+        hide the cells behind them. Results are cached until the terrain
+        changes."""
+
+        return self._fov.getVisible((col,row),radius,self._cost_version)
+
+    def getFieldOfViewObj(self):
+        """Return the fov.FieldOfView object of the map"""
+
+        return self._fov
+
+    def getMinMoveCost(self):
+        """Return the lowest move cost of the walkable terrain types. Path
+        finding heuristics are scaled by this value so that they never
+        overestimate the cost of a path."""
+
+        min_cost=None
+        for t in self._terrain_types.values():
+            if t.getIsWalkable() and t.getMoveCost() > 0:
+                if min_cost is None or t.getMoveCost() < min_cost:
+                    min_cost=t.getMoveCost()
+
+        if min_cost is None:
+            return 1
+        return min_cost
+
+    def getCostVersion(self):
+        """Return a number that changes every time the move costs change"""
+
+        return self._cost_version
+
+    def getCostChanges(self, version):
+        """Return the list of indices in getMoveCost1D of the cells whose
+        move cost changed after version, or None if they aren't known any
+        more and the whole map has to be compared"""
+
+        if version < self._cost_changes_version:
+            return None
+
+        return self._cost_changes[version-self._cost_changes_version:]
+
+    def setCellTerrain(self, cell, terrain_id):
+        """Change the terrain type of a single cell and update its move cost.
+        Parameter cell is a dictionary with the format:
+
+        dict{'row':row number, 'col':column number}
+
+        Precondition: terrain_id exists in the terrain types file"""
+
+        code=self._terrain_codes[terrain_id]
+        i=cell['row']*(self._tiles_x-1)+cell['col']
+
+        self._tiles[i]=code
+        self._1d_move_cost[i]=self._code_move_cost[code]
+        self._1d_walkable[i]=self._code_walkable[code]
+        self._1d_opaque[i]=self._code_opaque[code]
+        self._cost_version+=1
+
+        """the log of changed cells is dropped when it gets longer than the
+        map, comparing every cell is cheaper then"""
+        self._cost_changes.append(i)
+        if len(self._cost_changes) > len(self._1d_move_cost):
+            self._cost_changes=[]
+            self._cost_changes_version=self._cost_version
+
+        """terrain changes only recompute the clusters that contain the
+        changed cells"""
+        if self._cluster_map is not None:
+            self._cluster_map.updateCells([(cell['col'],cell['row'])])
+
+        self.onCellChanged(cell['row'],cell['col'])
+
+    def getDimensions(self):
+        """Return the dimensions of the map, in number of cells and in pixels"""
+
+        dim_dict={}
+        dim_dict['num_rows']=self._tiles_y
+        dim_dict['num_cols']=self._tiles_x
+        dim_dict['width']=self._map_width
+        dim_dict['height']=self._map_height
+                    
+        return dim_dict
+
+    def getCostBetween2Points(self,(x0,y0),(x1,y1)):
+        """Estimate the movement cost between two points in the map. Coodinates
+        in pixels.
+
+        Precondition: both points are either the same corner of two adjacent
+        cells, or the center of two adjacent cells."""
+
+        """Normalize the coordinates"""
+        x0=x0/engine.tile_x
+        x1=x1/engine.tile_x
+        y0=y0/engine.tile_y
+        y1=y1/engine.tile_y
+
+        return self.getCostBetweenCells((x0,y0),(x1,y1))
+
+    def getCostBetweenCells(self,(x0,y0),(x1,y1)):
+        """Estimate the movement cost between two adjacent cells, given as
+        (column,row) tuples. This is the cost charged to an army that moves
+        from one cell to the other."""
+
+        move_cost0=self._1d_move_cost[y0*(self._tiles_x-1)+x0]
+        move_cost1=self._1d_move_cost[y1*(self._tiles_x-1)+x1]
+
+        xm = (x0 + x1)/2
+        ym = (y0 + y1)/2
+        
+        mc0 = (((x0-xm))**2+((y0-ym))**2)**(0.5)*move_cost0
+        mc1 = (((xm-x1))**2+((ym-y1))**2)**(0.5)*move_cost1
+        
+        return mc0 + mc1
+
+    def loadResourceTypes(self):
+            """Load text file with resource types information in format:
+
+            type_id,, type,, name,, amount_per_turn,, instant_amount,, 
+             (int)    (str)  (str)        (int)           (int)          
+
+             img_filename,, text_when_conquered, text_first_time
+                (str)              (str)               (str)
+
+            Precondition: type_id values must be unique, considering the
+            cities as well.
+
+            """
+            
+            f = open(self._resource_type_file, 'U')
+            
+            for line in f:
+
+                """read and process each line that has data, and save the info
+                in the dictionary"""
+                if line.rfind(',') != -1:
+
+                    """splits each line into a list"""
+                    sline=line.split(',,')
+                    
+                    """the info is stored in the dictorionary. Whitespaces,
+                    tabs and new lines are removed"""
+                    
+                    self._resource_types[sline[0].strip()]={'type': sline[1].strip(),
+                    'name': sline[2].strip(),'amount_per_turn': int(sline[3].strip()),
+                    'instant_amount': int(sline[4].strip()),
+                    'filename': sline[5].strip(), 'conquered_text': sline[6].strip(),
+                    'first_time_text': sline[7].strip()}
+
+            """close the file"""
+            f.close()
+
+    def loadResourcePos(self):
+            """Load text file with the location of the resource spots, the file
+            is in the format:
+
+            type_id, column_number, row_number
+            (int)         (int)       (int)             
+
+            After loading the file, Resource objects are created to represent
+            these resource spots. The resource spots are an attribute of the
+            Map object.
+            """            
+  
+            f = open(self._resource_pos_file, 'U')
+            
+            for line in f:
+
+                """read and process each line that has data, and save the info
+                in the dictionary"""
+                if line.rfind(',') != -1:
+
+                    """splits each line into a list"""
+                    splitted_line=line.split(',')
+                    
+                    """the info is used to create Resource objects. Whitespaces,
+                    tabs and new lines are removed"""
+                    type_id=splitted_line[0].strip()
+                    col=int(splitted_line[1].strip())
+                    row=int(splitted_line[2].strip())
+
+                    x=col*engine.tile_x
+                    y=row*engine.tile_y
+                    
+                    self.addResourceSpot(self.newResource(type_id,x,y))
+                    
+            """close the file"""
+            f.close()
+
+    def addResourceSpot(self,res_obj):
+        """Add a Resource or City object to the map and to the index of
+        resource spots"""
+
+        res_id=res_obj.getID()
+        x,y=res_obj.getPos()
+        res_cell=self.getCellFromXY(x,y)
+
+        self._resource_spots[res_id]=res_obj
+        self._res_index.add(res_id,(res_cell['col'],res_cell['row']))
+
+        self.onSpotChanged(res_obj)
+
+    def removeResourceSpot(self,res_id):
+        """Remove a resource spot or city from the map"""
+
+        res_obj=self._resource_spots[res_id]
+        owner, _ = res_obj.getOwner()
+        if owner:
+            self._ledger.transfer(res_id,res_obj.getType(),
+            res_obj.getTurnAmount(),owner,None)
+
+        self._res_index.remove(res_id)
+        del self._resource_spots[res_id]
+
+        self.onSpotChanged(res_obj)
+
+    def resOnCellXY(self,x,y):
+        """Checks if there is a resource in the map coordinates x,y"""
+
+        army_cell=self.getCellFromXY(x,y)
+        res_id=self._res_index.getAt((army_cell['col'],army_cell['row']))
+
+        if res_id is None:
+            return False, None
+
+        return True, res_id
+
+    def getResourcesInRadius(self,(col,row),radius):
+        """Return a list with the ids of the resource spots and cities whose
+        cell is at a distance of at most radius cells from the cell
+        (col,row)"""
+
+        return self._res_index.getInRadius((col,row),radius)
+
+    def getCities(self):
+        """Return the ids of the cities of the map, in the order they were
+        added"""
+
+        return [res_id for res_id in sorted(self._resource_spots) if
+        isinstance(self._resource_spots[res_id],CityModel)]
+
+    def getResourceIndex(self):
+        """Return the ResourceIndex object of the map"""
+
+        return self._res_index
+
+    def setResourceOwner(self, army_id, army_name, res_id, colour):
+        """Set an owner army to a certain resource spot. The income of the
+        previous and the new owner is updated in the ledger."""
+
+        res_obj=self._resource_spots[res_id]
+        old_owner, _ = res_obj.getOwner()
+
+        if old_owner != army_id:
+            self._ledger.transfer(res_id,res_obj.getType(),
+            res_obj.getTurnAmount(),old_owner,army_id)
+
+        res_obj.setOwner(army_id, army_name, colour)       
+        self.onSpotChanged(res_obj)
+
+    def getResourceOwner(self, res_id):
+        """Get the owner of a resource spot"""
+
+        return self._resource_spots[res_id].getOwner()       
+
+    def getResConqueredText(self, res_id):
+        """Get the text for a dialog box when a resource is conquered"""
+
+        return self._resource_spots[res_id].getConqueredText()
+
+    def payTurnResources(self, army_obj):
+        """Pay the army the end of turn resource amounts according to its owned
+        resource spots. The totals are kept in the ledger, so the army is paid
+        once per resource type."""
+
+        army_obj.updateResources(self._ledger.getIncome(army_obj.getID()))
+
+    def settleTurnResources(self, armies):
+        """Pay the end of turn resource amounts to every army in a list"""
+
+        for army_obj in armies:
+            self.payTurnResources(army_obj)
+
+    def getIncomeLedger(self):
+        """Return the IncomeLedger object of the map"""
+
+        return self._ledger
+
+    def getResourceType(self, res_id):
+        """Get the resource type of the specified resource id"""
+
+        return self._resource_spots[res_id].getType()
+
+    def payFirstTimeRes(self, army_obj, res_id):
+        """Pay the army the amount of resources available when conquering
+        a resource. If the resource spot has been conquered before, the
+        resource object will return zero for the resource amount."""
+
+        army_id=army_obj.getID()
+        res_type=self._resource_spots[res_id].getType()
+        amount=self._resource_spots[res_id].payFirstAmount()
+        army_obj.updateResource(res_type, amount)
+
+    def armyOnResource(self,army_obj,res_id):
+        """Method to be called when an army is on a resource spot"""
+
+        owner=self.getResourceOwner(res_id)
+        self.setResourceOwner(army_obj.getID(), army_obj.getName(), res_id,
+            army_obj.getColour())
+        dialog_title, dialog_text=self.getResConqueredText(res_id)
+                    
+        """if the resource was not owned by the army, check for first
+        time reward and show a dialog"""
+        if owner != army_obj.getID():
+            self.payFirstTimeRes(army_obj, res_id)
+            self.onResourceConquered(army_obj,dialog_title,dialog_text)
+        
+        if self._resource_spots[res_id].isCity():
+            self.onCityEntered(army_obj,self._resource_spots[res_id])
+        
+
+    def loadCities(self):
+            """Load text file with cities attributes in format:
+
+            type_id,, type,, name,, amount_per_turn,, instant_amount,, 
+             (int)    (str)  (str)        (int)           (int)          
+
+            img_filename,, text_when_conquered,, text_first_time,,
+                (str)              (str)               (str)
+
+            soldier_cost_gold,, soldier_cost_ore
+                (int)               (int)
+
+            Precondition: type_id values must be unique, considering the
+            cities as well.
+            """
+            
+            f = open(self._cities_file, 'U')
+            
+            for line in f:
+
+                """read and process each line that has data, and save the info
+                in the dictionary"""
+                if line.rfind(',') != -1:
+
+                    """splits each line into a list"""
+                    sline=line.split(',,')
+                    
+                    """the info is stored in the dictorionary. Whitespaces,
+                    tabs and new lines are removed"""
+                    
+                    self._resource_types[sline[0].strip()]={'type': sline[1].strip(),
+                    'name': sline[2].strip(),'amount_per_turn': int(sline[3].strip()),
+                    'instant_amount': int(sline[4].strip()),
+                    'filename': sline[5].strip(), 'conquered_text': sline[6].strip(),
+                    'first_time_text': sline[7].strip(),'sld_cost_gold': int(sline[8].strip()),
+                    'sld_cost_ore': int(sline[9].strip())}
+
+            """close the file"""
+            f.close()
+
+    def loadCitiesPos(self):
+            """Load text file with the location of the cities, the file
+            is in the format:
+
+            type_id, column_number, row_number
+            (int)         (int)       (int)             
+
+            After loading the file, City objects are created.
+            Cities are an attribute of the Map object.
+            """            
+  
+            f = open(self._cities_pos_file, 'U')
+            
+            for line in f:
+
+                """read and process each line that has data, and save the info
+                in the dictionary"""
+                if line.rfind(',') != -1:
+
+                    """splits each line into a list"""
+                    splitted_line=line.split(',')
+                    
+                    """the info is used to create City objects. Whitespaces,
+                    tabs and new lines are removed"""
+                    type_id=splitted_line[0].strip()
+                    col=int(splitted_line[1].strip())
+                    row=int(splitted_line[2].strip())
+
+                    x=col*engine.tile_x
+                    y=row*engine.tile_y
+
+                    self.addResourceSpot(self.newCity(type_id,x,y))
+                    
+            """close the file"""
+            f.close()
+
+    def loadCompiled(self, scenario):
+        """Load the terrain types, the map grid, the resource and city types,
+        and the resource spots and cities of a woh_scenario.CompiledScenario.
+        The grid is a woh_scenario.GridView of the file."""
+
+        for (terrain_id,name,filename,move_cost,is_walkable,is_opaque) in \
+        scenario.getTerrains():
+            self.addTerrainType(filename,terrain_id,name,move_cost,
+            is_walkable,is_opaque)
+
+        self.setTerrainCodes()
+
+        (cols,rows)=scenario.getDimensions()
+        self._tiles_x=cols+1
+        self._tiles_y=rows+1
+
+        if engine.map_storage == 'chunked':
+            (filename,offset,cell_bytes)=scenario.getGridFile()
+            self._chunks=woh_chunks.ChunkStore(filename,offset,cols,rows,
+            cell_bytes,engine.chunk_size,engine.chunk_cache_size)
+            self._tiles=self._chunks.getLayer(woh_chunks.TILES)
+        else:
+            self._tiles=scenario.getGrid()
+
+        type_ids=[]
+        for t in scenario.getResourceTypes():
+            res_type=dict(t)
+            type_ids.append(res_type.pop('id'))
+            self._resource_types[type_ids[-1]]=res_type
+
+        for (type_num,col,row) in scenario.getSpots():
+            type_id=type_ids[type_num]
+            x=col*engine.tile_x
+            y=row*engine.tile_y
+
+            if 'sld_cost_gold' in self._resource_types[type_id]:
+                self.addResourceSpot(self.newCity(type_id,x,y))
+            else:
+                self.addResourceSpot(self.newResource(type_id,x,y))
+
+    def saveCompiled(self, filename):
+        """Write the map in a compiled scenario, see woh_scenario. The
+        terrain of the cells is saved as it is now, and the resource spots
+        and cities with their types and positions, not their owners."""
+
+        terrains=[]
+        for code in range(len(self._terrain_list)):
+            t=self._terrain_list[code]
+            terrains.append((t.getID(),t.getTerrainName(),
+            self._terrain_files[code],t.getMoveCost(),t.getIsWalkable(),
+            t.getIsOpaque()))
+
+        type_ids=sorted(self._resource_types)
+        res_types=[]
+        for type_id in type_ids:
+            res_type=dict(self._resource_types[type_id])
+            res_type['id']=type_id
+            res_types.append(res_type)
+
+        spots=[]
+        for res_id in sorted(self._resource_spots):
+            res_obj=self._resource_spots[res_id]
+            (x,y)=res_obj.getPos()
+            spots.append((type_ids.index(res_obj.getTypeID()),
+            x/engine.tile_x,y/engine.tile_y))
+
+        woh_scenario.write_scenario(filename,terrains,res_types,spots,
+        self._tiles_x-1,self._tiles_y-1,self._tiles.itemsize,
+        self._tiles.tostring())
+
+    def isChunked(self):
+        """Return if the cells of the map are kept in chunks, see
+        woh_chunks"""
+
+        return self._chunks is not None
+
+    def getPathAlgorithm(self):
+        """Return the path finding algorithm used on the map: the one in
+        engine.path_algorithm, or 'astar' on a chunked map when it is
+        'dstar' or 'hpa'"""
+
+        if self.isChunked() and engine.path_algorithm in ('dstar','hpa'):
+            return 'astar'
+
+        return engine.path_algorithm
+
+    def getChunkStore(self):
+        """Return the woh_chunks.ChunkStore of a chunked map, or None"""
+
+        return self._chunks
+
+    def prefetchPath(self, points):
+        """Load in the background the chunks of a chunked map along a list of
+        (x,y) points in pixels, including the cells within the sight radius,
+        up to engine.chunk_prefetch chunks. Nothing is done for maps kept in
+        memory."""
+
+        if not self._chunks:
+            return
+
+        radius=engine.sight_radius
+        keys=[]
+        for (x,y) in points:
+            col=x/engine.tile_x
+            row=y/engine.tile_y
+
+            for (dc,dr) in ((0,0),(-radius,-radius),(radius,-radius),
+            (-radius,radius),(radius,radius)):
+                c=min(max(col+dc,0),self._tiles_x-2)
+                r=min(max(row+dr,0),self._tiles_y-2)
+                key=self._chunks.getChunkKey(c,r)
+                if key not in keys:
+                    keys.append(key)
+
+            if len(keys)>=engine.chunk_prefetch:
+                break
+
+        self._chunks.prefetch(keys[:engine.chunk_prefetch])
+
+    def newVisibilityMask(self):
+        """Return a new mask of the cells visible to an army, with no
+        visible cells. Chunked maps use a ChunkedVisibilityMask, which only
+        keeps the chunks where the army has seen something."""
+
+        if self._chunks:
+            return ChunkedVisibilityMask(self._tiles_y,self._tiles_x,
+            engine.chunk_size)
+
+        return VisibilityMask(self._tiles_y,self._tiles_x)
+
+    def getResourceObj(self, res_id):
+        """Get the resource object with id "res_id". Precondition: the id refers
+        to an existing resource object in the map"""
+
+        return self._resource_spots[res_id]
+
+    def newTerrain(self, filename, terrain_id, terrain_name, move_cost,
+    is_walkable, is_opaque):
+        """Create the object of a terrain type read from the terrain types
+        file. filename is the image of the terrain, not used here"""
+
+        return TerrainModel(terrain_id, terrain_name, move_cost, is_walkable,
+        is_opaque)
+
+    def newResource(self, type_id, x, y):
+        """Create a resource spot of the type type_id at the pixel
+        coordinates x,y"""
+
+        res_type=self._resource_types[type_id]
+
+        return ResourceModel(type_id, res_type['type'], res_type['name'],
+        res_type['amount_per_turn'], res_type['instant_amount'],
+        res_type['conquered_text'], res_type['first_time_text'], x, y)
+
+    def newCity(self, type_id, x, y):
+        """Create a city of the type type_id at the pixel coordinates x,y"""
+
+        res_type=self._resource_types[type_id]
+
+        return CityModel(type_id, res_type['type'], res_type['name'],
+        res_type['amount_per_turn'], res_type['instant_amount'],
+        res_type['conquered_text'], res_type['first_time_text'], x, y,
+        res_type['sld_cost_gold'], res_type['sld_cost_ore'])
+
+    def onSpotChanged(self, res_obj):
+        """Called when a resource spot or city is added, removed or changes
+        owner"""
+        pass
+
+    def onCellChanged(self, row, col):
+        """Called when the terrain of the cell (row,col) changes"""
+        pass
+
+    def onResourceConquered(self, army_obj, title, text):
+        """Called when an army takes a resource spot or city it didn't own,
+        title and text describe the resource conquered"""
+        pass
+
+    def onCityEntered(self, army_obj, city_obj):
+        """Called every time an army reaches a city"""
+        pass
+
+
+class ArmyModel:
+    """Superclass for the armies in the game. An army has several attributes
+    that define its current state and behaviour, the Army class of game_lib
+    displays it on the map.
+    """
+
+    _next_ID=1
+    
+    def __init__(self, army_name, x0, y0, start_time, colour, map_obj,
+    food=100,gold=50,ore=50,gems=50,soldiers=10):
+        """Initialize the common attributes to all Army subclasses"""
+        
+        self._id=ArmyModel._next_ID
+        ArmyModel._next_ID+=1
+        self._name=army_name
+        self._x=x0
+        self._y=y0
+        self._w=engine.tile_x
+        self._h=engine.tile_y
+        self._colour=colour
+        self._map_obj=map_obj
+        
+        self._moves_per_turn=float(10)
+        self._moves_left=self._moves_per_turn
+
+        self._current_time=start_time
+        self._speed = 2
+        
+        self._resources={'food':food,'gold':gold,'ore':ore, 'gems':gems}
+                
+        self._soldiers=soldiers
+
+        """Initialize map visibility"""
+        self.initializeVisibility(self._map_obj)
+        
+    def walk(self,dx,dy,map_obj):
+        """Evaluate if it is possible to move the army a vector distance (dx,dy)
+        in pixels from its current position. dx, dy go in the same direction as
+        the coordinates of the map surface, which are positive going down and
+        right"""
+        
+        right=self._x+self._w-1
+        bottom=self._y+self._h-1
+
+        if map_obj.getIsWalkable(right+dx,self._y+dy):            
+            if map_obj.getIsWalkable(right+dx,bottom+dy):
+                if map_obj.getIsWalkable(self._x+dx,self._y+dy):
+                    if map_obj.getIsWalkable(self._x+dx,bottom+dy):
+                        
+                        self.move(self._x+dx,self._y+dy)
+
+    def move(self,x1,y1):
+        """Move the army to the position (x1,y1). This coordinates are pixel
+        coordinates of the map."""
+        
+        self._x=x1
+        self._y=y1
+    
+    def getPos(self):
+        """Get the pixel coordinates of the army"""
+
+        return self._x, self._y
+
+    def getMovesLeft(self):
+        """Get the number of moves the army has left for the turn"""
+        
+        return self._moves_left
+
+    def getID(self):
+        """Get the army's ID"""
+        
+        return self._id
+
+    def updateResource(self, res_type, amount):
+        """Update the specified resource type in 'amount' units"""
+
+        self._resources[res_type]+=amount
+
+    def updateResources(self, amounts):
+        """Update several resource types, amounts is a dictionary with the
+        units of every resource type"""
+
+        for res_type in amounts:
+            self._resources[res_type]+=amounts[res_type]
+
+    def getResources(self):
+        """Get the resource amounts"""
+
+        return self._resources
+
+    def getSoldiers(self):
+        """Get the amount of soldiers"""
+
+        return self._soldiers
+
+    def initializeVisibility(self, map_obj):
+        """Initialize the army's visibility of the game map"""
+
+        self._sight_radius=engine.sight_radius
+        self._cell_visibility=map_obj.newVisibilityMask()
+        self._revealed_cells=[]
+
+        self.updateVisibility(map_obj)
+
+    def update(self, clock, map_obj):
+        """Updates Army's attributes. Called in every game loop."""
+
+        delta_t = clock - self._current_time
+        self._current_time = clock        
+
+    def updateVisibility(self, map_obj):
+        """Update the army's visibility according to its current location.
+        Depending on engine.visibility_mode, the cells in the army's field
+        of view or every cell within the sight radius become visible"""
+
+        current_cell=map_obj.getCellFromXY(self._x,self._y)
+
+        if engine.visibility_mode == 'fov':
+            cells=map_obj.getFieldOfView((current_cell['col'],
+            current_cell['row']),self._sight_radius)
+            self._revealed_cells+=self._cell_visibility.revealCells(cells)
+
+        else:
+            self._revealed_cells+=self._cell_visibility.reveal(
+            circular_stencil(self._sight_radius),current_cell['row'],
+            current_cell['col'])
+
+    def revealCell(self,row,col):
+        """Set a cell as visible to the army. Cells that weren't visible
+        before are added to the list of revealed cells"""
+
+        self._revealed_cells+=self._cell_visibility.reveal([(0,0,0)],row,col)
+
+    def setSightRadius(self, radius):
+        """Set the number of cells around the army that it can see. The new
+        radius is used from the next visibility update"""
+
+        self._sight_radius=radius
+
+    def getSightRadius(self):
+        """Get the number of cells around the army that it can see"""
+
+        return self._sight_radius
+
+    def getCellVisibility(self):
+        """Return the VisibilityMask with the cells visible to the army"""
+        return self._cell_visibility
+
+    def getSharedVisibility(self, allies):
+        """Return a new VisibilityMask with the cells visible to the army or
+        to any of the armies in the list allies"""
+
+        mask=self._cell_visibility.copy()
+        for a in allies:
+            mask.unionUpdate(a.getCellVisibility())
+        return mask
+
+    def getRevealedCells(self):
+        """Return the list of (row,col) cells visible to the army, in the
+        order they were revealed. Cells are only added to the end of this
+        list, so the map can draw just the ones revealed since the previous
+        frame"""
+        return self._revealed_cells
+
+    def getColour(self):
+        """Return the army's colour"""
+        return self._colour
+
+    def updateSoldiers(self,amount):
+        """Update the amount of soldiers"""
+
+        self._soldiers += amount
+
+    def getName(self):
+        """Get the name of the army"""
+        return self._name
+
+
+class PlayerModel(ArmyModel):
+    """This class represents the army controlled by the player. It inherits the
+    attributes of its super class ArmyModel, and follows the paths set with
+    setPath. The Player class of game_lib displays it and its path.
+
+    The moves are made a few pixels per game loop by update, or a whole path
+    at once by walkPath, which is what simulations use."""
+    
+    def __init__(self, army_name, x0, y0, start_time, colour, map_obj,
+    food=100,gold=50,ore=50,gems=10,soldiers=10):    
+        """Initialize the PlayerModel object"""
+
+        ArmyModel.__init__(self, army_name, x0, y0, start_time, colour,
+        map_obj, food,gold,ore,gems,soldiers)
+        
+        self._path = self.newPath()
+        self._is_moving=False
+        self._dir_x=0
+        self._dir_y=0
+        self._dest_x=None
+        self._dest_y=None
+        self._pathpoints=[]        
+
+        """the path planner keeps its search between calls to setPath, so
+        following a path doesn't search the whole map on every step. It is
+        made the first time it is used"""
+        self._planner=None
+        self._planner_version=None
+        self._jps=None
+        self._jps_version=None
+
+        """cells reachable in the current turn, see getReachable"""
+        self._reach=None
+        self._reach_key=None
+
+        """cost version of the map when the path was set. While it doesn't
+        change, the path is followed as it is, see arriveAtCell"""
+        self._path_version=None
+        
+    def __str__(self):
+        """Return a string with information of the object"""
+        return self._name
+
+    def handleKeyboard(self,key_event,map_obj):
+        """Handle user keyboard input"""
+        pass
+
+
+    def findPathCells(self,start,end,map_obj):
+        """Find a path between two (column,row) cells. Paths already found are
+        taken from the path cache of the map, otherwise the path is searched
+        with searchPathCells and stored in the cache. Return the list of
+        cells from start (not included) to end, or None if end can't be
+        reached."""
+
+        cache=map_obj.getPathCache()
+        algorithm=map_obj.getPathAlgorithm()
+        cells=cache.get(start,end,algorithm,map_obj.getCostVersion())
+
+        if cells is None:
+            cells=self.searchPathCells(start,end,map_obj)
+            if cells is not None:
+                cache.put(start,end,algorithm,cells,map_obj.getCostVersion())
+
+        return cells
+
+    def searchPathCells(self,start,end,map_obj):
+        """Search a path between two (column,row) cells with the algorithm
+        selected in engine.path_algorithm. Return the list of cells from start
+        (not included) to end, or None if end can't be reached."""
+
+        map_dims=map_obj.getDimensions()
+        heuristic=satar_modif.HEURISTICS[engine.path_heuristic]
+
+        algorithm=map_obj.getPathAlgorithm()
+
+        if algorithm == 'dstar':
+            """repair the planner if the move costs changed since the last
+            search"""
+            if self._planner is None:
+                self._planner=dstar_lite.DStarLite(map_obj.getMoveCost1D(),
+                map_dims['num_cols']-1,map_dims['num_rows']-1,heuristic,
+                map_obj.getMinMoveCost())
+                self._planner_version=map_obj.getCostVersion()
+
+            elif self._planner_version != map_obj.getCostVersion():
+                self._planner.updateCosts(map_obj.getMoveCost1D(),
+                map_obj.getCostChanges(self._planner_version))
+                self._planner_version=map_obj.getCostVersion()
+
+            return self._planner.findPath(start,end)
+
+        if algorithm == 'hpa':
+            return map_obj.getClusterMap().findPath(start,end)
+
+        map_handler=satar_modif.SQ_MapHandler(map_obj.getMoveCost1D(),
+        map_dims['num_cols']-1,map_dims['num_rows']-1,heuristic,
+        map_obj.getMinMoveCost())
+
+        if algorithm == 'jps':
+            """the jump point finder caches which cells are jump points
+            for each direction, so it is kept until the move costs
+            change"""
+            if self._jps_version != map_obj.getCostVersion():
+                self._jps=satar_modif.JPS(map_handler)
+                self._jps_version=map_obj.getCostVersion()
+            finder=self._jps
+
+        else:
+            finder=satar_modif.AStar(map_handler)
+
+        p=finder.findPath(satar_modif.SQ_Location(start[0],start[1]),
+        satar_modif.SQ_Location(end[0],end[1]))
+
+        if not p:
+            return None
+
+        return [(n.location.x,n.location.y) for n in p.nodes]
+
+    def setPath(self,(x,y),map_obj):
+        """Obtain the path from the player's current position to a destination
+        point (x,y), in pixel coordinates of the map surface, using the
+        algorithm selected in engine.path_algorithm. With the default
+        incremental D* Lite planner, when the destination is the same as in
+        the previous call the planner only repairs its previous search."""
+        
+        dest_cell = map_obj.getCellFromXY(x,y)
+        current_cell = map_obj.getCellFromXY(self._x,self._y)                    
+
+        if dest_cell != current_cell:
+            start = (current_cell['col'],current_cell['row'])
+            end = (dest_cell['col'],dest_cell['row'])
+
+            """the path is searched with the selected algorithm, the
+            reachable area is only used to find where the part done in the
+            current turn ends"""
+            reach = self.getReachable(map_obj)
+            cells = self.findPathCells(start,end,map_obj)
+
+            """convert the resulting cells to pixels"""
+
+            if not cells:
+                self._path.reset()
+                
+            else:
+                self._pathpoints = []
+                self._pathpoints.append((start[0]*engine.tile_x+self._w/2,
+                start[1]*engine.tile_y+self._h/2))
+
+                for (col,row) in cells:
+                    self._pathpoints.append((col*engine.tile_x+self._w/2,
+                    row*engine.tile_y+self._h/2))
+                
+                """update the Path attribute"""                
+                self._path.update(self._pathpoints,self._moves_left,map_obj,
+                reach)
+                self._path_version=map_obj.getCostVersion()
+
+        else:
+            self._path.reset()
+    
+    def getReachable(self,map_obj):
+        """Return the ReachableArea of the cells the player can reach with
+        the moves left in the current turn. It is only computed again when
+        the player moves, the turn changes or the move costs change."""
+
+        current_cell=map_obj.getCellFromXY(self._x,self._y)
+        key=(current_cell['col'],current_cell['row'],self._moves_left,
+        map_obj.getCostVersion())
+
+        if key!=self._reach_key:
+            self._reach=map_obj.getReachable((current_cell['col'],
+            current_cell['row']),self._moves_left)
+            self._reach_key=key
+
+        return self._reach
+
+    def getMoveCostTo(self,(x,y),map_obj):
+        """Return the cost of moving to the point (x,y), in pixel coordinates
+        of the map surface, if it can be reached in the current turn, or None
+        if it can't. Useful to preview a destination without searching for a
+        path."""
+
+        cell=map_obj.getCellFromXY(x,y)
+        return self.getReachable(map_obj).getCost((cell['col'],cell['row']))
+
+    def update(self, clock, map_obj):
+        """Updates Player's attributes. Called in every game loop."""
+
+        ArmyModel.update(self,clock,map_obj)      
+
+        if self._is_moving:
+            """update position"""
+            self._x +=self._speed * self._dir_x
+            self._y +=self._speed * self._dir_y
+
+            self.onMoving()
+
+            """when the next cell is reached, the path is updated and a
+            checking is performed to see if the final cell of the path has
+            been reached"""
+            if self._x == self._dest_x and self._y == self._dest_y:
+                self.arriveAtCell(map_obj)
+
+    def arriveAtCell(self, map_obj):
+        """Actions to be performed when the player reaches the next cell of
+        its path: the moves are charged, the visibility is updated, resource
+        spots on the cell are taken, and the player stops or goes on to the
+        next cell"""
+
+        self._moves_left-=self._current_move_cost
+        
+        self._x = self._dest_x
+        self._y = self._dest_y
+        self._dir_x=0
+        self._dir_y=0
+
+        current_cell=map_obj.getCellFromXY(self._x,self._y)
+        final_destination=self._path.getFinalPoint()
+        final_cell=map_obj.getCellFromXY(final_destination[0],
+        final_destination[1])
+
+        """update visibility"""
+        self.updateVisibility(map_obj)
+
+        """collition detection with resource spots is performed"""
+        result, resource_id = map_obj.resOnCellXY(self._x,
+        self._y)
+
+        if result:
+            
+            """call the armyOnResource method of the resource"""
+            map_obj.armyOnResource(self,resource_id)
+            
+        """if the army reached its final destination, stop moving"""
+        if current_cell == final_cell:
+            self._is_moving=False
+            self._path.reset()
+
+        elif self._path_version == map_obj.getCostVersion():
+            """the rest of the path is still the best way to the
+            destination, and the part done in this turn still is"""
+            self._path.advance()
+            map_obj.prefetchPath(self._path.getPoints())
+            self.setMovingPath(map_obj)
+
+        else:
+            self.setPath((final_destination[0],final_destination[1]),
+            map_obj)
+
+            self.setMovingPath(map_obj)          
+
+    def walkPath(self, map_obj):
+        """Follow the current path at once, cell by cell, until the
+        destination is reached or the moves left for the turn are not enough
+        for the next cell. Return the number of cells moved."""
+
+        if not self._is_moving and self._path.pathDisplayed():
+            self.setMovingPath(map_obj)
+
+        moved=0
+        while self._is_moving:
+            self.arriveAtCell(map_obj)
+            moved+=1
+
+        return moved
+   
+
+    def destinationCircleClicked(self,(x,y), map_obj):
+        """Test if the destination circle of the path was clicked, in case
+        there is a path displayed on the screen"""
+
+        if self._path.pathDisplayed():
+            dest_circle_xy=self._path.getDestCircleCoordinates()
+
+            clicked_cell = map_obj.getCellFromXY(x,y)
+            circle_cell = map_obj.getCellFromXY(dest_circle_xy[0],
+            dest_circle_xy[1])
+
+            if clicked_cell == circle_cell:
+                return True
+
+            else:
+                return False
+        else:
+            return False
+
+    def setMovingPath(self, map_obj):
+        """Set the Army to follow the current path if there are moves left
+        on the current turn."""
+        
+        next_point=self._path.getNextPoint()
+        destination=map_obj.getCellCoordFromXY(next_point[0],next_point[1])
+             
+        """check if the user can move in the present turn"""
+        move_cost=map_obj.getCostBetween2Points((self._x,self._y),
+        (destination[0],destination[1]))
+
+        if self._moves_left - move_cost >= 0:
+
+            self._current_move_cost=move_cost
+            self._is_moving=True
+            
+            self._dest_x=destination[0]
+            self._dest_y=destination[1]
+            
+            current_cell = map_obj.getCellFromXY(self._x,self._y)
+            dest_cell = map_obj.getCellFromXY(self._dest_x,self._dest_y)
+            
+            if dest_cell['col']-current_cell['col'] < 0:
+                self._dir_x=-1
+                
+            elif dest_cell['col']-current_cell['col'] == 0:
+                self._dir_x=0
+
+            elif dest_cell['col']-current_cell['col'] > 0:
+                self._dir_x=1
+
+            if dest_cell['row']-current_cell['row'] < 0:
+                self._dir_y=-1
+                
+            elif dest_cell['row']-current_cell['row'] == 0:
+                self._dir_y=0
+
+            elif dest_cell['row']-current_cell['row'] > 0:
+                self._dir_y=1
+
+        else:
+            self._is_moving=False
+
+    def hasPath(self):
+        """Return if the player has a destination to go to"""
+
+        return self._path.pathDisplayed()
+
+    def isMoving(self):
+        """Return if the player is currently moving"""
+
+        return self._is_moving
+
+    def newTurn(self,map_obj):
+        """Actions to be performed when the turn is over"""
+
+        self._moves_left = self._moves_per_turn
+        self.update(self._current_time,map_obj)
+
+        if self._path.pathDisplayed():
+            self.setPath(self._path.getFinalPoint(),map_obj)
+        map_obj.payTurnResources(self)
+        self.onNewTurn()
+
+    def buySoldiers(self, num_sold, city_obj):
+        """Try to buy soldiers depending on the cost of the soldiers,
+        the quantity, and the available resources"""
+
+        cost_gold, cost_ore = city_obj.getSoldierPrice()
+
+        tot_cost_gold=cost_gold*num_sold
+        tot_cost_ore=cost_ore*num_sold
+
+        res=self.getResources()
+        
+        if tot_cost_gold > res['gold'] or tot_cost_ore > res['ore']:
+            return False
+
+        else:
+            self.updateSoldiers(num_sold)
+            self.updateResource('gold',-tot_cost_gold)
+            self.updateResource('ore',-tot_cost_ore)
+            return True
+
+    def newPath(self):
+        """Create the object of the path followed by the player"""
+
+        return PathModel()
+
+    def onMoving(self):
+        """Called in every game loop while the player is moving"""
+        pass
+
+    def onNewTurn(self):
+        """Called at the end of newTurn"""
+        pass
+
+
+class PathModel:
+    """Represents the path from the player's current position to a destination
+    cell. It is composed of the points of the part of the path that can be
+    completed in the current turn, the blue points, and the points of the part
+    that can't be completed in the current turn, the red points. The Path
+    class of game_lib draws them."""
+
+    def __init__(self):
+        """Initialize the PathModel object"""
+
+        self._points=[]
+        self._bluepoints=[]
+        self._redpoints=[]
+                
+    def update(self, points, moves_left, map_obj, reach=None):
+        """Update the path to a new destination. This is done by obtaining
+        the sections of the path that can be done in the current turn.
+
+        reach is an optional ReachableArea of the army for the current turn.
+        If the destination is in it and the path is the one given by the
+        area, the whole path is done in this turn and no costs need to be
+        added. Otherwise the walk along the path stops as soon as it leaves
+        the area."""
+
+        self.reset()
+        
+        self._points=points
+        self._bluepoints=[points[0]]
+        self._redpoints=[]
+
+        """on chunked maps, the chunks along the path are loaded in the
+        background"""
+        map_obj.prefetchPath(points)
+                
+        accum_cost = 0
+        i=0
+
+        cells=[]
+        if reach:
+            cells=[(x/engine.tile_x,y/engine.tile_y) for (x,y) in points]
+
+        if reach and reach.isReachable(cells[-1]) and \
+        reach.getPathTo(cells[-1])==cells[1:]:
+            self._bluepoints=list(points)
+            i=len(points)-1
+
+        while (accum_cost <= moves_left) and (i<len(points)-1):
+            if reach and not(reach.isReachable(cells[i+1])):
+                break
+
+            next_move=map_obj.getCostBetween2Points(points[i],points[i+1])
+
+            if (moves_left - next_move - accum_cost) >= 0:                
+                self._bluepoints.append(points[i+1])
+                accum_cost += next_move
+                
+            else:
+                break
+            i+=1
+
+        if i<(len(points)-1):
+            self._redpoints=[points[i]]
+            while i<(len(points)-1):
+                self._redpoints.append(points[i+1])
+                i+=1
+
+    def reset(self):
+        """Resets the path so it wont be followed or displayed"""
+
+        self._bluepoints=[]
+        self._redpoints=[]
+
+    def getBluePoints(self):
+        """Get the points of the part of the path done in the current turn"""
+
+        return self._bluepoints
+
+    def getRedPoints(self):
+        """Get the points of the part of the path left for the next turns"""
+
+        return self._redpoints
+
+    def pathDisplayed(self):
+        """Return if there is a path displayed on the screen"""
+        
+        return len(self._bluepoints)>1 or len(self._redpoints)>1
+
+    def getDestCircleCoordinates(self):
+        """Get the coordinates of the destination circle"""
+
+        if self.pathDisplayed():
+            return self._points[len(self._points)-1]
+
+        return []
+
+    def advance(self):
+        """Remove the first point of the path, when the army has reached the
+        next one"""
+
+        self._points=self._points[1:]
+
+        if len(self._bluepoints)>1:
+            self._bluepoints=self._bluepoints[1:]
+        else:
+            self._redpoints=self._redpoints[1:]
+
+    def getNextPoint(self):
+        """Get the coordinates of the closest point to the current positon
+        of the Army"""
+
+        return self._points[1]
+
+    def getPoints(self):
+        """Get the points of the path, from the army's position to the
+        destination"""
+
+        return self._points
+
+    def getFinalPoint(self):
+        """Get the last point of the path"""
+
+        return self._points[len(self._points)-1]
+
+
+class ResourceModel:
+    """Represents a resource spot. A resource spot can be owned by an army. If
+    owned, it will give the army a certain amount of the resource at the end of
+    every turn."""
+
+    _nextID=1
+
+    def __init__(self, type_id, resource_type, resource_name,
+    amount_per_turn, instant_amount, conquered_text, first_time_txt,x, y):
+        """Initialize the ResourceModel object. This is done from the Map
+        object"""
+
+        self._type_id = type_id
+        self._type = resource_type
+        self._name = resource_name
+        self._turn_amount = randint(int(0.6*amount_per_turn),
+        int(1.4*amount_per_turn))
+
+        self._instant_amount = randint(int(0.5*instant_amount),
+        int(1.5*instant_amount))
+
+        self._conquered_text=conquered_text
+        self._first_time_txt=first_time_txt
+        
+        self._x=x
+        self._y=y
+        self._owner = None
+        self._owner_name = None
+        self._id = ResourceModel._nextID
+        ResourceModel._nextID += 1
+
+        self._is_city=False
+        
+    def setOwner(self, army_id, army_name, colour):
+        """Set the owner of the resource"""
+
+        self._owner = army_id
+        self._owner_name = army_name
+        self._owner_colour = colour
+
+    def getOwner(self):
+        """Get the owner of the resource"""
+
+        return self._owner, self._owner_name
+
+    def getPos(self):
+        """Get the pixel coordinates of the Resource"""
+        return self._x, self._y
+
+    def getID(self):
+        """Return the id attribute"""
+        return self._id
+
+    def getConqueredText(self):
+        """Return a string to be displayed when the Resource is conquered"""
+
+        text=self._conquered_text
+
+        if not(self._owner):
+            text=text + ' ' + self._first_time_txt
+
+        """replace keywords by attribute values"""
+        text=text.replace('_TURN_AMOUNT',str(self._turn_amount))
+        text=text.replace('_RESOURCE',str(self._type))
+        text=text.replace('_INSTANT_AMOUNT',str(self._instant_amount))
+                     
+        return self._name, text
+
+    def getType(self):
+        """Get the resource type"""
+
+        return self._type
+
+    def getTypeID(self):
+        """Get the id of the resource spot's type"""
+
+        return self._type_id
+
+    def getTurnAmount(self):
+        """Get the amount of resource to be paid at the end of every turn"""
+
+        return self._turn_amount
+
+    def payFirstAmount(self):
+        """Get the amount of resource to be paid to the first army that owns
+        the resource spot."""
+
+        first_payment = self._instant_amount
+        self._instant_amount = 0  
+        return first_payment
+
+    def isCity(self):
+        """Check if the resource is a city or not"""
+
+        return self._is_city
+
+    def getName(self):
+        """Get the name of the resource"""
+
+        return self._name
+
+class CityModel(ResourceModel):
+    """Represents a city. Cities have the same behaviour as resource spots,
+    but they also offer the option to buy soldiers."""
+
+    def __init__(self, type_id, resource_type, name, amount_per_turn,
+    instant_amount, conquered_text, first_time_txt,x, y, price_gold,
+    price_ore):
+        
+        """Initialize the CityModel object."""
+
+        ResourceModel.__init__(self, type_id, resource_type, name,
+        amount_per_turn, instant_amount, conquered_text, first_time_txt,x, y)
+
+        self.initCity(price_gold, price_ore)
+
+    def initCity(self, price_gold, price_ore):
+        """Initialize the attributes that cities add to the resource spots"""
+
+        self._is_city=True
+        
+        self._price_gold=price_gold
+        self._price_ore=price_ore
+
+    def getSoldierPrice(self):
+        """Get the price of one soldier"""
+
+        return self._price_gold, self._price_ore
+
+
+class PathCache():
+    """Least recently used cache of the paths found on a map, keyed by start
+    cell, goal cell and path finding algorithm, for the cost version of the
+    map. A path is also reused for a new start that lies on a path already
+    found to the same goal with the same algorithm, since the rest of that
+    path leads to the goal as well."""
+
+    def __init__(self,max_size):
+        """Initialize the PathCache object. max_size is the maximum number of
+        paths stored"""
+
+        self._max_size=max_size
+        self._version=None
+
+        """hits for the same start and goal, hits for a start in the middle
+        of a stored path, and searches that weren't in the cache"""
+        self._hits=0
+        self._subpath_hits=0
+        self._misses=0
+
+        self.clear()
+
+    def clear(self):
+        """Remove all the paths from the cache"""
+
+        """{(start,goal,algorithm): (cells, {cell: position in cells})},
+        from the least to the most recently used"""
+        self._entries=OrderedDict()
+
+        """{(goal,algorithm): set of starts}, to look for sub-paths"""
+        self._starts_by_goal={}
+
+    def get(self,start,goal,algorithm,version):
+        """Return a copy of the cells from start (not included) to goal found
+        with algorithm, or None if the path is not in the cache. version is
+        the current cost version of the map, the cache is emptied when it
+        changes."""
+
+        if version!=self._version:
+            self.clear()
+            self._version=version
+
+        key=(start,goal,algorithm)
+        if key in self._entries:
+            self._touch(key)
+            self._hits+=1
+            return list(self._entries[key][0])
+
+        for s in self._starts_by_goal.get((goal,algorithm),()):
+            key=(s,goal,algorithm)
+            cells,index=self._entries[key]
+            pos=index.get(start)
+            if pos is not None:
+                self._touch(key)
+                self._subpath_hits+=1
+                return cells[pos+1:]
+
+        self._misses+=1
+        return None
+
+    def put(self,start,goal,algorithm,cells,version):
+        """Store the cells from start (not included) to goal found with
+        algorithm"""
+
+        if version!=self._version:
+            self.clear()
+            self._version=version
+
+        key=(start,goal,algorithm)
+        if key in self._entries:
+            del self._entries[key]
+        elif len(self._entries)>=self._max_size:
+            self._removeOldest()
+
+        index={}
+        for i in range(len(cells)):
+            index[cells[i]]=i
+
+        self._entries[key]=(list(cells),index)
+        self._starts_by_goal.setdefault((goal,algorithm),set()).add(start)
+
+    def _touch(self,key):
+        """Move an entry to the most recently used end"""
+
+        self._entries[key]=self._entries.pop(key)
+
+    def _removeOldest(self):
+        (start,goal,algorithm),_=self._entries.popitem(last=False)
+
+        starts=self._starts_by_goal[(goal,algorithm)]
+        starts.discard(start)
+        if not starts:
+            del self._starts_by_goal[(goal,algorithm)]
+
+    def getStats(self):
+        """Return a dictionary with the hit and miss counters and the number
+        of stored paths"""
+
+        return {'hits':self._hits,'subpath_hits':self._subpath_hits,
+        'misses':self._misses,'size':len(self._entries)}
+
+
+def circular_stencil(radius):
+    """Return the cells within radius of a center cell, as a list of
+    (row offset, first column offset, last column offset) spans, one for
+    every row. A cell is inside when row**2+col**2 <= radius*(radius+1), so
+    that a radius of 1 gives the 8 neighbours. Stencils are kept in
+    _stencils, since armies use the same few radii."""
+
+    stencil=_stencils.get(radius)
+
+    if stencil is None:
+        limit=radius*(radius+1)
+        stencil=[]
+        for dr in range(-radius,radius+1):
+            dc=0
+            while (dc+1)**2+dr**2<=limit:
+                dc+=1
+            stencil.append((dr,-dc,dc))
+        _stencils[radius]=stencil
+
+    return stencil
+
+_stencils={}
+
+"""number of cells combined at once by combine_cells, larger blocks are not
+faster"""
+MASK_BLOCK=4096
+
+
+def combine_cells(cells,other,function):
+    """Combine in place the bytearray cells with the bytearray other, of the
+    same length, where function is operator.or_ or operator.and_. The bytes
+    are converted to long integers a block of MASK_BLOCK cells at a time,
+    so the temporary copies have the same size whatever the size of the
+    map."""
+
+    for i in xrange(0,len(cells),MASK_BLOCK):
+        block=cells[i:i+MASK_BLOCK]
+        value=function(long(hexlify(block),16),
+        long(hexlify(other[i:i+MASK_BLOCK]),16))
+        cells[i:i+MASK_BLOCK]=unhexlify('%0*x' % (len(block)*2,value))
+
+
+class VisibilityMask():
+    """Cells of the map visible to an army, one byte per cell, row by row.
+    Spans of cells are revealed with slice assignments, and masks are
+    combined with union and intersection, which convert the bytes to long
+    integers to do the operation on a block of cells at once, see
+    combine_cells."""
+
+    def __init__(self,rows,cols,cells=None):
+        """Initialize the VisibilityMask object, with no visible cells unless
+        cells, a bytearray of rows*cols zeros and ones, is given"""
+
+        self._rows=rows
+        self._cols=cols
+
+        if cells is None:
+            cells=bytearray(rows*cols)
+        self._cells=cells
+
+    def reveal(self,stencil,row,col):
+        """Set visible the cells of a stencil, as created by circular_stencil,
+        centered on the cell (row,col). Return the list of (row,col) cells
+        that weren't visible before."""
+
+        revealed=[]
+        cells=self._cells
+
+        for (dr,dc0,dc1) in stencil:
+            r=row+dr
+            if r<0 or r>=self._rows:
+                continue
+
+            c0=max(col+dc0,0)
+            c1=min(col+dc1,self._cols-1)
+            if c0>c1:
+                continue
+
+            start=r*self._cols
+            span=cells[start+c0:start+c1+1]
+
+            if span.count('\x00'):
+                for c in range(c0,c1+1):
+                    if not span[c-c0]:
+                        revealed.append((r,c))
+                cells[start+c0:start+c1+1]='\x01'*(c1-c0+1)
+
+        return revealed
+
+    def revealCells(self,cells):
+        """Set visible a list of (col,row) cells. Return the list of
+        (row,col) cells that weren't visible before."""
+
+        revealed=[]
+        mask=self._cells
+        cols=self._cols
+
+        for (c,r) in cells:
+            if not mask[r*cols+c]:
+                mask[r*cols+c]=1
+                revealed.append((r,c))
+
+        return revealed
+
+    def isVisible(self,row,col):
+        """Return if the cell (row,col) is visible"""
+
+        return self._cells[row*self._cols+col]
+
+    def getVisibleCells(self,cells):
+        """Return the (row,col) cells of a list that are visible"""
+
+        mask=self._cells
+        cols=self._cols
+        return [(r,c) for (r,c) in cells if mask[r*cols+c]]
+
+    def count(self):
+        """Return the number of visible cells"""
+
+        return len(self._cells)-self._cells.count('\x00')
+
+    def getDimensions(self):
+        """Return the number of rows and columns of the mask"""
+
+        return self._rows, self._cols
+
+    def copy(self):
+        """Return a new VisibilityMask with the same visible cells"""
+
+        return VisibilityMask(self._rows,self._cols,bytearray(self._cells))
+
+    def toLong(self):
+        """Return the cells as a long integer, one byte per cell"""
+
+        return long(hexlify(self._cells),16)
+
+    def fromLong(self,value):
+        """Set the cells from a long integer made by toLong"""
+
+        self._cells=bytearray(unhexlify('%0*x' % (len(self._cells)*2,value)))
+
+    def unionUpdate(self,other):
+        """Set visible the cells visible in another mask of the same
+        dimensions"""
+
+        combine_cells(self._cells,other._cells,operator.or_)
+
+    def intersectionUpdate(self,other):
+        """Keep visible only the cells also visible in another mask of the
+        same dimensions"""
+
+        combine_cells(self._cells,other._cells,operator.and_)
+
+    def union(self,other):
+        """Return a new mask with the cells visible in this mask or in
+        other"""
+
+        mask=self.copy()
+        mask.unionUpdate(other)
+        return mask
+
+    def intersection(self,other):
+        """Return a new mask with the cells visible in both this mask and
+        other"""
+
+        mask=self.copy()
+        mask.intersectionUpdate(other)
+        return mask
+
+
+class ChunkedVisibilityMask():
+    """Cells of a chunked map visible to an army, with the same methods as
+    VisibilityMask except toLong and fromLong. The cells are kept in square
+    chunks of one byte per cell, and a chunk is only made when a cell in it
+    becomes visible, so the memory used depends on the part of the map the
+    army has seen and not on the size of the map."""
+
+    def __init__(self,rows,cols,chunk_size,chunks=None):
+        """Initialize the ChunkedVisibilityMask object, with no visible cells
+        unless chunks, a dictionary {(chunk column,chunk row): bytearray of
+        chunk_size*chunk_size zeros and ones}, is given"""
+
+        self._rows=rows
+        self._cols=cols
+        self._size=chunk_size
+
+        if chunks is None:
+            chunks={}
+        self._chunks=chunks
+
+    def getChunk(self,row,col):
+        """Return the bytearray of the chunk that contains the cell (row,col),
+        making it if it doesn't exist"""
+
+        key=(col/self._size,row/self._size)
+        cells=self._chunks.get(key)
+
+        if cells is None:
+            cells=bytearray(self._size*self._size)
+            self._chunks[key]=cells
+
+        return cells
+
+    def reveal(self,stencil,row,col):
+        """Set visible the cells of a stencil, as created by circular_stencil,
+        centered on the cell (row,col). Return the list of (row,col) cells
+        that weren't visible before."""
+
+        revealed=[]
+        size=self._size
+
+        for (dr,dc0,dc1) in stencil:
+            r=row+dr
+            if r<0 or r>=self._rows:
+                continue
+
+            c0=max(col+dc0,0)
+            c1=min(col+dc1,self._cols-1)
+
+            """the span is split where it crosses a chunk boundary"""
+            while c0<=c1:
+                end=min(c1,(c0/size+1)*size-1)
+                cells=self.getChunk(r,c0)
+
+                start=(r%size)*size-(c0/size)*size
+                span=cells[start+c0:start+end+1]
+
+                if span.count('\x00'):
+                    for c in range(c0,end+1):
+                        if not span[c-c0]:
+                            revealed.append((r,c))
+                    cells[start+c0:start+end+1]='\x01'*(end-c0+1)
+
+                c0=end+1
+
+        return revealed
+
+    def revealCells(self,cells):
+        """Set visible a list of (col,row) cells. Return the list of
+        (row,col) cells that weren't visible before."""
+
+        revealed=[]
+        size=self._size
+
+        for (c,r) in cells:
+            chunk=self.getChunk(r,c)
+            i=(r%size)*size+c%size
+            if not chunk[i]:
+                chunk[i]=1
+                revealed.append((r,c))
+
+        return revealed
+
+    def isVisible(self,row,col):
+        """Return if the cell (row,col) is visible"""
+
+        size=self._size
+        cells=self._chunks.get((col/size,row/size))
+        if cells is None:
+            return 0
+        return cells[(row%size)*size+col%size]
+
+    def getVisibleCells(self,cells):
+        """Return the (row,col) cells of a list that are visible"""
+
+        return [(r,c) for (r,c) in cells if self.isVisible(r,c)]
+
+    def count(self):
+        """Return the number of visible cells"""
+
+        return sum([len(cells)-cells.count('\x00') for cells in
+        self._chunks.itervalues()])
+
+    def getDimensions(self):
+        """Return the number of rows and columns of the mask"""
+
+        return self._rows, self._cols
+
+    def copy(self):
+        """Return a new ChunkedVisibilityMask with the same visible cells"""
+
+        chunks={}
+        for (key,cells) in self._chunks.iteritems():
+            chunks[key]=bytearray(cells)
+        return ChunkedVisibilityMask(self._rows,self._cols,self._size,chunks)
+
+    def unionUpdate(self,other):
+        """Set visible the cells visible in another mask of the same
+        dimensions and chunk size. Chunks are combined with combine_cells,
+        like in VisibilityMask"""
+
+        for (key,cells) in other._chunks.iteritems():
+            mine=self._chunks.get(key)
+            if mine is None:
+                self._chunks[key]=bytearray(cells)
+            else:
+                combine_cells(mine,cells,operator.or_)
+
+    def intersectionUpdate(self,other):
+        """Keep visible only the cells also visible in another mask of the
+        same dimensions and chunk size"""
+
+        for key in self._chunks.keys():
+            cells=other._chunks.get(key)
+            if cells is None:
+                del self._chunks[key]
+            else:
+                combine_cells(self._chunks[key],cells,operator.and_)
+
+    def union(self,other):
+        """Return a new mask with the cells visible in this mask or in
+        other"""
+
+        mask=self.copy()
+        mask.unionUpdate(other)
+        return mask
+
+    def intersection(self,other):
+        """Return a new mask with the cells visible in both this mask and
+        other"""
+
+        mask=self.copy()
+        mask.intersectionUpdate(other)
+        return mask
+
+
+class IncomeLedger():
+    """End of turn income of every army, kept up to date as resource spots
+    change owner so that paying an army doesn't go through all the resource
+    spots of the map. Owners are army ids."""
+
+    def __init__(self):
+        """Initialize the IncomeLedger object"""
+
+        """{owner: {resource type: units per turn}} and {owner: set of
+        resource ids}"""
+        self._income={}
+        self._spots={}
+
+    def transfer(self,res_id,res_type,amount,old_owner,new_owner):
+        """Move the income of a resource spot from old_owner to new_owner.
+        Either of them can be None, for a spot without owner."""
+
+        if old_owner is not None and res_id in self._spots.get(old_owner,()):
+            self._spots[old_owner].discard(res_id)
+            income=self._income[old_owner]
+            income[res_type]-=amount
+
+            if not self._spots[old_owner]:
+                del self._spots[old_owner]
+                del self._income[old_owner]
+
+        if new_owner is not None:
+            self._spots.setdefault(new_owner,set()).add(res_id)
+            income=self._income.setdefault(new_owner,{})
+            income[res_type]=income.get(res_type,0)+amount
+
+    def getIncome(self,owner):
+        """Return a dictionary with the units of every resource type the owner
+        gets per turn"""
+
+        return dict(self._income.get(owner,{}))
+
+    def getSpots(self,owner):
+        """Return a list with the ids of the resource spots of the owner"""
+
+        return list(self._spots.get(owner,()))
+
+
+class ResourceIndex():
+    """Index of the resource spots of a map by (column,row) cell. A dictionary
+    gives the resource on a cell, and a grid of buckets of bucket_size x
+    bucket_size cells, each with the set of resources on its cells, is used
+    for range queries. A cell can hold several resources, getAt returns the
+    first one added."""
+
+    def __init__(self,bucket_size):
+        """Initialize the ResourceIndex object"""
+
+        self._bucket_size=bucket_size
+
+        """{cell: list of resource ids}, {resource id: cell} and {bucket:
+        set of resource ids}"""
+        self._by_cell={}
+        self._cells={}
+        self._buckets={}
+
+    def add(self,res_id,cell):
+        """Add the resource res_id on a (column,row) cell"""
+
+        self._by_cell.setdefault(cell,[]).append(res_id)
+        self._cells[res_id]=cell
+        self._buckets.setdefault(self.getBucket(cell),set()).add(res_id)
+
+    def remove(self,res_id):
+        """Remove the resource res_id, nothing is done if it is not in the
+        index"""
+
+        cell=self._cells.pop(res_id,None)
+        if cell is None:
+            return
+
+        self._by_cell[cell].remove(res_id)
+        if not self._by_cell[cell]:
+            del self._by_cell[cell]
+        bucket=self.getBucket(cell)
+        self._buckets[bucket].discard(res_id)
+        if not self._buckets[bucket]:
+            del self._buckets[bucket]
+
+    def getBucket(self,(col,row)):
+        """Return the (column,row) of the bucket that contains a cell"""
+
+        return (col/self._bucket_size,row/self._bucket_size)
+
+    def getAt(self,cell):
+        """Return the id of the resource on a (column,row) cell, or None"""
+
+        res_ids=self._by_cell.get(cell)
+        if res_ids:
+            return res_ids[0]
+        return None
+
+    def getAllAt(self,cell):
+        """Return a list with the ids of the resources on a (column,row)
+        cell"""
+
+        return list(self._by_cell.get(cell,()))
+
+    def getCell(self,res_id):
+        """Return the (column,row) cell of a resource"""
+
+        return self._cells[res_id]
+
+    def getInCellRect(self,(col,row,width,height)):
+        """Return a list with the ids of the resources inside a rectangle of
+        cells"""
+
+        if width*height<=self._bucket_size*self._bucket_size:
+            """rectangles smaller than a bucket are checked cell by cell"""
+            found=[]
+            for r in range(row,row+height):
+                for c in range(col,col+width):
+                    found.extend(self._by_cell.get((c,r),()))
+            return found
+
+        found=[]
+        (first_col,first_row)=self.getBucket((col,row))
+        (last_col,last_row)=self.getBucket((col+width-1,row+height-1))
+
+        for bucket_row in range(first_row,last_row+1):
+            for bucket_col in range(first_col,last_col+1):
+                for res_id in self._buckets.get((bucket_col,bucket_row),()):
+                    (c,r)=self._cells[res_id]
+                    if c>=col and c<col+width and r>=row and r<row+height:
+                        found.append(res_id)
+
+        return found
+
+    def getInRadius(self,(col,row),radius):
+        """Return a list with the ids of the resources at a distance of at
+        most radius cells from the cell (col,row)"""
+
+        found=[]
+        radius_2=radius*radius
+        cells=int(radius)
+
+        for res_id in self.getInCellRect((col-cells,row-cells,2*cells+1,
+        2*cells+1)):
+            (c,r)=self._cells[res_id]
+            if (c-col)**2+(r-row)**2<=radius_2:
+                found.append(res_id)
+
+        return found
+
+    def __len__(self):
+        """Return the number of resources in the index"""
+
+        return len(self._cells)
+
+
+class ReachableArea():
+    """Cells that an army can reach in the current turn, with their cost and
+    the cheapest way to get there. Created by Map.getReachable."""
+
+    def __init__(self,origin,costs,parents):
+        """Initialize the ReachableArea object. origin is a (column,row)
+        tuple, costs and parents are dictionaries keyed by (column,row)"""
+
+        self._origin=origin
+        self._costs=costs
+        self._parents=parents
+
+    def isReachable(self,cell):
+        """Check if a (column,row) cell can be reached"""
+
+        return cell in self._costs
+
+    def getCost(self,cell):
+        """Get the cost to reach a (column,row) cell, None if it can't be
+        reached"""
+
+        return self._costs.get(cell)
+
+    def getCells(self):
+        """Get a list with all the reachable cells"""
+
+        return self._costs.keys()
+
+    def getPathTo(self,cell):
+        """Get the list of cells from the origin (not included) to a
+        reachable cell"""
+
+        cells=[]
+        while cell!=self._origin:
+            cells.append(cell)
+            cell=self._parents[cell]
+        cells.reverse()
+        return cells
+
+
+class Simulation:
+    """Plays the game without displaying anything, for tests, computer
+    players and game balancing. The armies are PlayerModel objects that
+    follow their paths with walkPath, so a turn only costs the path finding
+    and the game rules.
+
+    Constructor: Simulation(MapModel, int)
+    """
+
+    def __init__(self, map_obj, seed=None):
+        """Initialize the Simulation object. seed is used for the random
+        destinations of moveRandomly"""
+
+        self._map_obj=map_obj
+        self._armies=[]
+        self._turn=1
+        self._random=Random(seed)
+
+        """{army id: set of resource ids it couldn't find a path to}"""
+        self._unreachable={}
+
+        """turns played, paths set, cells moved and seconds spent in run"""
+        self._turns=0
+        self._moves=0
+        self._cells=0
+        self._seconds=0.0
+
+    def addArmy(self, army_name, (col,row), colour=(220,20,60)):
+        """Create an army on the cell (col,row) and return it"""
+
+        army_obj=PlayerModel(army_name,col*engine.tile_x,row*engine.tile_y,0,
+        colour,self._map_obj)
+        self._armies.append(army_obj)
+
+        return army_obj
+
+    def getArmies(self):
+        """Return the list of armies of the simulation"""
+
+        return self._armies
+
+    def getMap(self):
+        """Return the MapModel object of the simulation"""
+
+        return self._map_obj
+
+    def getTurn(self):
+        """Return the number of the current turn"""
+
+        return self._turn
+
+    def moveArmy(self, army_obj, (col,row)):
+        """Set the cell (col,row) as the destination of an army, and move it
+        along the path as far as its moves left allow. Return the number of
+        cells moved."""
+
+        army_obj.setPath((col*engine.tile_x+engine.tile_x/2,
+        row*engine.tile_y+engine.tile_y/2),self._map_obj)
+
+        moved=army_obj.walkPath(self._map_obj)
+        self._moves+=1
+        self._cells+=moved
+
+        return moved
+
+    def conquerResources(self, army_obj):
+        """The default policy of run. The army goes on towards its
+        destination, or heads for the closest resource spot or city it
+        doesn't own. When it owns all those it can reach, it moves
+        randomly."""
+
+        if army_obj.hasPath():
+            self._cells+=army_obj.walkPath(self._map_obj)
+            return
+
+        x,y=army_obj.getPos()
+        cell=self._map_obj.getCellFromXY(x,y)
+        origin=(cell['col'],cell['row'])
+
+        """take the resource the army is on, if another army took it from
+        there or the army started on it"""
+        result, res_id = self._map_obj.resOnCellXY(x,y)
+        if result and self._map_obj.getResourceOwner(res_id)[0] != \
+        army_obj.getID():
+            self._map_obj.armyOnResource(army_obj,res_id)
+
+        map_dims=self._map_obj.getDimensions()
+        index=self._map_obj.getResourceIndex()
+        unreachable=self._unreachable.setdefault(army_obj.getID(),set())
+
+        targets=[]
+        for res_id in self._map_obj.getResourcesInRadius(origin,
+        map_dims['num_rows']+map_dims['num_cols']):
+            owner, _ = self._map_obj.getResourceOwner(res_id)
+            (col,row)=index.getCell(res_id)
+            if owner != army_obj.getID() and res_id not in unreachable and \
+            (col,row) != origin:
+                targets.append(((col-origin[0])**2+(row-origin[1])**2,res_id))
+
+        if not targets:
+            self.moveRandomly(army_obj)
+            return
+
+        res_id=min(targets)[1]
+        self.moveArmy(army_obj,index.getCell(res_id))
+
+        """without a path the army is either on the resource, or it can't
+        get there"""
+        x,y=army_obj.getPos()
+        if not army_obj.hasPath() and self._map_obj.resOnCellXY(x,y)[1] != \
+        res_id:
+            unreachable.add(res_id)
+
+    def moveRandomly(self, army_obj):
+        """The army goes on towards its destination, or gets a random
+        walkable cell as destination when it has none"""
+
+        if army_obj.hasPath():
+            self._cells+=army_obj.walkPath(self._map_obj)
+            return
+
+        map_dims=self._map_obj.getDimensions()
+
+        for i in range(10):
+            col=self._random.randrange(map_dims['num_cols']-1)
+            row=self._random.randrange(map_dims['num_rows']-1)
+
+            if self._map_obj.getIsWalkable(col*engine.tile_x,
+            row*engine.tile_y):
+                self.moveArmy(army_obj,(col,row))
+                return
+
+    def endTurn(self):
+        """Finish the turn of every army, the armies get their moves back
+        and are paid their income"""
+
+        for army_obj in self._armies:
+            army_obj.newTurn(self._map_obj)
+
+        self._turn+=1
+        self._turns+=1
+
+    def run(self, turns, policy=None):
+        """Play a number of turns. In every turn, policy(simulation, army) is
+        called for every army to make its moves, conquerResources is used if
+        no policy is given. Return the statistics of getStats."""
+
+        start=time.time()
+
+        for i in range(turns):
+            for army_obj in self._armies:
+                if policy is None:
+                    self.conquerResources(army_obj)
+                else:
+                    policy(self,army_obj)
+
+            self.endTurn()
+
+        self._seconds+=time.time()-start
+
+        return self.getStats()
+
+    def getStats(self):
+        """Return a dictionary with the turns played, the paths set, the
+        cells moved, and the time spent in run"""
+
+        turns_per_second=0.0
+        if self._seconds>0:
+            turns_per_second=self._turns/self._seconds
+
+        return {'turns':self._turns,'moves':self._moves,'cells':self._cells,
+        'seconds':self._seconds,'turns_per_second':turns_per_second}
+
+
+if __name__ == '__main__':
+
+    """simulate the scenario of the game with a few armies, and show how many
+    turns per second are played. Another scenario, for example one made with
+    woh_generator, can be given in the command line:
+
+    python woh_engine.py [scenario folder [turns]]
+
+    In that scenario the armies start on its first four cities."""
+    import sys
+    import os
+
+    folder=''
+    turns=1000
+    if len(sys.argv)>1:
+        folder=sys.argv[1]
+    if len(sys.argv)>2:
+        turns=int(sys.argv[2])
+
+    game_map=MapModel(*[os.path.join(folder,f) for f in ('map.txt',
+    'terrtypes.txt','resource_types.txt','resource_pos.txt','cities.txt',
+    'cities_pos.txt')])
+
+    if folder:
+        index=game_map.getResourceIndex()
+        starts=[index.getCell(res_id) for res_id in
+        game_map.getCities()[:4]]
+    else:
+        starts=[(0,0),(20,2),(5,15),(15,10)]
+
+    simulation=Simulation(game_map,1)
+    for (name,cell) in zip(('red','blue','green','yellow'),starts):
+        simulation.addArmy(name,cell)
+
+    print 'Turns: %(turns)d in %(seconds).3f s, %(turns_per_second).0f ' \
+    'turns per second, %(moves)d paths, %(cells)d cells moved' % \
+    simulation.run(turns)
+
+    for army_obj in simulation.getArmies():
+        print army_obj.getName(), army_obj.getResources()
@@ -0,0 +1,600 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: woh_generator.py
+#
+#   Description: This file contains a generator of random scenarios of any
+#   size, to measure how the game scales with the size of the map. The
+#   scenarios are written in the same text files as the scenario of the
+#   game: map.txt, terrtypes.txt, resource_types.txt, resource_pos.txt,
+#   cities.txt and cities_pos.txt. The same seed and options always give the
+#   same files.
+#
+#   The terrain comes from two fields of fractal value noise, the elevation
+#   and the moisture. Low cells are ocean and high cells mountains, the rest
+#   of the terrains depend on both values. Every walkable cell can be reached
+#   from every other: small regions cut off by the obstacles are filled, and
+#   the others are joined to the largest one by a pass or a ford across the
+#   obstacles. Resource spots and cities are placed on walkable cells.
+#
+#   To generate a scenario with 100 times the cells of the game's map, within
+#   the folder WOH type:
+#
+#   python woh_generator.py --scale 100 --seed 1 scenarios/x100
+#
+#   python woh_generator.py --help lists the other options.
+#
+################################################################################
+
+import os
+import re
+import shutil
+from bisect import bisect_left
+from random import Random
+
+"""terrain types written to terrtypes.txt, the same as the game's: id, name,
+move cost, is_walkable, image and is_opaque"""
+TERRAIN_TYPES=[('1','forest',2,1,'images/forest.jpg',1),
+('2','grassland',1,1,'images/grassland.jpg',0),
+('3','mountain range',-1,0,'images/mountain.jpg',1),
+('4','ocean',-1,0,'images/ocean.jpg',0),
+('5','desert',3,1,'images/desert.jpg',0),
+('6','grassland',1,1,'images/grassland2.jpg',0),
+('7','plans',1,1,'images/plains.jpg',0),
+('8','snow',4,1,'images/snow.jpg',0),
+('9','pine forest',2,1,'images/pine_forest.jpg',1),
+('10','tundra',3,1,'images/tundra.jpg',0),
+('11','hills',3,1,'images/hills.jpg',0),
+('12','small forest',2,1,'images/small_forest.jpg',1)]
+
+OCEAN='4'
+MOUNTAIN='3'
+
+"""terrain of the obstacle cells crossed to join two regions"""
+CROSSINGS={OCEAN:'7', MOUNTAIN:'11'}
+
+"""the resource types are the game's"""
+RESOURCE_TYPES_FILE='resource_types.txt'
+
+"""size of the game's map, used by the scale option"""
+GAME_MAP_SIZE=(28,23)
+
+"""parts of the names of the cities"""
+NAME_STARTS=['Ar','Bel','Cor','Dun','El','Fal','Gor','Har','Ist','Kel',
+'Lor','Mar','Nor','Or','Pel','Ros','Sil','Tor','Ul','Val']
+NAME_MIDDLES=['','a','e','i','o','en','or','ia']
+NAME_ENDS=['burg','dale','ford','gard','haven','holm','mere','mont','stead',
+'ton','wick',' City']
+
+CITY_RESOURCES=['food','gold','ore','gems']
+
+CITY_LINE='%d,, %s,, %s,, %d,, %d,, images/city1.png,, You have reached ' \
+'the great city of %s. Your troops march on the main street and you meet ' \
+'the local authorities. They seem scared and want to remain in power, so ' \
+'they offer you a weekly tribute of _TURN_AMOUNT units of _RESOURCE in ' \
+'exchange of your protection.,, They will also let you take their ' \
+'reserves, which are _INSTANT_AMOUNT units of _RESOURCE.,,%d,,%d\n'
+
+"""id of the first city type, resource types must have lower ids"""
+FIRST_CITY_ID=101
+
+
+class ValueNoise:
+    """Fractal value noise: the sum of several octaves of random values on a
+    lattice, interpolated between the lattice points. Each octave has half
+    the period and half the amplitude of the previous one.
+
+    Constructor: ValueNoise(Random, int, int, int, int)
+    """
+
+    def __init__(self, rand, cols, rows, period, octaves=4):
+        """Initialize the ValueNoise object for a grid of cols*rows cells.
+        period is the size in cells of the largest features"""
+
+        self._cols=cols
+        self._rows=rows
+        self._octaves=[]
+
+        amplitude=1.0
+        for k in range(octaves):
+            p=max(period>>k,2)
+            lattice=[[rand.random() for i in range(cols/p+2)] for j in
+            range(rows/p+2)]
+
+            """lattice column and weight of every cell of a row, the weight
+            is smoothed so the features don't look square"""
+            xw=[]
+            for x in range(cols):
+                f=float(x%p)/p
+                xw.append((x/p,f*f*(3-2*f)))
+
+            self._octaves.append((p,lattice,xw,amplitude))
+            amplitude*=0.5
+
+        self._total=sum([o[3] for o in self._octaves])
+
+    def getRow(self, y):
+        """Return a list with the value, from 0.0 to 1.0, of every cell of
+        the row y"""
+
+        values=[0.0]*self._cols
+
+        for (p,lattice,xw,amplitude) in self._octaves:
+            f=float(y%p)/p
+            fy=f*f*(3-2*f)
+
+            """interpolate the two lattice rows, then along the row"""
+            b=[a+(c-a)*fy for (a,c) in zip(lattice[y/p],lattice[y/p+1])]
+            octave=[b[i]+(b[i+1]-b[i])*fx for (i,fx) in xw]
+
+            values=[v+o*amplitude for (v,o) in zip(values,octave)]
+
+        total=self._total
+        return [v/total for v in values]
+
+
+class ScenarioGenerator:
+    """Generates a random scenario.
+
+    Constructor: ScenarioGenerator(int, int, int)
+    """
+
+    def __init__(self, cols, rows, seed=None, resource_density=0.07,
+    city_density=0.002, ocean=0.2, mountains=0.1, feature_size=16,
+    min_region=16):
+        """Initialize the ScenarioGenerator object for a map of cols*rows
+        cells. resource_density and city_density are the resource spots and
+        cities per walkable cell, there are at least 4 cities. ocean and
+        mountains are the part of the cells with those terrains, before the
+        regions are joined. feature_size is the size in cells of the largest
+        lakes, mountain ranges and forests, and regions with less than
+        min_region cells are filled"""
+
+        self._cols=cols
+        self._rows=rows
+        self._seed=seed
+        self._resource_density=resource_density
+        self._city_density=city_density
+        self._ocean=ocean
+        self._mountains=mountains
+        self._feature_size=feature_size
+        self._min_region=min_region
+
+        """the terrain of every cell, a terrain code (position in
+        TERRAIN_TYPES) per byte, row by row"""
+        self._grid=None
+
+        """(type id, column, row) of the resource spots and the cities, and
+        the lines of the city types"""
+        self._spots=[]
+        self._cities=[]
+        self._city_types=[]
+
+    def generate(self):
+        """Generate the terrain, the resource spots and the cities"""
+
+        rand=Random(self._seed)
+
+        self.makeTerrain(rand)
+        self.joinRegions()
+        self.placeSpots(rand)
+
+    def makeTerrain(self, rand):
+        """Fill the grid with the terrain given by the elevation and the
+        moisture of every cell"""
+
+        cols=self._cols
+        rows=self._rows
+
+        elevation=ValueNoise(rand,cols,rows,self._feature_size)
+        moisture=ValueNoise(rand,cols,rows,self._feature_size)
+
+        """the noise is kept in a byte per cell, and then changed into its
+        percentile, so the part of the cells of each terrain doesn't depend
+        on the map"""
+        heights=bytearray()
+        wetness=bytearray()
+        for y in range(rows):
+            heights.extend(bytearray([int(v*255.99) for v in
+            elevation.getRow(y)]))
+            wetness.extend(bytearray([int(v*255.99) for v in
+            moisture.getRow(y)]))
+
+        heights=heights.translate(self.percentiles(heights))
+        wetness=wetness.translate(self.percentiles(wetness))
+
+        """terrain code of every (elevation, moisture) pair, in 64 levels"""
+        table=bytearray(64*64)
+        for h in range(64):
+            for w in range(64):
+                table[h*64+w]=self.getTerrainCode((h+0.5)/64,(w+0.5)/64)
+
+        self._grid=bytearray([table[(h>>2)*64+(w>>2)] for (h,w) in
+        zip(heights,wetness)])
+
+    def percentiles(self, values):
+        """Return a table for translate that changes the bytes of values
+        into their percentile, from 0 to 255"""
+
+        counts=[values.count(chr(v)) for v in range(256)]
+
+        table=[]
+        below=0
+        for v in range(256):
+            table.append(chr(min(255,(below+counts[v]/2)*256/len(values))))
+            below+=counts[v]
+
+        return ''.join(table)
+
+    def getTerrainCode(self, height, wetness):
+        """Return the terrain code of a cell, from its elevation and moisture
+        percentiles, 0.0 to 1.0"""
+
+        ocean=self._ocean
+        mountains=1.0-self._mountains
+
+        if height<ocean:
+            terrain=OCEAN
+        elif height>=mountains:
+            terrain=MOUNTAIN
+        elif height>=mountains-0.05:
+            terrain=wetness<0.5 and '11' or '8'
+        elif height>=mountains-0.1:
+            terrain=wetness<0.5 and '10' or '9'
+        elif height<ocean+0.03:
+            terrain=wetness<0.5 and '5' or '2'
+        elif wetness<0.2:
+            terrain='5'
+        elif wetness<0.4:
+            terrain='7'
+        elif wetness<0.55:
+            terrain='2'
+        elif wetness<0.65:
+            terrain='6'
+        elif wetness<0.8:
+            terrain='12'
+        else:
+            terrain='1'
+
+        return self.getCode(terrain)
+
+    def getCode(self, terrain_id):
+        """Return the code of a terrain type"""
+
+        for code in range(len(TERRAIN_TYPES)):
+            if TERRAIN_TYPES[code][0]==terrain_id:
+                return code
+
+    def getWalkableRows(self):
+        """Return a list with a string per row, '1' for walkable cells and
+        '0' for the others"""
+
+        table=['0']*256
+        for code in range(len(TERRAIN_TYPES)):
+            if TERRAIN_TYPES[code][3]:
+                table[code]='1'
+        table=''.join(table)
+
+        cols=self._cols
+        grid=str(self._grid)
+        return [grid[y*cols:(y+1)*cols].translate(table) for y in
+        range(self._rows)]
+
+    def getRegions(self):
+        """Find the regions of walkable cells that are connected, moving in
+        the 8 directions the armies move in. The cells are grouped in runs,
+        the walkable cells next to each other in a row, and the runs that
+        touch in consecutive rows are joined with a union-find.
+
+        Return the list of (row, first column, last column) runs and a list
+        with the region of every run, the number of its first run."""
+
+        runs=[]
+        parent=[]
+
+        def find(i):
+            while parent[i]!=i:
+                parent[i]=parent[parent[i]]
+                i=parent[i]
+            return i
+
+        previous=[]
+        y=0
+        for line in self.getWalkableRows():
+            current=[]
+            for m in re.finditer('1+',line):
+                current.append((m.start(),m.end()-1,len(runs)))
+                runs.append((y,m.start(),m.end()-1))
+                parent.append(len(parent))
+
+            """runs of the previous row that touch each run, diagonals
+            included"""
+            j=0
+            for (c0,c1,run) in current:
+                while j<len(previous) and previous[j][1]<c0-1:
+                    j+=1
+                k=j
+                while k<len(previous) and previous[k][0]<=c1+1:
+                    a=find(run)
+                    b=find(previous[k][2])
+                    if a!=b:
+                        parent[max(a,b)]=min(a,b)
+                    k+=1
+
+            previous=current
+            y+=1
+
+        return runs, [find(i) for i in range(len(runs))]
+
+    def joinRegions(self):
+        """Make every walkable cell reachable from every other. Regions with
+        less than min_region cells are filled with the obstacle next to
+        them, and the others are joined to the largest region by a straight
+        line of cells across the obstacles"""
+
+        runs, regions=self.getRegions()
+        if not runs:
+            return
+
+        sizes={}
+        for i in range(len(runs)):
+            (y,c0,c1)=runs[i]
+            sizes[regions[i]]=sizes.get(regions[i],0)+c1-c0+1
+
+        main=max(sizes.keys(),key=lambda r: (sizes[r],-r))
+
+        """runs of the largest region by row, to find its closest cell"""
+        main_runs={}
+        for i in range(len(runs)):
+            if regions[i]==main:
+                main_runs.setdefault(runs[i][0],[]).append(runs[i][1:])
+
+        cols=self._cols
+        grid=self._grid
+        ocean=self.getCode(OCEAN)
+        joined=set([main])
+
+        for i in range(len(runs)):
+            region=regions[i]
+            (y,c0,c1)=runs[i]
+
+            if sizes[region]<self._min_region:
+                """the obstacle on the left or right of the run"""
+                if c0>0:
+                    obstacle=grid[y*cols+c0-1]
+                elif c1<cols-1:
+                    obstacle=grid[y*cols+c1+1]
+                else:
+                    obstacle=ocean
+                grid[y*cols+c0:y*cols+c1+1]=chr(obstacle)*(c1-c0+1)
+
+            elif region not in joined:
+                joined.add(region)
+                start=((c0+c1)/2,y)
+                self.crossLine(start,self.getClosest(start,main_runs))
+
+    def getClosest(self, (x,y), rows_runs):
+        """Return the (column,row) cell of the runs in rows_runs, a
+        dictionary {row: list of (first column, last column)}, closest to
+        the cell (x,y), counting diagonal steps as one"""
+
+        best=None
+        best_distance=None
+        d=0
+
+        while best_distance is None or d<best_distance:
+            if y-d<0 and y+d>=self._rows:
+                break
+
+            for row in set([y-d,y+d]):
+                row_runs=rows_runs.get(row)
+                if not row_runs:
+                    continue
+
+                """the run that starts after x and the one before it"""
+                k=bisect_left(row_runs,(x,x))
+                for (c0,c1) in row_runs[max(k-1,0):k+1]:
+                    col=min(max(x,c0),c1)
+                    distance=max(abs(col-x),d)
+                    if best_distance is None or distance<best_distance:
+                        best=(col,row)
+                        best_distance=distance
+
+            d+=1
+
+        return best
+
+    def crossLine(self, (x0,y0), (x1,y1)):
+        """Make walkable the obstacle cells of a line between two cells, the
+        ocean becomes plains and the mountains hills"""
+
+        crossings={}
+        for (obstacle,terrain) in CROSSINGS.items():
+            crossings[self.getCode(obstacle)]=self.getCode(terrain)
+
+        steps=max(abs(x1-x0),abs(y1-y0))
+        for i in range(steps+1):
+            x=x0+int(round(float(x1-x0)*i/max(steps,1)))
+            y=y0+int(round(float(y1-y0)*i/max(steps,1)))
+
+            code=self._grid[y*self._cols+x]
+            self._grid[y*self._cols+x]=crossings.get(code,code)
+
+    def placeSpots(self, rand):
+        """Place the resource spots and the cities on random walkable cells,
+        at most one on every cell"""
+
+        cols=self._cols
+        walkable=''.join(self.getWalkableRows())
+        n_walkable=walkable.count('1')
+        if not n_walkable:
+            return
+
+        type_ids=self.getResourceTypeIDs()
+        n_spots=min(int(n_walkable*self._resource_density),n_walkable)
+        n_cities=min(max(int(n_walkable*self._city_density),4),
+        n_walkable-n_spots)
+
+        taken=set()
+        cells=[]
+        while len(cells)<n_spots+n_cities:
+            i=rand.randrange(len(walkable))
+            if walkable[i]=='1' and i not in taken:
+                taken.add(i)
+                cells.append((i%cols,i/cols))
+
+        for (col,row) in cells[:n_spots]:
+            self._spots.append((rand.choice(type_ids),col,row))
+
+        names=set()
+        for (col,row) in cells[n_spots:]:
+            city_id=FIRST_CITY_ID+len(self._city_types)
+
+            name=rand.choice(NAME_STARTS)+rand.choice(NAME_MIDDLES)+ \
+            rand.choice(NAME_ENDS)
+            if name in names:
+                name=name+' '+str(city_id)
+            names.add(name)
+
+            self._city_types.append(CITY_LINE % (city_id,
+            rand.choice(CITY_RESOURCES),name,rand.randint(10,25),
+            rand.randint(20,50),name,rand.randint(5,15),rand.randint(2,8)))
+            self._cities.append((city_id,col,row))
+
+    def getResourceTypeIDs(self):
+        """Return the ids of the resource types of the game"""
+
+        type_ids=[]
+        f=open(RESOURCE_TYPES_FILE,'U')
+        for line in f:
+            if line.find(',,')!=-1:
+                type_ids.append(int(line.split(',,')[0]))
+        f.close()
+
+        return type_ids
+
+    def write(self, directory):
+        """Write the scenario files in directory, which is created if it
+        doesn't exist"""
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        f=open(os.path.join(directory,'terrtypes.txt'),'w')
+        for t in TERRAIN_TYPES:
+            f.write('%s,%s,%d,%d,%s,%d\n' % t)
+        f.close()
+
+        ids=[t[0] for t in TERRAIN_TYPES]
+        cols=self._cols
+        f=open(os.path.join(directory,'map.txt'),'w')
+        for y in range(self._rows):
+            f.write(','.join([ids[c] for c in self._grid[y*cols:(y+1)*cols]])+
+            '\n')
+        f.close()
+
+        shutil.copyfile(RESOURCE_TYPES_FILE,os.path.join(directory,
+        'resource_types.txt'))
+
+        f=open(os.path.join(directory,'resource_pos.txt'),'w')
+        f.writelines(['%d,%d,%d\n' % spot for spot in self._spots])
+        f.close()
+
+        f=open(os.path.join(directory,'cities.txt'),'w')
+        f.writelines(self._city_types)
+        f.close()
+
+        f=open(os.path.join(directory,'cities_pos.txt'),'w')
+        f.writelines(['%d,%d,%d\n' % city for city in self._cities])
+        f.close()
+
+    def getStats(self):
+        """Return a dictionary with the size of the map, the number of cells
+        of every terrain type, and the number of resource spots and
+        cities"""
+
+        terrains={}
+        for code in range(len(TERRAIN_TYPES)):
+            terrains[TERRAIN_TYPES[code][1]]=terrains.get(TERRAIN_TYPES[code][1],
+            0)+self._grid.count(chr(code))
+
+        return {'cols':self._cols, 'rows':self._rows, 'terrains':terrains,
+        'spots':len(self._spots), 'cities':len(self._cities)}
+
+
+if __name__ == '__main__':
+
+    """generate the scenario given in the command line"""
+    import sys
+    import time
+    from optparse import OptionParser
+
+    parser=OptionParser(usage='python woh_generator.py [options] directory')
+    parser.add_option('--scale',type='float',default=1.0,
+    help='cells of the map, as a multiple of the game\'s 28x23 map')
+    parser.add_option('--size',help='size of the map, COLSxROWS, instead '
+    'of --scale')
+    parser.add_option('--seed',type='int',default=0)
+    parser.add_option('--resources',type='float',default=0.07,
+    help='resource spots per walkable cell')
+    parser.add_option('--cities',type='float',default=0.002,
+    help='cities per walkable cell, at least 4 are placed')
+    parser.add_option('--ocean',type='float',default=0.2,
+    help='part of the cells that are ocean')
+    parser.add_option('--mountains',type='float',default=0.1,
+    help='part of the cells that are mountains')
+    parser.add_option('--feature-size',type='int',default=16,
+    help='size in cells of the largest terrain features')
+
+    (options,args)=parser.parse_args()
+    if len(args)!=1:
+        parser.print_help()
+        sys.exit(1)
+
+    if options.size:
+        (cols,rows)=[int(v) for v in options.size.lower().split('x')]
+    else:
+        cols=int(round(GAME_MAP_SIZE[0]*options.scale**0.5))
+        rows=int(round(GAME_MAP_SIZE[1]*options.scale**0.5))
+
+    start=time.time()
+    generator=ScenarioGenerator(cols,rows,options.seed,options.resources,
+    options.cities,options.ocean,options.mountains,options.feature_size)
+    generator.generate()
+    generator.write(args[0])
+
+    stats=generator.getStats()
+    print '%(cols)dx%(rows)d map, %(spots)d resource spots, %(cities)d ' \
+    'cities' % stats, 'in %.1f s' % (time.time()-start)
@@ -250,6 +250,10 @@ class MapCanvas(Widget):
         """Initialize other, game related attributes and elements of the widget"""
 
         self._map_obj=map_obj
+
+        """the camera of the map shows as much of the map as fits in the
+        canvas"""
+        self._map_obj.setViewSize(self._width,self._height)
         
         """Subwidgets"""
         
@@ -267,10 +271,26 @@ class MapCanvas(Widget):
     def handleKeyboard(self, key_event, (player,map_obj)):
         """This method is called when the widget has the focus and a key is
         pressed. Parameter obj is used to pass a tupple with the player
-        object and the map object."""
+        object and the map object. The arrow keys scroll the map."""
+
+        scroll={pygame.K_LEFT:(-1,0),pygame.K_RIGHT:(1,0),pygame.K_UP:(0,-1),
+        pygame.K_DOWN:(0,1)}
+
+        if key_event.key in scroll:
+            (dx,dy)=scroll[key_event.key]
+            self._map_obj.getCamera().scrollBy(dx*engine.scroll_step,
+            dy*engine.scroll_step)
 
         player.handleKeyboard(key_event,self._map_obj)
 
+    def update(self, (player, game_map)):
+        """Keep the player in the camera's view while it moves. This method
+        is called at the frame rate of the game."""
+
+        if player.isMoving():
+            game_map.getCamera().keepInView(player.getMapRect(),
+            2*engine.tile_x)
+
     def clickOnWidget(self,button,(x,y),player):
         """When the user clicks on the map Terrain information is retrieved.
         First it is checked if the user clicked inside this widget."""
@@ -279,14 +299,15 @@ class MapCanvas(Widget):
 
             """set the focus to clicked widget"""
             gui.setFocus(self.index)
+
+            """the click is converted to map coordinates"""
+            (x,y)=self._map_obj.getCamera().toMap((x-self._rect.x,
+            y-self._rect.y))
             
             map_dims=self._map_obj.getDimensions()
-            if x>self._rect.x and x<self._rect.x + map_dims['width']:
-                if y>self._rect.y and y<self._rect.y + map_dims['height']:
+            if x>=0 and x<map_dims['width']:
+                if y>=0 and y<map_dims['height']:
 
-                    cell_click=self._map_obj.getCellFromXY(x-self._rect.x,
-                        y-self._rect.y)
-                    
                     if button == MOUSE_LEFT:
                         """check if there is a path on the screen and the
                         destination circle was click. If so, the player will
@@ -359,7 +380,7 @@ class GameOptionsDialog(Dialog):
 
         self._btn_fullscr_id=gui.addWidget(Button(self.index,150,35,
         (255,255,255),50,230,'Toggle on/off fullscreen',
-        'images/button_background.png',14,pygame.display.toggle_fullscreen))
+        'images/button_background.png',14,toggle_fullscreen))
         
         self._btn_exit_id=gui.addWidget(Button(self.index,150,35,(255,255,255),
         50,295,'Exit Game','images/button_background.png',14,sys.exit))
@@ -0,0 +1,438 @@
+################################################################################
+#
+#   License BSD
+#
+#   Copyright (c) 2009, Pablo C. Farias Navarro
+#   All rights reserved.
+#
+#   Redistribution and use in source and binary forms, with or without
+#   modification, are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of the creator nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+#   THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#   AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#   IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#   ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#   LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#   CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#   SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#   INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#   CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#   ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#   POSSIBILITY OF SUCH DAMAGE.
+#
+################################################################################
+#
+#   Project: World of Heroes
+#
+#   File: woh_scenario.py
+#
+#   Description: This file contains the compiled scenario format of World of
+#   Heroes. The six text files of a scenario (map, terrain types, resource
+#   types, resource positions, cities and city positions) are written into a
+#   single binary file, which is opened with mmap so that the map grid is read
+#   from the file without parsing or copying it.
+#
+#   The file starts with a header (HEADER_FORMAT) that has the format version
+#   and the size and position of each section. The sections are: the terrain
+#   types (TERRAIN_FORMAT), the resource and city types (RES_TYPE_FORMAT), the
+#   resource spots and cities (SPOT_FORMAT), the string pool, where every text
+#   is stored once and referenced by its number, and the map grid, the terrain
+#   code of every cell row by row, in one or two bytes per cell. All the values
+#   are little endian.
+#
+#   The text files are still used to write scenarios. To compile one, type:
+#
+#   python woh_scenario.py map.txt terrtypes.txt resource_types.txt
+#   resource_pos.txt cities.txt cities_pos.txt scenario.wohs
+#
+################################################################################
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+"""first bytes of a compiled scenario, and version of the format"""
+MAGIC='WOHS'
+VERSION=1
+
+"""magic, version, bytes per cell, columns, rows, number of terrain types,
+number of resource types, number of spots, number of strings, and the
+offsets of the string pool and the grid"""
+HEADER_FORMAT='<4sHHIIIIIIII'
+
+"""id, name and image of the terrain (string numbers), move cost,
+is_walkable and is_opaque"""
+TERRAIN_FORMAT='<IIIiBBxx'
+
+"""id, type, name, image, conquered text and first time text (string
+numbers), amount per turn, instant amount, is_city, and the gold and ore
+price of a soldier, which are 0 for resource spots"""
+RES_TYPE_FORMAT='<IIIIIIiiBxxxii'
+
+"""resource type (number in the resource type table), column and row"""
+SPOT_FORMAT='<III'
+
+"""the grid starts at a multiple of this number of bytes"""
+GRID_ALIGN=16
+
+"""bytes of the grid read at once when the terrain codes are checked, an
+even number so that two byte cells are not split"""
+GRID_BLOCK=1<<20
+
+class ScenarioError(Exception):
+    """Raised when a file is not a compiled scenario, it was written with
+    another version of the format, or it is truncated or damaged"""
+    pass
+
+
+class StringPool:
+    """Texts of a scenario being written, each one stored once and referenced
+    by its number"""
+
+    def __init__(self):
+        """Initialize the StringPool object"""
+
+        self._numbers={}
+        self._strings=[]
+
+    def add(self, text):
+        """Return the number of text, adding it to the pool if needed"""
+
+        if text not in self._numbers:
+            self._numbers[text]=len(self._strings)
+            self._strings.append(text)
+
+        return self._numbers[text]
+
+    def __len__(self):
+        """Return the number of strings in the pool"""
+
+        return len(self._strings)
+
+    def pack(self):
+        """Return the pool as it is stored in the file: the offset of every
+        string, and of the end of the last one, followed by the strings"""
+
+        offsets=[]
+        pos=0
+        for text in self._strings:
+            offsets.append(pos)
+            pos+=len(text)
+        offsets.append(pos)
+
+        return struct.pack('<%dI' % len(offsets),*offsets)+''.join(
+        self._strings)
+
+
+def write_scenario(filename, terrains, res_types, spots, cols, rows,
+cell_bytes, grid):
+    """Write a compiled scenario.
+
+    terrains is a list of (id, name, image, move_cost, is_walkable,
+    is_opaque) tuples, in the order of their codes. res_types is a list of
+    dictionaries in the format of MapModel._resource_types, with the 'id' key
+    added, and spots a list of (resource type number, column, row) tuples.
+    grid is a string with the code of every cell, cell_bytes bytes each."""
+
+    pool=StringPool()
+
+    terrain_data=[]
+    for (terrain_id,name,image,move_cost,is_walkable,is_opaque) in terrains:
+        terrain_data.append(struct.pack(TERRAIN_FORMAT,pool.add(terrain_id),
+        pool.add(name),pool.add(image),move_cost,is_walkable,is_opaque))
+
+    res_type_data=[]
+    for t in res_types:
+        res_type_data.append(struct.pack(RES_TYPE_FORMAT,pool.add(t['id']),
+        pool.add(t['type']),pool.add(t['name']),pool.add(t['filename']),
+        pool.add(t['conquered_text']),pool.add(t['first_time_text']),
+        t['amount_per_turn'],t['instant_amount'],'sld_cost_gold' in t,
+        t.get('sld_cost_gold',0),t.get('sld_cost_ore',0)))
+
+    spot_data=[struct.pack(SPOT_FORMAT,*s) for s in spots]
+
+    tables=''.join(terrain_data)+''.join(res_type_data)+''.join(spot_data)
+    strings=pool.pack()
+
+    pool_offset=struct.calcsize(HEADER_FORMAT)+len(tables)
+    grid_offset=pool_offset+len(strings)
+    padding=(GRID_ALIGN-grid_offset%GRID_ALIGN)%GRID_ALIGN
+    grid_offset+=padding
+
+    header=struct.pack(HEADER_FORMAT,MAGIC,VERSION,cell_bytes,cols,rows,
+    len(terrains),len(res_types),len(spots),len(pool),pool_offset,
+    grid_offset)
+
+    f=open(filename,'wb')
+    f.write(header)
+    f.write(tables)
+    f.write(strings)
+    f.write('\0'*padding)
+    f.write(grid)
+    f.close()
+
+
+class GridView:
+    """The map grid of a compiled scenario, read from the memory mapped file
+    without copying it. Indexing a GridView gives the terrain code of a cell,
+    like the array of codes of a map loaded from text. Cells can be changed,
+    the changes are kept in memory and never written to the file."""
+
+    def __init__(self, data, offset, length, itemsize):
+        """Initialize the GridView object over length cells of data, a mmap
+        object, starting at offset. itemsize is 1 or 2 bytes per cell"""
+
+        self._data=data
+        self._offset=offset
+        self._length=length
+        self.itemsize=itemsize
+
+        if itemsize==2:
+            self._struct=struct.Struct('<H')
+
+    def __len__(self):
+        """Return the number of cells"""
+
+        return self._length
+
+    def __getitem__(self, i):
+        """Return the code of the cell i"""
+
+        if i<0 or i>=self._length:
+            raise IndexError('grid index out of range')
+
+        if self.itemsize==1:
+            return ord(self._data[self._offset+i])
+
+        return self._struct.unpack_from(self._data,self._offset+2*i)[0]
+
+    def __setitem__(self, i, code):
+        """Change the code of the cell i"""
+
+        if i<0 or i>=self._length:
+            raise IndexError('grid index out of range')
+
+        if self.itemsize==1:
+            self._data[self._offset+i]=chr(code)
+        else:
+            self._struct.pack_into(self._data,self._offset+2*i,code)
+
+    def __iter__(self):
+        """Iterate over the codes of all the cells"""
+
+        for i in xrange(self._length):
+            yield self[i]
+
+    def tostring(self):
+        """Return the cells as a string, like array.tostring"""
+
+        return self._data[self._offset:self._offset+self._length*self.itemsize]
+
+
+class CompiledScenario:
+    """A compiled scenario, opened with mmap. The header and the tables are
+    read when the object is created, the grid is only read when its cells
+    are used.
+
+    Constructor: CompiledScenario(str)
+    """
+
+    def __init__(self, filename):
+        """Open the compiled scenario filename. Raise ScenarioError if it is
+        not a compiled scenario of the current version"""
+
+        self._filename=filename
+        f=open(filename,'rb')
+
+        """an empty file can't be mapped"""
+        header_size=struct.calcsize(HEADER_FORMAT)
+        if os.fstat(f.fileno()).st_size<header_size:
+            f.close()
+            raise ScenarioError(filename+' is not a compiled scenario')
+
+        """the map is private, the cells changed by the game stay in
+        memory"""
+        self._data=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_COPY)
+        f.close()
+
+        (magic,version,self._cell_bytes,self._cols,self._rows,n_terrains,
+        n_res_types,n_spots,n_strings,pool_offset,self._grid_offset)= \
+        struct.unpack_from(HEADER_FORMAT,self._data)
+
+        if magic!=MAGIC:
+            raise ScenarioError(filename+' is not a compiled scenario')
+        if version!=VERSION:
+            raise ScenarioError(filename+' has version '+str(version)+
+            ' of the scenario format, version '+str(VERSION)+' is needed')
+        if self._cell_bytes not in (1,2):
+            raise ScenarioError(filename+' has '+str(self._cell_bytes)+
+            ' bytes per cell')
+        if self._grid_offset+self._cols*self._rows*self._cell_bytes> \
+        len(self._data):
+            raise ScenarioError(filename+' is truncated')
+
+        """the tables are between the header and the string pool"""
+        tables_end=header_size+n_terrains*struct.calcsize(TERRAIN_FORMAT)+ \
+        n_res_types*struct.calcsize(RES_TYPE_FORMAT)+ \
+        n_spots*struct.calcsize(SPOT_FORMAT)
+        if tables_end>pool_offset:
+            raise ScenarioError(filename+' has a damaged header')
+
+        """string pool"""
+        if pool_offset+4*(n_strings+1)>len(self._data):
+            raise ScenarioError(filename+' is truncated')
+        offsets=self._unpack('<%dI' % (n_strings+1),pool_offset)
+        start=pool_offset+4*(n_strings+1)
+        for i in range(n_strings):
+            if offsets[i]>offsets[i+1]:
+                raise ScenarioError(filename+' has a damaged string pool')
+        if start+offsets[n_strings]>len(self._data):
+            raise ScenarioError(filename+' is truncated')
+        self._strings=[self._data[start+offsets[i]:start+offsets[i+1]] for
+        i in range(n_strings)]
+
+        pos=header_size
+
+        self._terrains=[]
+        for i in range(n_terrains):
+            (terrain_id,name,image,move_cost,is_walkable,is_opaque)= \
+            self._unpack(TERRAIN_FORMAT,pos)
+            self._terrains.append((self._getString(terrain_id),
+            self._getString(name),self._getString(image),move_cost,
+            is_walkable,is_opaque))
+            pos+=struct.calcsize(TERRAIN_FORMAT)
+
+        self._res_types=[]
+        for i in range(n_res_types):
+            (type_id,res_type,name,image,conquered,first_time,amount,instant,
+            is_city,sld_gold,sld_ore)=self._unpack(RES_TYPE_FORMAT,pos)
+
+            t={'id':self._getString(type_id),'type':self._getString(res_type),
+            'name':self._getString(name),'amount_per_turn':amount,
+            'instant_amount':instant,'filename':self._getString(image),
+            'conquered_text':self._getString(conquered),
+            'first_time_text':self._getString(first_time)}
+
+            if is_city:
+                t['sld_cost_gold']=sld_gold
+                t['sld_cost_ore']=sld_ore
+
+            self._res_types.append(t)
+            pos+=struct.calcsize(RES_TYPE_FORMAT)
+
+        self._spots=[]
+        for i in range(n_spots):
+            spot=self._unpack(SPOT_FORMAT,pos)
+            if spot[0]>=n_res_types:
+                raise ScenarioError(filename+' has a spot of an unknown '
+                'resource type')
+            self._spots.append(spot)
+            pos+=struct.calcsize(SPOT_FORMAT)
+
+        self._checkGrid(n_terrains)
+
+    def _unpack(self, fmt, offset):
+        """Unpack fmt at offset of the file. Raise ScenarioError if it ends
+        after the end of the file"""
+
+        if offset+struct.calcsize(fmt)>len(self._data):
+            raise ScenarioError(self._filename+' is truncated')
+
+        return struct.unpack_from(fmt,self._data,offset)
+
+    def _checkGrid(self, n_terrains):
+        """Raise ScenarioError if a cell of the grid has the code of no
+        terrain type. The grid is read a block of GRID_BLOCK bytes at a time,
+        so it is never copied whole"""
+
+        end=self._grid_offset+self._cols*self._rows*self._cell_bytes
+
+        """the codes of the terrain types, removed from the blocks of one
+        byte cells with translate"""
+        codes=''.join([chr(code) for code in range(min(n_terrains,256))])
+
+        for start in xrange(self._grid_offset,end,GRID_BLOCK):
+            block=self._data[start:min(start+GRID_BLOCK,end)]
+
+            if self._cell_bytes==1:
+                unknown=block.translate(None,codes)
+            else:
+                cells=array('H',block)
+                if sys.byteorder=='big':
+                    cells.byteswap()
+                unknown=max(cells)>=n_terrains
+
+            if unknown:
+                raise ScenarioError(self._filename+' has a cell of an '
+                'unknown terrain type')
+
+    def _getString(self, number):
+        """Return a string of the pool. Raise ScenarioError if it is not in
+        the pool"""
+
+        if number>=len(self._strings):
+            raise ScenarioError(self._filename+' has a damaged string pool')
+
+        return self._strings[number]
+
+    def getDimensions(self):
+        """Return the number of columns and rows of the map"""
+
+        return self._cols, self._rows
+
+    def getTerrains(self):
+        """Return the list of (id, name, image, move_cost, is_walkable,
+        is_opaque) tuples of the terrain types, in the order of their
+        codes"""
+
+        return self._terrains
+
+    def getResourceTypes(self):
+        """Return the list of resource and city types, as dictionaries in the
+        format of MapModel._resource_types with the 'id' key added"""
+
+        return self._res_types
+
+    def getSpots(self):
+        """Return the list of (resource type number, column, row) tuples of
+        the resource spots and cities"""
+
+        return self._spots
+
+    def getGrid(self):
+        """Return a GridView with the terrain code of every cell"""
+
+        return GridView(self._data,self._grid_offset,self._cols*self._rows,
+        self._cell_bytes)
+
+    def getGridFile(self):
+        """Return the file name of the scenario, the offset of the grid in the
+        file and the bytes per cell, to read parts of the grid without the
+        memory map, see woh_chunks"""
+
+        return self._filename, self._grid_offset, self._cell_bytes
+
+
+if __name__ == '__main__':
+
+    """compile the scenario given in the command line"""
+    import sys
+    from woh_engine import MapModel
+
+    if len(sys.argv)!=8:
+        print 'Usage: python woh_scenario.py map terrain_types ' \
+        'resource_types resource_positions cities city_positions output'
+        sys.exit(1)
+
+    MapModel(*sys.argv[1:7]).saveCompiled(sys.argv[7])